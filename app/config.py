@@ -0,0 +1,100 @@
+import os
+
+# Configuración leída de variables de entorno, con valores por defecto
+
+# Cliente de PokeAPI
+POKEAPI_BASE_URL = os.getenv("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2/pokemon/")
+POKEAPI_POOL_SIZE = int(os.getenv("POKEAPI_POOL_SIZE", "20"))
+POKEAPI_KEEPALIVE = int(os.getenv("POKEAPI_KEEPALIVE", "10"))
+POKEAPI_CONNECT_TIMEOUT = float(os.getenv("POKEAPI_CONNECT_TIMEOUT", "2"))
+POKEAPI_TIMEOUT = float(os.getenv("POKEAPI_TIMEOUT", "5"))
+
+# Caché en memoria de PokeAPI
+POKEAPI_CACHE_TTL = float(os.getenv("POKEAPI_CACHE_TTL", "300"))
+POKEAPI_CACHE_STALE_TTL = float(os.getenv("POKEAPI_CACHE_STALE_TTL", "3600"))
+POKEAPI_CACHE_MAX_ENTRIES = int(os.getenv("POKEAPI_CACHE_MAX_ENTRIES", "1024"))
+
+# Almacén persistente (SQLite) de respuestas de PokeAPI; vacío para desactivarlo
+POKEAPI_STORE_PATH = os.getenv("POKEAPI_STORE_PATH", "data/pokeapi_store.sqlite3")
+POKEAPI_STORE_TTL = float(os.getenv("POKEAPI_STORE_TTL", str(7 * 24 * 3600)))
+# Modo offline: responder solo desde el snapshot, sin llamar a PokeAPI
+POKEAPI_OFFLINE = os.getenv("POKEAPI_OFFLINE", "false").lower() in ("1", "true", "yes")
+
+# Resiliencia frente a PokeAPI: circuit breaker, bulkhead y peticiones de cobertura
+POKEAPI_BREAKER_FAILURES = int(os.getenv("POKEAPI_BREAKER_FAILURES", "5"))
+POKEAPI_BREAKER_RESET = float(os.getenv("POKEAPI_BREAKER_RESET", "30"))
+POKEAPI_BREAKER_PROBES = int(os.getenv("POKEAPI_BREAKER_PROBES", "1"))
+# Llamadas simultáneas a PokeAPI y espera máxima (s) por un hueco antes de rechazar
+POKEAPI_BULKHEAD_SIZE = int(os.getenv("POKEAPI_BULKHEAD_SIZE", os.getenv("POKEAPI_POOL_SIZE", "20")))
+POKEAPI_BULKHEAD_WAIT = float(os.getenv("POKEAPI_BULKHEAD_WAIT", "0.05"))
+# Segunda petición si la primera supera el p95 reciente (acotado en ms)
+POKEAPI_HEDGE_ENABLED = os.getenv("POKEAPI_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+POKEAPI_HEDGE_QUANTILE = float(os.getenv("POKEAPI_HEDGE_QUANTILE", "0.95"))
+POKEAPI_HEDGE_MIN_DELAY_MS = float(os.getenv("POKEAPI_HEDGE_MIN_DELAY_MS", "20"))
+POKEAPI_HEDGE_MAX_DELAY_MS = float(os.getenv("POKEAPI_HEDGE_MAX_DELAY_MS", "2000"))
+
+# Búsqueda: plazo total y timeout por fuente (segundos)
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "3"))
+SEARCH_TIMEOUT_POKEAPI = float(os.getenv("SEARCH_TIMEOUT_POKEAPI", "2.5"))
+SEARCH_TIMEOUT_STATS = float(os.getenv("SEARCH_TIMEOUT_STATS", "0.5"))
+SEARCH_TIMEOUT_IMAGES = float(os.getenv("SEARCH_TIMEOUT_IMAGES", "0.5"))
+SEARCH_BATCH_MAX = int(os.getenv("SEARCH_BATCH_MAX", "100"))
+SEARCH_BATCH_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "10"))
+
+# Imágenes: intervalo (segundos) de refresco del índice de images/
+IMAGE_MANIFEST_REFRESH = float(os.getenv("IMAGE_MANIFEST_REFRESH", "30"))
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+IMAGE_MEMORY_CACHE_BYTES = int(os.getenv("IMAGE_MEMORY_CACHE_BYTES", str(32 * 1024 * 1024)))
+IMAGE_MEMORY_CACHE_MAX_ITEM = int(os.getenv("IMAGE_MEMORY_CACHE_MAX_ITEM", str(1024 * 1024)))
+
+# Derivados (miniaturas) de imágenes
+IMAGE_DERIVATIVE_DIR = os.getenv("IMAGE_DERIVATIVE_DIR", "data/derivatives")
+IMAGE_DERIVATIVE_QUALITY = int(os.getenv("IMAGE_DERIVATIVE_QUALITY", "75"))
+# Tamaño máximo de la caché de derivados en disco (se borran los menos usados)
+IMAGE_DERIVATIVE_CACHE_BYTES = int(os.getenv("IMAGE_DERIVATIVE_CACHE_BYTES", str(512 * 1024 * 1024)))
+IMAGE_ENCODER_WORKERS = int(os.getenv("IMAGE_ENCODER_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Tamaños estándar que pre-genera la herramienta offline: "ANCHOxALTO:formato,..."
+IMAGE_STANDARD_SIZES = os.getenv("IMAGE_STANDARD_SIZES", "96x96:webp,256x256:webp,256x256:jpeg")
+
+# Métricas en memoria: retención de cada nivel de buckets
+METRICS_MINUTE_RETENTION = int(os.getenv("METRICS_MINUTE_RETENTION", str(3 * 60)))
+METRICS_HOUR_RETENTION = int(os.getenv("METRICS_HOUR_RETENTION", str(30 * 24)))
+METRICS_DAY_RETENTION = int(os.getenv("METRICS_DAY_RETENTION", "400"))
+
+# Logging: "queue" (hilo escritor en segundo plano, por lotes) o "sync"
+LOG_MODE = os.getenv("LOG_MODE", "queue")
+LOG_FILE = os.getenv("LOG_FILE", "logs/monitoring.log")
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() in ("1", "true", "yes")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "512"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.5"))
+# Con la cola llena: drop_new, drop_old o block (espera como máximo LOG_BLOCK_TIMEOUT segundos)
+LOG_DROP_POLICY = os.getenv("LOG_DROP_POLICY", "drop_new")
+LOG_BLOCK_TIMEOUT = float(os.getenv("LOG_BLOCK_TIMEOUT", "0.05"))
+# Rotación por tamaño (0 = desactivada) y/o por día
+LOG_ROTATE_BYTES = int(os.getenv("LOG_ROTATE_BYTES", str(50 * 1024 * 1024)))
+LOG_ROTATE_DAILY = os.getenv("LOG_ROTATE_DAILY", "true").lower() in ("1", "true", "yes")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+# Nivel y muestreo por módulo: "PokeImages=WARNING,*=INFO" / "PokeImages=0.1"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+# Log estructurado: JSONL en segmentos con índice min/max de timestamp
+LOG_STRUCTURED = os.getenv("LOG_STRUCTURED", "true").lower() in ("1", "true", "yes")
+LOG_SEGMENT_DIR = os.getenv("LOG_SEGMENT_DIR", "logs/segments")
+LOG_SEGMENT_BYTES = int(os.getenv("LOG_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+LOG_SEGMENT_SECONDS = int(os.getenv("LOG_SEGMENT_SECONDS", "3600"))
+# Segmentos conservados (0 = todos)
+LOG_SEGMENT_KEEP = int(os.getenv("LOG_SEGMENT_KEEP", str(24 * 30)))
+
+# Agregados persistentes por hora/día que respaldan los endpoints /bot/* ("" = solo memoria)
+ROLLUP_DB_PATH = os.getenv("ROLLUP_DB_PATH", "data/rollups.sqlite3")
+ROLLUP_FLUSH_INTERVAL = float(os.getenv("ROLLUP_FLUSH_INTERVAL", "5"))
+# Gráficas de /bot/RenderGraph cacheadas (por consulta y bucket actual)
+GRAPH_CACHE_ENTRIES = int(os.getenv("GRAPH_CACHE_ENTRIES", "128"))
+
+# Trazas por petición: Server-Timing y buffer de trazas muestreadas (/debug/traces)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+# Muestreo de cabeza; además se guardan siempre las lentas y las 5xx
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "500"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
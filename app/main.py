@@ -1,56 +1,202 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 from typing import Optional
 from .services.pokeapi_service import PokeAPIService
 from .services.stats_service import StatsService
 from .services.image_service import ImageService
 from .services.search_service import SearchService
+from .services.graph_service import GraphService
+from .services.stats_table import STAT_COLUMNS
 from .utils.monitoring import monitor
+from .utils.log_pipeline import get_pipeline
+from .utils.log_segments import segment_stats
+from .utils.tracing import TraceBuffer, TracingMiddleware
+from .utils import prometheus
+from . import config
 from datetime import datetime, timedelta
+import json
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Índice de images/ (hash de cada imagen) e índice de nombres, fuera del import y del event loop
+    await run_in_threadpool(ImageService.get_manifest().refresh)
+    await run_in_threadpool(search_service.load_names)
+    # Mantener el índice de images/ al día en segundo plano
+    ImageService.get_manifest().start_watcher(config.IMAGE_MANIFEST_REFRESH)
+    # Índice de la caché de derivados en disco (recorre el directorio una vez)
+    await run_in_threadpool(ImageService.derivatives.cache.load)
+    if monitor.rollups is not None:
+        monitor.rollups.start_flusher(config.ROLLUP_FLUSH_INTERVAL)
+    yield
+    if monitor.rollups is not None:
+        monitor.rollups.stop_flusher()
+    ImageService.get_manifest().stop_watcher()
+    ImageService.derivatives.shutdown()
+    # Cerrar el pool de conexiones compartido con PokeAPI
+    await PokeAPIService.aclose()
+    # Escribir lo que quede en la cola de logs antes de salir
+    if get_pipeline() is not None:
+        get_pipeline().close()
+
+app = FastAPI(lifespan=lifespan)
+# Trazas por petición (Server-Timing); se guardan las muestreadas, las lentas y las 5xx
+trace_buffer = TraceBuffer(config.TRACE_BUFFER_SIZE, config.TRACE_SAMPLE_RATE, config.TRACE_SLOW_MS)
+if config.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, buffer=trace_buffer)
 pokeapi_service = PokeAPIService()
 stats_service = StatsService()
 image_service = ImageService()
-search_service = SearchService()
+search_service = SearchService(pokeapi_service, stats_service, image_service)
+graph_service = GraphService()
 @app.get("/api/pokemon/{identifier}")
 async def get_pokemon(identifier: str):
-    return pokeapi_service.get_pokemon(identifier)
+    return await pokeapi_service.get_pokemon_async(identifier)
 
 @app.post("/poke/search/")
 async def search_pokemon(request: dict):
     pokemon_name = request.get("pokemon_name")
     if not pokemon_name:
         raise HTTPException(status_code=400, detail="pokemon_name is required")
-    return search_service.search_pokemon(pokemon_name)
+    return await search_service.search_pokemon(pokemon_name)
+
+@app.post("/poke/search/batch")
+async def search_pokemon_batch(request: dict):
+    """Búsqueda por lotes; con "stream": true responde NDJSON a medida que termina cada elemento"""
+    pokemon_names = request.get("pokemon_names")
+    if not isinstance(pokemon_names, list) or not pokemon_names:
+        raise HTTPException(status_code=400, detail="pokemon_names must be a non-empty list")
+    if len(pokemon_names) > config.SEARCH_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {config.SEARCH_BATCH_MAX} pokemon_names per batch")
+    if request.get("stream"):
+        async def ndjson():
+            async for item in search_service.iter_batch(pokemon_names):
+                yield json.dumps(item) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    return {"results": await search_service.search_batch(pokemon_names)}
+
+@app.get("/poke/suggest")
+async def suggest_pokemon(q: str, limit: int = 10):
+    """Autocompletado de nombres (prefijo y aproximado)"""
+    return {"query": q, "suggestions": search_service.suggest(q, max(1, min(limit, 50)))}
+
+@app.get("/api/stats/query")
+async def query_stats(request: Request, type1: Optional[str] = None, type2: Optional[str] = None,
+                      generation: Optional[int] = None, legendary: Optional[bool] = None,
+                      sort_by: Optional[str] = None, order: str = "desc", limit: Optional[int] = None):
+    """Consulta de stats: filtros, rangos (min_<stat>/max_<stat>), orden y top-k"""
+    ranges = {}
+    try:
+        for column in STAT_COLUMNS:
+            low = request.query_params.get(f"min_{column}")
+            high = request.query_params.get(f"max_{column}")
+            if low is not None or high is not None:
+                ranges[column] = (int(low) if low is not None else None,
+                                  int(high) if high is not None else None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Stat ranges must be integers")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    results = stats_service.query_stats(type1=type1, type2=type2, generation=generation,
+                                        legendary=legendary, ranges=ranges, sort_by=sort_by,
+                                        descending=order.lower() != "asc", limit=limit)
+    return {"count": len(results), "results": results}
 
 @app.get("/api/stats/{identifier}")
 async def get_stats(identifier: str):
     return stats_service.get_stats(identifier)
 
+@app.get("/api/stats/{identifier}/forms")
+async def get_stats_forms(identifier: str):
+    return {"forms": stats_service.get_forms(identifier)}
+
 @app.get("/api/images/{pokemon_name}")
-async def get_pokemon_images(pokemon_name: str, index: Optional[int] = None):
+async def get_pokemon_images(request: Request, pokemon_name: str, index: Optional[int] = None,
+                             w: Optional[int] = None, h: Optional[int] = None, format: Optional[str] = None):
     """Endpoint para obtener imágenes"""
     if index is not None:
-        # Devolver imagen específica
-        return image_service.get_image(pokemon_name, index)
+        # Devolver imagen específica (redimensionada si se piden w/h/format)
+        if w is not None or h is not None or format is not None:
+            return await image_service.get_derivative(pokemon_name, index, w, h, format, request.headers)
+        return await image_service.get_image(pokemon_name, index, request.headers)
     else:
         # Devolver lista de imágenes disponibles
         return {"images": image_service.get_all_images(pokemon_name)}
 
+@app.get("/api/images/{pokemon_name}/bundle")
+async def get_images_bundle(pokemon_name: str, indexes: Optional[str] = None,
+                            w: Optional[int] = None, h: Optional[int] = None, format: Optional[str] = None):
+    """Todas las imágenes de un Pokémon (o las de 'indexes', p. ej. 0,2,3) en un ZIP"""
+    selected = None
+    if indexes:
+        try:
+            selected = [int(index) for index in indexes.split(",") if index.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="indexes must be a comma separated list of integers")
+    return await image_service.get_bundle(pokemon_name, selected, w, h, format)
+
 @app.get("/api/images/{pokemon_name}/{image_index}")
-async def get_specific_image(pokemon_name: str, image_index: int):
+async def get_specific_image(request: Request, pokemon_name: str, image_index: int,
+                             w: Optional[int] = None, h: Optional[int] = None, format: Optional[str] = None):
     """Endpoint alternativo para imágenes específicas"""
-    return image_service.get_image(pokemon_name, image_index)
+    if w is not None or h is not None or format is not None:
+        return await image_service.get_derivative(pokemon_name, image_index, w, h, format, request.headers)
+    return await image_service.get_image(pokemon_name, image_index, request.headers)
+
+@app.get("/metrics")
+async def metrics():
+    """Exposición Prometheus: peticiones y latencias, cachés, logging y proceso"""
+    lines = []
+    monitor.metrics.render(lines)
+    prometheus.render_family(
+        lines, "pokemon_monitor_events_total", "counter", "Cache and service events counted by the monitor.",
+        [({"module": module, "event": counter}, value) for (module, counter), value in sorted(monitor.counters.items())]
+    )
+    image_cache = image_service.cache_stats()
+    prometheus.render_family(lines, "pokemon_image_memory_cache_bytes", "gauge",
+                             "Bytes held by the in-memory image cache.", [({}, image_cache["memory_bytes"])])
+    prometheus.render_family(lines, "pokemon_image_memory_cache_entries", "gauge",
+                             "Images held by the in-memory image cache.", [({}, image_cache["memory_entries"])])
+    prometheus.render_family(lines, "pokemon_pokeapi_cache_entries", "gauge",
+                             "Pokemon held by the PokeAPI response cache.", [({}, len(PokeAPIService.cache))])
+    resilience = monitor.get_resilience()
+    breakers = [(name, stats) for name, stats in resilience.items() if "state" in stats]
+    bulkheads = [(name, stats) for name, stats in resilience.items() if "in_flight" in stats]
+    prometheus.render_family(lines, "pokemon_circuit_breaker_state", "gauge",
+                             "Circuit breaker state (1 for the current state).",
+                             [({"name": name, "state": state}, int(stats["state"] == state))
+                              for name, stats in breakers for state in ("closed", "open", "half_open")])
+    prometheus.render_family(lines, "pokemon_bulkhead_in_flight", "gauge", "Upstream calls in flight.",
+                             [({"name": name}, stats["in_flight"]) for name, stats in bulkheads])
+    prometheus.render_family(lines, "pokemon_bulkhead_rejected_total", "counter",
+                             "Upstream calls rejected because the bulkhead was full.",
+                             [({"name": name}, stats["rejected"]) for name, stats in bulkheads])
+    pipeline = get_pipeline()
+    if pipeline is not None:
+        stats = pipeline.stats()
+        prometheus.render_family(lines, "pokemon_log_records_total", "counter", "Log records by outcome.",
+                                 [({"outcome": "written"}, stats["written"]), ({"outcome": "dropped"}, stats["dropped"])])
+        prometheus.render_family(lines, "pokemon_log_queue_depth", "gauge", "Log records waiting to be written.",
+                                 [({}, stats["queued"])])
+    prometheus.render_process(lines)
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=prometheus.CONTENT_TYPE)
 
 # Bot commands endpoints
 @app.get("/bot/CheckLatency")
-async def check_latency(module: str, start_date: str, end_date: str):
+async def check_latency(module: str, start_date: str, end_date: str, api: Optional[str] = None,
+                        include_histogram: bool = False):
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
-        latency = monitor.get_latency(module, start, end)
-        return {"module": module, "start_date": start_date, "end_date": end_date, "latency_ms": latency}
+        histogram = monitor.get_latency_histogram(module, start, end, api)
+        response = {"module": module, "start_date": start_date, "end_date": end_date,
+                    "latency_ms": histogram.mean, **{k: v for k, v in histogram.summary().items() if k != "mean"}}
+        if include_histogram:
+            # Histograma serializado para combinarlo con el de otros workers
+            response["histogram"] = histogram.to_dict()
+        return response
     except Exception as e:
         return {"error": str(e)}
 
@@ -62,15 +208,65 @@ async def check_availability(module: str, days: int):
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/bot/CheckCache")
+async def check_cache(module: Optional[str] = None):
+    """Contadores de caché (hit/miss/stale/coalesced) por módulo"""
+    return {"counters": monitor.get_counters(module), "image_cache": image_service.cache_stats()}
+
+@app.get("/bot/CheckResilience")
+async def check_resilience():
+    """Estado de los circuit breakers y bulkheads, y contadores de fallback/cobertura de PokeAPI"""
+    counters = monitor.get_counters("PokeAPI").get("PokeAPI", {})
+    return {
+        "components": monitor.get_resilience(),
+        "counters": {name: value for name, value in counters.items()
+                     if name.startswith(("breaker_", "bulkhead_", "fallback_", "hedge_"))},
+    }
+
+@app.get("/bot/CheckLogging")
+async def check_logging():
+    """Estado de la cola de logs (escritos, descartados, lotes, rotaciones) y de los segmentos estructurados"""
+    pipeline = get_pipeline()
+    return {
+        "mode": config.LOG_MODE,
+        "pipeline": pipeline.stats() if pipeline is not None else None,
+        "segments": segment_stats(config.LOG_SEGMENT_DIR) if config.LOG_STRUCTURED else None,
+    }
+
 @app.get("/bot/RenderGraph")
-async def render_graph(metric: str, module: str, days: int):
+async def render_graph(module: str, metric: str = "latency", days: int = 1, resolution: str = "day",
+                       width: int = 60, height: int = 10, series: Optional[str] = None,
+                       api: Optional[str] = None, hours: Optional[int] = None, format: str = "json"):
+    """
+    Gráfica ASCII de latencia (p50/p95/p99...) y/o disponibilidad por minuto,
+    hora o día; series="p50,p99,availability" elige las series a dibujar
+    """
     try:
-        # This would be more complex in a real implementation
-        if metric.lower() == "latency":
-            return {"message": "ASCII graph would be rendered here for latency"}
-        elif metric.lower() == "availability":
-            return {"message": "ASCII graph would be rendered here for availability"}
-        else:
-            return {"error": "Invalid metric"}
+        result = graph_service.render(module, metric, days, resolution, width, height, series, api, hours)
+        if format == "text":
+            return PlainTextResponse(result["graph"])
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+@app.get("/debug/traces")
+async def list_traces(limit: int = 50, min_ms: Optional[float] = None, path: Optional[str] = None):
+    """Trazas guardadas (más recientes primero), filtrables por duración mínima y prefijo de ruta"""
+    return {
+        "enabled": config.TRACING_ENABLED,
+        "sample_rate": trace_buffer.sample_rate,
+        "slow_ms": trace_buffer.slow_ms,
+        "seen": trace_buffer.seen,
+        "kept": trace_buffer.kept,
+        "traces": trace_buffer.query(max(1, min(limit, config.TRACE_BUFFER_SIZE)), min_ms, path),
+    }
+
+@app.get("/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Detalle de una traza: tramos anidados con desplazamiento y duración (ms)"""
+    trace = trace_buffer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
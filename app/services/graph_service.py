@@ -0,0 +1,111 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from fastapi import HTTPException
+from ..utils.ascii_graph import lttb, render_panel, time_axis
+from ..utils.logger import CustomLogger
+from ..utils.metrics_store import MINUTE, HOUR, DAY
+from ..utils.monitoring import monitor
+from .. import config
+
+logger = CustomLogger("BotGraph")
+
+RESOLUTIONS = {"minute": MINUTE, "hour": HOUR, "day": DAY}
+LATENCY_SERIES = ("mean", "p50", "p90", "p95", "p99", "max")
+# metric -> series por defecto
+METRIC_SERIES = {
+    "latency": ("p50", "p95", "p99"),
+    "availability": ("availability",),
+    "all": ("p50", "p95", "p99", "availability"),
+}
+
+
+class GraphService:
+    """
+    Gráficas ASCII de latencia (percentiles) y disponibilidad a partir de las
+    series del monitor. Las renderizadas se cachean por consulta y por una
+    marca de datos (bucket actual, minuto actual y peticiones registradas):
+    repetir la consulta sin peticiones nuevas no recalcula nada, y el bucket
+    abierto nunca se muestra con más de un minuto de retraso.
+    """
+
+    def __init__(self, max_entries=config.GRAPH_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def parse_series(metric, series):
+        if series:
+            names = tuple(name.strip().lower() for name in series.split(",") if name.strip())
+        else:
+            names = METRIC_SERIES.get(metric.lower())
+            if names is None:
+                raise HTTPException(status_code=400, detail=f"Invalid metric: {metric}")
+        unknown = [name for name in names if name not in LATENCY_SERIES and name != "availability"]
+        if unknown or not names:
+            raise HTTPException(status_code=400, detail=f"Invalid series: {', '.join(unknown) or series}")
+        return names
+
+    def render(self, module, metric="latency", days=1, resolution="day", width=60, height=10,
+               series=None, api=None, hours=None):
+        step = RESOLUTIONS.get(resolution.lower())
+        if step is None:
+            raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RESOLUTIONS)}")
+        if not 10 <= width <= 400 or not 3 <= height <= 100:
+            raise HTTPException(status_code=400, detail="width must be 10-400 and height 3-100")
+        names = self.parse_series(metric, series)
+
+        now = time.time()
+        # Inicio del bucket en curso (abierto: la gráfica lo incluye)
+        watermark = int(now) - int(now) % step
+        # El minuto cubre las peticiones de otros workers que llegan por los rollups compartidos
+        data_mark = (watermark, int(now) // MINUTE, monitor.store.writes)
+        key = (module, api, names, step, days, hours, width, height)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == data_mark:
+                self._cache.move_to_end(key)
+                monitor.increment("BotGraph", "render_cache_hit")
+                return cached[1]
+
+        start_time = logger.log("graph", "render", f"Rendering {','.join(names)} for {module}")
+        end = watermark + step
+        start = end - (hours * 3600 if hours else days * 86400)
+        result = self._render(module, api, names, step, start, end, width, height)
+        monitor.increment("BotGraph", "render_cache_miss")
+        logger.log("graph", "render", f"Rendered {result['points']} points", start_time)
+
+        with self._lock:
+            self._cache[key] = (data_mark, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def _render(self, module, api, names, step, start, end, width, height):
+        points = monitor.get_series(module, step, start, end, api)
+        series = {}
+        for name in names:
+            values = [(t, point[name]) for t, point in points if point[name] is not None]
+            # Más puntos que columnas: reducir conservando la forma
+            series[name] = lttb(values, width)
+
+        title = f"{module}{f' ({api})' if api else ''} - {len(points)} buckets"
+        lines = [title]
+        latency = [(name, series[name]) for name in names if name in LATENCY_SERIES]
+        if latency:
+            lines += render_panel("Latency", latency, start, end - step, width, height, "ms")
+        if "availability" in series:
+            lines += render_panel("Availability", [("availability", series["availability"])],
+                                  start, end - step, width, height, "%")
+        lines.append(" " * 2 + time_axis(start, end - step, width, step))
+        return {
+            "module": module,
+            "resolution": step,
+            "start": start,
+            "end": end,
+            "points": len(points),
+            "graph": "\n".join(lines),
+            "series": {name: [[t, round(value, 3)] for t, value in values] for name, values in series.items()},
+        }
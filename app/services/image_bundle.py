@@ -0,0 +1,46 @@
+import io
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Destino no 'seekable' para ZipFile: acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(files, chunk_size=CHUNK_SIZE):
+    """
+    Genera un ZIP sin compresión (las imágenes ya lo están) a partir de pares
+    (nombre en el archivo, ruta), leyendo por bloques: la memoria usada es del
+    orden de chunk_size, no del tamaño total.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, path in files:
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime(path.stat().st_mtime)[:6])
+            with open(path, mode='rb') as source, archive.open(info, mode="w") as target:
+                for chunk in iter(lambda: source.read(chunk_size), b""):
+                    target.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import io
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from threading import Lock
+from starlette.concurrency import run_in_threadpool
+
+# formato pedido -> (formato de Pillow, media type, extensión)
+SUPPORTED_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "jpg": ("JPEG", "image/jpeg", "jpg"),
+    "webp": ("WEBP", "image/webp", "webp"),
+}
+MAX_DIMENSION = 2048
+
+
+def derivative_key(etag, width, height, fmt, quality):
+    """Clave por contenido: mismo original + mismos parámetros -> mismo derivado"""
+    raw = f"{etag}|{width or 0}x{height or 0}|{SUPPORTED_FORMATS[fmt][0]}|{quality}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def encode_derivative(source_path, width, height, fmt, quality):
+    """
+    Redimensiona (sin ampliar, manteniendo proporción) y codifica una imagen.
+    Se ejecuta en un proceso del pool, fuera del event loop.
+    """
+    from PIL import Image
+
+    with Image.open(source_path) as image:
+        image = image.convert("RGB")
+        image.thumbnail((width or MAX_DIMENSION * 4, height or MAX_DIMENSION * 4), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format=SUPPORTED_FORMATS[fmt][0], quality=quality, optimize=True)
+        return output.getvalue()
+
+
+def _write_atomic(path, data):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_derivative(source_path, target_path, width, height, fmt, quality):
+    """Codifica y escribe el derivado en disco (todo dentro del proceso del pool)"""
+    return _write_atomic(target_path, encode_derivative(source_path, width, height, fmt, quality))
+
+
+class DerivativeCache:
+    """
+    Caché en disco direccionada por contenido: <dir>/<k[:2]>/<k>.<ext>.
+    Con max_bytes se acota el tamaño total: al superarlo se borran los
+    derivados menos usados (el índice se carga del disco en el primer uso).
+    """
+
+    def __init__(self, base_path, max_bytes=None):
+        self.base_path = Path(base_path)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evicted = 0
+        # Derivados en disco (clave -> (ruta, bytes)) en orden de uso; acotado junto con el disco
+        self._known = OrderedDict()
+        self._loaded = False
+        self._lock = Lock()
+
+    def path_for(self, key, fmt):
+        return self.base_path / key[:2] / f"{key}.{SUPPORTED_FORMATS[fmt][2]}"
+
+    def load(self):
+        """Carga el índice si no está cargado (al arrancar, para no hacerlo en la primera petición)"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+    def _load(self):
+        """Indexa los derivados ya generados (los más antiguos primero)"""
+        self._loaded = True
+        if not self.base_path.is_dir():
+            return
+        files = []
+        for path in self.base_path.glob("??/*.*"):
+            if path.name.endswith(".tmp"):
+                continue
+            try:
+                stat_result = path.stat()
+            except OSError:
+                continue
+            files.append((stat_result.st_mtime, path.stem, path, stat_result.st_size))
+        for _, key, path, size in sorted(files):
+            self._add(key, path, size)
+        self._evict()
+
+    def _add(self, key, path, size):
+        previous = self._known.pop(key, None)
+        if previous is not None:
+            self.size -= previous[1]
+        self._known[key] = (path, size)
+        self.size += size
+
+    def _evict(self):
+        # Siempre se conserva el último (el que se acaba de pedir o generar)
+        while self.max_bytes is not None and self.size > self.max_bytes and len(self._known) > 1:
+            _, (path, size) = self._known.popitem(last=False)
+            self.size -= size
+            self.evicted += 1
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def get(self, key, fmt):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._known.get(key)
+            if entry is not None:
+                self._known.move_to_end(key)
+                path = entry[0]
+            else:
+                path = self.path_for(key, fmt)
+            try:
+                # Puede haberlo borrado otro worker al expulsar, o generado la herramienta offline
+                size = path.stat().st_size
+            except OSError:
+                if entry is not None:
+                    self._known.pop(key)
+                    self.size -= entry[1]
+                return None
+            if entry is None:
+                self._add(key, path, size)
+                self._evict()
+            return path
+
+    def remember(self, key, path):
+        path = Path(path)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._add(key, path, path.stat().st_size)
+            self._evict()
+
+    def stats(self):
+        return {"entries": len(self._known), "bytes": self.size, "max_bytes": self.max_bytes,
+                "evicted": self.evicted}
+
+
+class DerivativeEncoder:
+    """Pool de procesos para codificar derivados; una sola codificación por clave a la vez"""
+
+    def __init__(self, cache, workers):
+        self.cache = cache
+        self.workers = workers
+        self._pool = None
+        self._inflight = {}
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def get_or_encode(self, key, source_path, width, height, fmt, quality):
+        """Devuelve (ruta, codificado_ahora)"""
+        # Índice, stat y borrados de la caché en disco: fuera del event loop
+        path = await run_in_threadpool(self.cache.get, key, fmt)
+        if path is not None:
+            return path, False
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._encode(key, source_path, width, height, fmt, quality))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), True
+
+    async def _encode(self, key, source_path, width, height, fmt, quality):
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(self._get_pool(), write_derivative, str(source_path),
+                                          str(self.cache.path_for(key, fmt)), width, height, fmt, quality)
+        await run_in_threadpool(self.cache.remember, key, path)
+        return path
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
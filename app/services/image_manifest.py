@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+
+class ImageFolder:
+    """Carpeta de imágenes de un Pokémon: nombre real en disco e imágenes ordenadas"""
+
+    __slots__ = ("name", "path", "mtime_ns", "images", "stats", "etags")
+
+    def __init__(self, name, path, mtime_ns, images, stats, etags):
+        self.name = name
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.images = images
+        # nombre de fichero -> os.stat_result (FileResponse no necesita volver a hacer stat)
+        self.stats = stats
+        # nombre de fichero -> hash del contenido (ETag fuerte)
+        self.etags = etags
+
+
+class ImageManifest:
+    """
+    Índice en memoria de images/: clave sin mayúsculas -> ImageFolder.
+    Las consultas no tocan el sistema de ficheros; un hilo en segundo plano
+    compara periódicamente (tamaño, mtime) de cada imagen y vuelve a calcular
+    el hash solo de las que cambiaron (sobrescribir un fichero no cambia el
+    mtime de su carpeta). El primer escaneo se hace en refresh() o, si nadie
+    lo ha llamado, en la primera consulta.
+    """
+
+    def __init__(self, base_path, pattern="*.jpg"):
+        self.base_path = Path(base_path)
+        self.pattern = pattern
+        self._folders = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._loaded = False
+
+    @staticmethod
+    def key(name):
+        return name.lower()
+
+    @staticmethod
+    def content_hash(path):
+        with open(path, mode='rb') as file:
+            return hashlib.file_digest(file, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+
+    def _scan_folder(self, entry, known=None):
+        """ImageFolder actualizado; devuelve `known` tal cual si ninguna imagen cambió"""
+        images = {}
+        etags = {}
+        changed = known is None or known.name != entry.name
+        for image in Path(entry.path).glob(self.pattern):
+            stat_result = image.stat()
+            images[image.name] = stat_result
+            previous = known.stats.get(image.name) if known is not None else None
+            if previous is not None and (previous.st_size, previous.st_mtime_ns) == \
+                    (stat_result.st_size, stat_result.st_mtime_ns):
+                etags[image.name] = known.etags[image.name]
+            else:
+                etags[image.name] = self.content_hash(image)
+                changed = True
+        if not changed and len(images) == len(known.stats):
+            return known
+        return ImageFolder(entry.name, Path(entry.path), entry.stat().st_mtime_ns,
+                           tuple(sorted(images)), images, etags)
+
+    def refresh(self):
+        """Sincroniza el índice con el disco; devuelve el número de carpetas re-escaneadas"""
+        with self._lock:
+            if not self.base_path.exists():
+                self._folders = {}
+                return 0
+            current = self._folders
+            folders = {}
+            rescanned = 0
+            with os.scandir(self.base_path) as entries:
+                for entry in entries:
+                    if not entry.is_dir():
+                        continue
+                    key = self.key(entry.name)
+                    known = current.get(key)
+                    folders[key] = self._scan_folder(entry, known)
+                    if folders[key] is not known:
+                        rescanned += 1
+            # Sustitución atómica: los lectores nunca ven un índice a medias
+            self._folders = folders
+            self._loaded = True
+            return rescanned
+
+    def start_watcher(self, interval):
+        """Inicia el hilo de refresco periódico (idempotente)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(interval,),
+                                        name="image-manifest", daemon=True)
+        self._thread.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except OSError:
+                # El directorio puede estar cambiando; se reintenta en el siguiente ciclo
+                pass
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.refresh()
+
+    def get(self, name):
+        self._ensure_loaded()
+        return self._folders.get(self.key(name))
+
+    def folders(self):
+        self._ensure_loaded()
+        return sorted(folder.name for folder in self._folders.values())
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._folders)
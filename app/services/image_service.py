@@ -1,49 +1,273 @@
+import asyncio
+import logging
+import re
 from fastapi import HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
+from urllib.parse import quote
 from ..utils.logger import CustomLogger
 from ..utils.monitoring import monitor
+from ..utils.cache import ByteLRUCache
+from ..utils import tracing
+from .image_manifest import ImageManifest
+from .image_bundle import iter_zip
+from .image_derivatives import (DerivativeCache, DerivativeEncoder, SUPPORTED_FORMATS,
+                                MAX_DIMENSION, derivative_key)
+from .. import config
 
 logger = CustomLogger("PokeImages")
+# Único rango de bytes válido: 'bytes=inicio-fin', 'bytes=inicio-' o 'bytes=-sufijo'
+BYTE_RANGE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
 
 class ImageService:
     BASE_PATH = Path("images")
-    
-    def get_image(self, pokemon_name: str, image_index: int = 0):
-        """Obtiene una imagen específica o la primera por defecto"""
+
+    # Índice compartido de images/ (nombre sin mayúsculas -> imágenes ordenadas)
+    _manifest = None
+    # Bytes de las imágenes más pedidas, indexados por ETag (contenido)
+    memory_cache = ByteLRUCache(config.IMAGE_MEMORY_CACHE_BYTES, config.IMAGE_MEMORY_CACHE_MAX_ITEM)
+    # Miniaturas: caché en disco por contenido + pool de procesos para codificar
+    derivatives = DerivativeEncoder(DerivativeCache(config.IMAGE_DERIVATIVE_DIR, config.IMAGE_DERIVATIVE_CACHE_BYTES),
+                                    config.IMAGE_ENCODER_WORKERS)
+
+    @classmethod
+    def get_manifest(cls):
+        if cls._manifest is None:
+            cls._manifest = ImageManifest(cls.BASE_PATH)
+        return cls._manifest
+
+    def list_folders(self):
+        """Nombres de las carpetas de imágenes disponibles"""
+        return self.get_manifest().folders()
+
+    def get_folder(self, pokemon_name: str):
+        """Carpeta del índice para un nombre (sin distinguir mayúsculas) o None"""
+        return self.get_manifest().get(pokemon_name)
+
+    @staticmethod
+    def _etag_matches(if_none_match, etag):
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return etag in candidates or f"W/{etag}" in candidates
+
+    @staticmethod
+    def _content_disposition(filename):
+        """Adjunto con nombre ASCII de reserva y el nombre real en UTF-8 (RFC 6266)"""
+        fallback = "".join(char if 32 <= ord(char) < 127 and char not in '"\\' else "_" for char in filename)
+        return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+    @staticmethod
+    def _byte_range(range_header, size):
+        """
+        Rango único 'bytes=a-b' -> (inicio, fin exclusivo); None si se ignora (mal
+        formado o múltiple, RFC 9110: se responde 200 completo), ValueError si no es satisfacible
+        """
+        match = BYTE_RANGE.match(range_header)
+        if match is None:
+            return None
+        start, end = match.groups()
+        if not start:
+            if not end:
+                return None
+            length = int(end)
+            if length == 0:
+                raise ValueError("Range not satisfiable")
+            return max(size - length, 0), size
+        start = int(start)
+        end = min(int(end) + 1, size) if end else size
+        if start >= size or start >= end:
+            raise ValueError("Range not satisfiable")
+        return start, end
+
+    def _memory_response(self, data, headers, request_headers):
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range == headers["ETag"]):
+            try:
+                byte_range = self._byte_range(range_header, len(data))
+            except ValueError:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{len(data)}"})
+            if byte_range is not None:
+                start, end = byte_range
+                return Response(data[start:end], status_code=206, media_type="image/jpeg",
+                                headers={**headers, "Content-Range": f"bytes {start}-{end - 1}/{len(data)}"})
+        return Response(data, media_type="image/jpeg", headers=headers)
+
+    def cache_stats(self):
+        """Ratio de aciertos de la caché en memoria y bytes ahorrados"""
+        counters = monitor.get_counters("PokeImages").get("PokeImages", {})
+        hits = counters.get("memory_hit", 0)
+        lookups = hits + counters.get("memory_miss", 0)
+        return {
+            "memory_entries": len(self.memory_cache),
+            "memory_bytes": self.memory_cache.size,
+            "memory_hit_ratio": hits / lookups if lookups else None,
+            "not_modified": counters.get("not_modified", 0),
+            "bytes_saved_not_modified": counters.get("bytes_saved_not_modified", 0),
+            "bytes_served_from_memory": counters.get("bytes_served_from_memory", 0),
+            "derivatives": self.derivatives.cache.stats(),
+        }
+
+    @tracing.traced("images.get_image")
+    async def get_image(self, pokemon_name: str, image_index: int = 0, request_headers=None):
+        """Obtiene una imagen específica o la primera por defecto (con ETag, 304, Range y caché en memoria)"""
         start_time = logger.log("images", "get_image", f"Fetching image {image_index} for {pokemon_name}")
         try:
-            pokemon_folder = self.BASE_PATH / pokemon_name.lower()
-            if not pokemon_folder.exists():
+            folder = self.get_folder(pokemon_name)
+            if folder is None:
                 monitor.log_request("PokeImages", "get_image", 404, 0)
                 raise HTTPException(status_code=404, detail="Pokemon folder not found")
-            
-            image_path = pokemon_folder / f"{image_index}.jpg"
-            if not image_path.exists():
+
+            image_name = f"{image_index}.jpg"
+            stat_result = folder.stats.get(image_name)
+            if stat_result is None:
                 monitor.log_request("PokeImages", "get_image", 404, 0)
                 raise HTTPException(status_code=404, detail=f"Image {image_index}.jpg not found")
-            
-            monitor.log_request("PokeImages", "get_image", 200, 
-                             int((logger.log("images", "get_image", "Image found", start_time) - start_time) * 1000))
-            return FileResponse(image_path)
+
+            request_headers = request_headers or {}
+            etag = f'"{folder.etags[image_name]}"'
+            headers = {
+                "ETag": etag,
+                "Cache-Control": f"public, max-age={config.IMAGE_CACHE_MAX_AGE}, immutable",
+                "Accept-Ranges": "bytes",
+            }
+
+            # Petición condicional: el cliente ya tiene este contenido
+            if_none_match = request_headers.get("if-none-match")
+            if if_none_match and self._etag_matches(if_none_match, etag):
+                monitor.increment("PokeImages", "not_modified")
+                monitor.increment("PokeImages", "bytes_saved_not_modified", stat_result.st_size)
+                monitor.log_request("PokeImages", "get_image", 304,
+                                 round((logger.log("images", "get_image", "Not modified", start_time) - start_time) * 1000, 3))
+                return Response(status_code=304, headers=headers)
+
+            data = self.memory_cache.get(etag)
+            if data is None:
+                monitor.increment("PokeImages", "memory_miss")
+                if stat_result.st_size <= self.memory_cache.max_item_bytes:
+                    with tracing.span("images.read", bytes=stat_result.st_size):
+                        data = await run_in_threadpool((folder.path / image_name).read_bytes)
+                    self.memory_cache.set(etag, data)
+            else:
+                monitor.increment("PokeImages", "memory_hit")
+                monitor.increment("PokeImages", "bytes_served_from_memory", len(data))
+
+            monitor.log_request("PokeImages", "get_image", 200,
+                             round((logger.log("images", "get_image", "Image found", start_time) - start_time) * 1000, 3))
+            if data is not None:
+                return self._memory_response(data, headers, request_headers)
+            return FileResponse(folder.path / image_name, stat_result=stat_result, headers=headers)
+        except HTTPException:
+            raise
         except Exception as e:
             monitor.log_request("PokeImages", "get_image", 500, 0)
-            logger.log("images", "get_image", f"Error: {str(e)}")
+            logger.log("images", "get_image", f"Error: {str(e)}", level=logging.ERROR)
             raise HTTPException(status_code=500, detail=str(e))
-    
+
+    @staticmethod
+    def validate_derivative(width, height, fmt):
+        """Normaliza w/h/format; lanza 400 si no son válidos"""
+        fmt = (fmt or "jpeg").lower()
+        if fmt not in SUPPORTED_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+        for value in (width, height):
+            if value is not None and not 1 <= value <= MAX_DIMENSION:
+                raise HTTPException(status_code=400, detail=f"w and h must be between 1 and {MAX_DIMENSION}")
+        return width, height, fmt
+
+    @tracing.traced("images.get_derivative")
+    async def get_derivative(self, pokemon_name: str, image_index: int, width=None, height=None,
+                             fmt=None, request_headers=None):
+        """Imagen redimensionada/recodificada; se codifica una sola vez y se sirve desde disco"""
+        start_time = logger.log("images", "get_derivative", f"Derivative {image_index} for {pokemon_name}")
+        width, height, fmt = self.validate_derivative(width, height, fmt)
+        folder = self.get_folder(pokemon_name)
+        image_name = f"{image_index}.jpg"
+        if folder is None or image_name not in folder.stats:
+            monitor.log_request("PokeImages", "get_derivative", 404, 0)
+            raise HTTPException(status_code=404, detail=f"Image {image_index}.jpg not found")
+
+        quality = config.IMAGE_DERIVATIVE_QUALITY
+        key = derivative_key(folder.etags[image_name], width, height, fmt, quality)
+        headers = {
+            "ETag": f'"{key}"',
+            "Cache-Control": f"public, max-age={config.IMAGE_CACHE_MAX_AGE}, immutable",
+        }
+        if_none_match = (request_headers or {}).get("if-none-match")
+        if if_none_match and self._etag_matches(if_none_match, headers["ETag"]):
+            monitor.increment("PokeImages", "not_modified")
+            monitor.log_request("PokeImages", "get_derivative", 304, 0)
+            return Response(status_code=304, headers=headers)
+
+        try:
+            with tracing.span("images.encode"):
+                path, encoded = await self.derivatives.get_or_encode(key, folder.path / image_name,
+                                                                     width, height, fmt, quality)
+                tracing.annotate(encoded=encoded)
+        except Exception as e:
+            monitor.log_request("PokeImages", "get_derivative", 500, 0)
+            logger.log("images", "get_derivative", f"Error: {str(e)}", level=logging.ERROR)
+            raise HTTPException(status_code=500, detail=str(e))
+        monitor.increment("PokeImages", "derivative_encoded" if encoded else "derivative_hit")
+        monitor.log_request("PokeImages", "get_derivative", 200,
+                         round((logger.log("images", "get_derivative", "Derivative ready", start_time) - start_time) * 1000, 3))
+        return FileResponse(path, media_type=SUPPORTED_FORMATS[fmt][1], headers=headers)
+
+    @tracing.traced("images.get_bundle")
+    async def get_bundle(self, pokemon_name: str, indexes=None, width=None, height=None, fmt=None):
+        """Todas las imágenes (o un subconjunto) en un único ZIP transmitido por bloques"""
+        start_time = logger.log("images", "get_bundle", f"Bundling images for {pokemon_name}")
+        folder = self.get_folder(pokemon_name)
+        if folder is None:
+            monitor.log_request("PokeImages", "get_bundle", 404, 0)
+            raise HTTPException(status_code=404, detail="Pokemon folder not found")
+
+        if indexes is None:
+            image_names = list(folder.images)
+        else:
+            # Sin duplicados (dos entradas con el mismo nombre en el ZIP), conservando el orden
+            image_names = [f"{index}.jpg" for index in dict.fromkeys(indexes)]
+            missing = [name for name in image_names if name not in folder.stats]
+            if missing:
+                monitor.log_request("PokeImages", "get_bundle", 404, 0)
+                raise HTTPException(status_code=404, detail=f"Images not found: {', '.join(missing)}")
+
+        files = [(name, folder.path / name) for name in image_names]
+        if width is not None or height is not None or fmt is not None:
+            # Los derivados se generan (o se reutilizan) antes de empezar a transmitir
+            width, height, fmt = self.validate_derivative(width, height, fmt)
+            quality = config.IMAGE_DERIVATIVE_QUALITY
+            extension = SUPPORTED_FORMATS[fmt][2]
+            paths = await asyncio.gather(*(
+                self.derivatives.get_or_encode(derivative_key(folder.etags[name], width, height, fmt, quality),
+                                               path, width, height, fmt, quality)
+                for name, path in files
+            ))
+            files = [(f"{Path(name).stem}.{extension}", path) for (name, _), (path, _) in zip(files, paths)]
+
+        # Generador síncrono: Starlette lo recorre en el threadpool, fuera del event loop
+        response = StreamingResponse(iter_zip(files), media_type="application/zip",
+                                     headers={"Content-Disposition": self._content_disposition(f"{folder.name}.zip")})
+        monitor.log_request("PokeImages", "get_bundle", 200,
+                         round((logger.log("images", "get_bundle", f"{len(files)} images", start_time) - start_time) * 1000, 3))
+        return response
+
+    @tracing.traced("images.list")
     def get_all_images(self, pokemon_name: str):
         """Lista todas las imágenes disponibles"""
         start_time = logger.log("images", "get_all_images", f"Listing images for {pokemon_name}")
         try:
-            pokemon_folder = self.BASE_PATH / pokemon_name.lower()
-            if not pokemon_folder.exists():
+            folder = self.get_folder(pokemon_name)
+            if folder is None:
                 return []
-            
-            images = sorted([img.name for img in pokemon_folder.glob("*.jpg")])
+
+            images = list(folder.images)
             monitor.log_request("PokeImages", "get_all_images", 200,
-                             int((logger.log("images", "get_all_images", "Images listed", start_time) - start_time) * 1000))
+                             round((logger.log("images", "get_all_images", "Images listed", start_time) - start_time) * 1000, 3))
             return images
         except Exception as e:
             monitor.log_request("PokeImages", "get_all_images", 500, 0)
-            logger.log("images", "get_all_images", f"Error: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+            logger.log("images", "get_all_images", f"Error: {str(e)}", level=logging.ERROR)
+            raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,155 @@
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+
+def normalize_name(name):
+    """'Mr. Mime' -> 'mrmime', 'Flabébé' -> 'flabebe'"""
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    return "".join(c for c in decomposed.lower() if c.isascii() and c.isalnum())
+
+
+def _trigrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, max_distance):
+    """Distancia de Damerau-Levenshtein (OSA) acotada; devuelve max_distance + 1 si se supera"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class NameEntry:
+    """Pokémon conocido localmente: nombre en stats, número y carpeta de imágenes"""
+
+    __slots__ = ("name", "id", "folder")
+
+    def __init__(self, name, id=None, folder=None):
+        self.name = name
+        self.id = id
+        self.folder = folder
+
+    def to_dict(self):
+        return {"name": self.name, "id": self.id, "folder": self.folder}
+
+
+class NameIndex:
+    """
+    Índice local de nombres para autocompletado y búsqueda aproximada:
+    - prefijos: claves normalizadas ordenadas + búsqueda binaria
+    - errores tipográficos: índice de trigramas + distancia de edición acotada
+    """
+
+    def __init__(self, stats_rows, folders):
+        """
+        - stats_rows: pares (id, nombre) del CSV de stats, en orden (la forma base primero)
+        - folders: nombres de carpetas en images/
+        """
+        folder_by_key = {normalize_name(folder): folder for folder in folders}
+        self.entries = []
+        self._by_key = {}
+        self._by_id = {}
+        base_by_id = {}
+        for pokemon_id, name in stats_rows:
+            key = normalize_name(name)
+            base = base_by_id.setdefault(pokemon_id, name)
+            folder = folder_by_key.get(key) or folder_by_key.get(normalize_name(base))
+            entry = self._add(key, NameEntry(name, pokemon_id, folder))
+            if entry is not None:
+                self._by_id.setdefault(pokemon_id, entry)
+            if entry is not None and name != base and name.startswith(base):
+                # 'VenusaurMega Venusaur' también responde a 'Mega Venusaur'
+                self._by_key.setdefault(normalize_name(name[len(base):]), entry)
+        for key, folder in folder_by_key.items():
+            if key and key not in self._by_key:
+                self._add(key, NameEntry(folder, None, folder))
+
+        self._keys = sorted(self._by_key)
+        self._grams = defaultdict(list)
+        for key in self._keys:
+            for gram in _trigrams(key):
+                self._grams[gram].append(key)
+
+    def _add(self, key, entry):
+        if not key or key in self._by_key:
+            return None
+        self._by_key[key] = entry
+        self.entries.append(entry)
+        return entry
+
+    def _prefix(self, key, limit):
+        start = bisect_left(self._keys, key)
+        matches = []
+        for candidate in self._keys[start:]:
+            if not candidate.startswith(key):
+                break
+            matches.append(candidate)
+        # Los nombres más cortos (formas base) primero
+        matches.sort(key=len)
+        return matches[:limit]
+
+    def _fuzzy(self, key, max_distance, limit):
+        counts = defaultdict(int)
+        for gram in _trigrams(key):
+            for candidate in self._grams.get(gram, ()):
+                counts[candidate] += 1
+        # Solo se verifica la distancia de los candidatos con más trigramas en común
+        candidates = sorted(counts, key=lambda c: -counts[c])[:50]
+        scored = []
+        for candidate in candidates:
+            distance = edit_distance(key, candidate, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, -counts[candidate], len(candidate), candidate))
+        scored.sort()
+        return [candidate for *_, candidate in scored[:limit]]
+
+    @staticmethod
+    def _max_distance(key):
+        return 1 if len(key) <= 5 else 2 if len(key) <= 10 else 3
+
+    def resolve(self, query):
+        """Entrada exacta (por nombre o número) o la más parecida (None si no hay ninguna razonable)"""
+        if str(query).strip().isdigit():
+            return self._by_id.get(int(query))
+        key = normalize_name(query)
+        if not key:
+            return None
+        entry = self._by_key.get(key)
+        if entry is not None:
+            return entry
+        matches = self._fuzzy(key, self._max_distance(key), 1)
+        return self._by_key[matches[0]] if matches else None
+
+    def suggest(self, query, limit=10):
+        """Autocompletado: primero coincidencias por prefijo, luego aproximadas"""
+        key = normalize_name(query)
+        if not key:
+            return []
+        keys = self._prefix(key, limit)
+        if len(keys) < limit:
+            keys += [k for k in self._fuzzy(key, self._max_distance(key), limit) if k not in keys]
+        results = []
+        seen = set()
+        for k in keys:
+            entry = self._by_key[k]
+            if id(entry) not in seen:
+                seen.add(id(entry))
+                results.append(entry)
+        return results[:limit]
@@ -1,36 +1,348 @@
+import asyncio
+import logging
+import time
 import requests
+import httpx
+from requests.adapters import HTTPAdapter
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 from ..utils.logger import CustomLogger
 from ..utils.monitoring import monitor
+from ..utils import tracing
+from ..utils.cache import TTLCache, FRESH, STALE, normalize_identifier
+from ..utils.resilience import CircuitBreaker, Bulkhead, BulkheadFull, HedgePolicy
 from ..models.pokemon import Pokemon
+from .pokemon_store import PokemonStore
+from .. import config
 
 logger = CustomLogger("PokeAPI")
 
+
+def _on_breaker_change(old_state, new_state):
+    monitor.increment("PokeAPI", f"breaker_{new_state}")
+    logger.log("pokeapi", "breaker", f"Circuit {old_state} -> {new_state}", level=logging.WARNING)
+
+
 class PokeAPIService:
-    BASE_URL = "https://pokeapi.co/api/v2/pokemon/"
-    
+    BASE_URL = config.POKEAPI_BASE_URL
+
+    # Clientes compartidos por todas las instancias (pool de conexiones keep-alive)
+    _session = None
+    _async_client = None
+
+    # Caché compartida y peticiones en vuelo (single-flight) por clave normalizada
+    cache = TTLCache(
+        ttl=config.POKEAPI_CACHE_TTL,
+        stale_ttl=config.POKEAPI_CACHE_STALE_TTL,
+        max_entries=config.POKEAPI_CACHE_MAX_ENTRIES
+    )
+    _inflight = {}
+
+    # Resiliencia: breaker por fallos consecutivos, tope de llamadas simultáneas y
+    # petición de cobertura cuando la primera supera el p95 reciente
+    breaker = CircuitBreaker("pokeapi", config.POKEAPI_BREAKER_FAILURES, config.POKEAPI_BREAKER_RESET,
+                             config.POKEAPI_BREAKER_PROBES, on_change=_on_breaker_change)
+    bulkhead = Bulkhead("pokeapi", config.POKEAPI_BULKHEAD_SIZE, config.POKEAPI_BULKHEAD_WAIT)
+    hedge = HedgePolicy(config.POKEAPI_HEDGE_ENABLED, config.POKEAPI_HEDGE_QUANTILE,
+                        config.POKEAPI_HEDGE_MIN_DELAY_MS, config.POKEAPI_HEDGE_MAX_DELAY_MS)
+
+    # Snapshot persistente (reinicios en caliente y modo offline)
+    _store_db = None
+    offline = config.POKEAPI_OFFLINE
+
+    @classmethod
+    def get_store(cls):
+        if cls._store_db is None and config.POKEAPI_STORE_PATH:
+            cls._store_db = PokemonStore(config.POKEAPI_STORE_PATH)
+        return cls._store_db
+
+    @classmethod
+    def _get_session(cls):
+        """Sesión síncrona con pool de conexiones reutilizable"""
+        if cls._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.POKEAPI_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            cls._session = session
+        return cls._session
+
+    @classmethod
+    def _get_async_client(cls):
+        """Cliente asíncrono compartido; se crea en el primer uso dentro del event loop"""
+        if cls._async_client is None or cls._async_client.is_closed:
+            cls._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(config.POKEAPI_TIMEOUT, connect=config.POKEAPI_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=config.POKEAPI_POOL_SIZE,
+                    max_keepalive_connections=config.POKEAPI_KEEPALIVE
+                )
+            )
+        return cls._async_client
+
+    @classmethod
+    async def aclose(cls):
+        """Cierra los clientes compartidos (al apagar la aplicación)"""
+        if cls._async_client is not None:
+            await cls._async_client.aclose()
+            cls._async_client = None
+        if cls._session is not None:
+            cls._session.close()
+            cls._session = None
+        if cls._store_db is not None:
+            cls._store_db.close()
+            cls._store_db = None
+
+    def _build_pokemon(self, pokemon_data):
+        return Pokemon(
+            id=pokemon_data['id'],
+            name=pokemon_data['name'],
+            base_experience=pokemon_data['base_experience'],
+            height=pokemon_data['height'],
+            weight=pokemon_data['weight'],
+            abilities=pokemon_data['abilities'],
+            sprites=pokemon_data['sprites']
+        )
+
+    def _handle_response(self, status_code, payload, start_time):
+        if status_code == 200:
+            pokemon = self._build_pokemon(payload())
+            monitor.log_request("PokeAPI", "get_pokemon", 200,
+                              round((logger.log("pokeapi", "get_pokemon", "Data fetched", start_time) - start_time) * 1000, 3))
+            return pokemon
+        monitor.log_request("PokeAPI", "get_pokemon", status_code, 0)
+        if status_code >= 500 or status_code == 429:
+            # Fallo de PokeAPI, no de la petición: 502 (y cuenta para el breaker)
+            raise HTTPException(status_code=502, detail=f"PokeAPI error {status_code}")
+        raise HTTPException(status_code=status_code, detail="Pokemon not found")
+
+    def _upstream_error(self, error):
+        """Error de red del cliente HTTP -> HTTPException 504 (timeout) o 502, registrado en el monitor"""
+        status_code = 504 if isinstance(error, (requests.Timeout, httpx.TimeoutException)) else 502
+        monitor.log_request("PokeAPI", "get_pokemon", status_code, 0)
+        logger.log("pokeapi", "get_pokemon", f"Error: {str(error) or type(error).__name__}", level=logging.ERROR)
+        return HTTPException(status_code=status_code,
+                             detail="PokeAPI timeout" if status_code == 504 else f"PokeAPI unavailable: {error}")
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            monitor.increment("PokeAPI", "breaker_rejected")
+            raise HTTPException(status_code=503, detail="PokeAPI circuit open")
+
+    def _record_outcome(self, status_code):
+        """5xx cuenta como fallo de PokeAPI; 2xx y 4xx (p. ej. 404) como éxito"""
+        if status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _fallback(self, key, error):
+        """
+        Si PokeAPI falla (5xx, breaker abierto, bulkhead lleno), último valor
+        conocido: caché aunque esté vencida o snapshot sin límite de edad.
+        Sin valor conocido (o con 4xx) se propaga el error.
+        """
+        if error.status_code < 500:
+            raise error
+        pokemon = self.cache.peek(key)
+        store = self.get_store()
+        if pokemon is None and store is not None:
+            pokemon = store.get(key, max_age=None)
+        if pokemon is None:
+            monitor.increment("PokeAPI", "fallback_miss")
+            raise error
+        monitor.increment("PokeAPI", "fallback_served")
+        tracing.annotate(fallback=True)
+        logger.log("pokeapi", "get_pokemon", f"Serving last known data ({error.detail})", level=logging.WARNING)
+        return pokemon
+
+    def _store(self, key, pokemon):
+        """Guarda en caché con el id como clave canónica y el nombre como alias"""
+        self.cache.set(str(pokemon.id), pokemon, aliases=(key, pokemon.name.lower()))
+
+    def _load_snapshot(self, key):
+        """Consulta el snapshot local; en modo offline es la única fuente"""
+        store = self.get_store()
+        if store is not None:
+            pokemon = store.get(key, max_age=None if self.offline else config.POKEAPI_STORE_TTL)
+            if pokemon is not None:
+                monitor.increment("PokeAPI", "store_hit")
+                return pokemon
+        if self.offline:
+            monitor.log_request("PokeAPI", "get_pokemon", 404, 0)
+            raise HTTPException(status_code=404, detail="Pokemon not found in offline snapshot")
+        return None
+
+    def _save_snapshot(self, pokemon):
+        store = self.get_store()
+        if store is not None:
+            store.put(pokemon)
+
     def get_pokemon(self, identifier):
+        """Versión síncrona (scripts y herramientas fuera del event loop)"""
+        key = normalize_identifier(identifier)
+        cached, state = self.cache.get(key)
+        if state is not None:
+            monitor.increment("PokeAPI", "cache_hit" if state == FRESH else "cache_stale")
+            return cached
+        monitor.increment("PokeAPI", "cache_miss")
+        pokemon = self._load_snapshot(key)
+        if pokemon is None:
+            try:
+                pokemon = self._fetch(key)
+            except HTTPException as he:
+                return self._fallback(key, he)
+            self._save_snapshot(pokemon)
+        self._store(key, pokemon)
+        return pokemon
+
+    def _fetch(self, identifier):
         start_time = logger.log("pokeapi", "get_pokemon", "Fetching Pokemon data")
+        self._check_breaker()
         try:
-            response = requests.get(f"{self.BASE_URL}{identifier}")
-            if response.status_code == 200:
-                pokemon_data = response.json()
-                pokemon = Pokemon(
-                    id=pokemon_data['id'],
-                    name=pokemon_data['name'],
-                    base_experience=pokemon_data['base_experience'],
-                    height=pokemon_data['height'],
-                    weight=pokemon_data['weight'],
-                    abilities=pokemon_data['abilities'],
-                    sprites=pokemon_data['sprites']
-                )
-                monitor.log_request("PokeAPI", "get_pokemon", 200, 
-                                  int((logger.log("pokeapi", "get_pokemon", "Data fetched", start_time) - start_time) * 1000))
-                return pokemon
-            else:
-                monitor.log_request("PokeAPI", "get_pokemon", response.status_code, 0)
-                raise HTTPException(status_code=response.status_code, detail="Pokemon not found")
+            response = self._get_session().get(
+                f"{self.BASE_URL}{identifier}",
+                timeout=(config.POKEAPI_CONNECT_TIMEOUT, config.POKEAPI_TIMEOUT)
+            )
+            pokemon = self._handle_response(response.status_code, response.json, start_time)
+        except HTTPException as he:
+            self._record_outcome(he.status_code)
+            raise
         except Exception as e:
-            monitor.log_request("PokeAPI", "get_pokemon", 500, 0)
-            logger.log("pokeapi", "get_pokemon", f"Error: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+            self.breaker.record_failure()
+            raise self._upstream_error(e)
+        self.breaker.record_success()
+        return pokemon
+
+    @tracing.traced("pokeapi.get")
+    async def get_pokemon_async(self, identifier):
+        """Versión no bloqueante para los endpoints async, con caché y coalescencia"""
+        key = normalize_identifier(identifier)
+        cached, state = self.cache.get(key)
+        if state == FRESH:
+            monitor.increment("PokeAPI", "cache_hit")
+            tracing.annotate(cache="hit")
+            return cached
+        if state == STALE:
+            # stale-while-revalidate: se responde ya y se refresca en segundo plano
+            monitor.increment("PokeAPI", "cache_stale")
+            tracing.annotate(cache="stale")
+            self._fetch_coalesced(key, revalidate=True)
+            return cached
+        monitor.increment("PokeAPI", "cache_miss")
+        tracing.annotate(cache="miss")
+        return await asyncio.shield(self._fetch_coalesced(key))
+
+    def _fetch_coalesced(self, key, revalidate=False):
+        """Devuelve la tarea en vuelo para la clave o crea una nueva"""
+        canonical = self.cache.resolve(key)
+        task = self._inflight.get(canonical)
+        if task is not None:
+            monitor.increment("PokeAPI", "cache_coalesced")
+            tracing.annotate(coalesced=True)
+            return task
+        task = asyncio.ensure_future(self._fetch_and_store(key, revalidate))
+        self._inflight[canonical] = task
+        task.add_done_callback(lambda t: self._on_fetch_done(canonical, t))
+        return task
+
+    def _on_fetch_done(self, canonical, task):
+        self._inflight.pop(canonical, None)
+        if not task.cancelled():
+            # Evita avisos de excepción no recuperada en refrescos en segundo plano
+            task.exception()
+
+    async def _fetch_and_store(self, key, revalidate=False):
+        pokemon = None
+        # Al revalidar una entrada caducada se va a PokeAPI: el snapshot no es más nuevo
+        # El snapshot es SQLite: lecturas y commits en el threadpool, fuera del event loop
+        if not revalidate or self.offline:
+            with tracing.span("pokeapi.snapshot"):
+                pokemon = await run_in_threadpool(self._load_snapshot, key)
+        if pokemon is None:
+            try:
+                pokemon = await self._fetch_async(key)
+            except HTTPException as he:
+                return await run_in_threadpool(self._fallback, key, he)
+            with tracing.span("pokeapi.store"):
+                await run_in_threadpool(self._save_snapshot, pokemon)
+        self._store(key, pokemon)
+        return pokemon
+
+    async def _fetch_async(self, identifier):
+        start_time = logger.log("pokeapi", "get_pokemon", "Fetching Pokemon data")
+        # Con el circuito abierto se rechaza antes de ocupar (o esperar) un hueco del bulkhead
+        self._check_breaker()
+        try:
+            await self.bulkhead.acquire()
+        except BulkheadFull:
+            self.breaker.release()
+            monitor.increment("PokeAPI", "bulkhead_rejected")
+            raise HTTPException(status_code=503, detail="PokeAPI bulkhead full")
+        except asyncio.CancelledError:
+            # acquire() ya devolvió el hueco si llegó a traspasarse; aquí solo queda la sonda
+            self.breaker.release()
+            raise
+        try:
+            started = time.perf_counter()
+            try:
+                response = await self._request_hedged(identifier)
+                pokemon = self._handle_response(response.status_code, response.json, start_time)
+            except HTTPException as he:
+                self._record_outcome(he.status_code)
+                raise
+            except asyncio.CancelledError:
+                # Sin resultado: no cuenta ni como éxito ni como fallo (el hueco se libera en finally)
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                raise self._upstream_error(e)
+            self.breaker.record_success()
+            self.hedge.observe((time.perf_counter() - started) * 1000)
+            return pokemon
+        finally:
+            self.bulkhead.release()
+
+    async def _request(self, identifier, hedged=False):
+        with tracing.span("pokeapi.http", identifier=identifier, hedged=hedged):
+            response = await self._get_async_client().get(f"{self.BASE_URL}{identifier}")
+            tracing.annotate(status=response.status_code)
+            return response
+
+    async def _request_hedged(self, identifier):
+        """
+        Si la petición tarda más que el p95 reciente y queda hueco en el bulkhead,
+        lanza una segunda y se queda con la primera respuesta válida (no 5xx).
+        """
+        delay = self.hedge.delay()
+        if delay is None:
+            return await self._request(identifier)
+        first = asyncio.ensure_future(self._request(identifier))
+        second = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done or not self.bulkhead.try_acquire():
+                return await first
+            monitor.increment("PokeAPI", "hedge_sent")
+            second = asyncio.ensure_future(self._request(identifier, hedged=True))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        if task is second:
+                            monitor.increment("PokeAPI", "hedge_won")
+                        return task.result()
+            # Ambas fallaron: se devuelve (o lanza) el resultado de la primera
+            return first.result()
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+            if second is not None:
+                self.bulkhead.release()
+
+
+monitor.register_resilience("pokeapi.breaker", PokeAPIService.breaker)
+monitor.register_resilience("pokeapi.bulkhead", PokeAPIService.bulkhead)
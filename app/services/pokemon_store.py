@@ -0,0 +1,71 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from ..models.pokemon import Pokemon
+from ..utils.cache import normalize_identifier
+
+
+class PokemonStore:
+    """
+    Snapshot persistente en SQLite de los modelos Pokemon obtenidos de PokeAPI.
+    Permite reinicios en caliente y el modo offline (sin red).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pokemon ("
+            " id INTEGER PRIMARY KEY,"
+            " name TEXT NOT NULL UNIQUE,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, identifier, max_age=None):
+        """Busca por id o por nombre; devuelve None si no existe o es más antiguo que max_age"""
+        key = normalize_identifier(identifier)
+        column = "id" if key.isdigit() else "name"
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT data, updated_at FROM pokemon WHERE {column} = ?",
+                (int(key) if key.isdigit() else key,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, updated_at = row
+        if max_age is not None and time.time() - updated_at > max_age:
+            return None
+        return Pokemon(**json.loads(data))
+
+    def put(self, pokemon):
+        self.put_many([pokemon])
+
+    def put_many(self, pokemons):
+        now = time.time()
+        rows = [(p.id, p.name.lower(), json.dumps(p.dict()), now) for p in pokemons]
+        with self._lock:
+            # Un nombre reasignado a otro id no debe violar la restricción UNIQUE
+            self._conn.executemany("DELETE FROM pokemon WHERE name = ? AND id != ?",
+                                   [(name, pid) for pid, name, _, _ in rows])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pokemon (id, name, data, updated_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
@@ -1,46 +1,140 @@
+import asyncio
+import logging
+import time
 from fastapi import HTTPException
 from pathlib import Path
 from .pokeapi_service import PokeAPIService
 from .stats_service import StatsService
 from .image_service import ImageService
+from .name_index import NameIndex
 from ..utils.logger import CustomLogger
 from ..utils.monitoring import monitor
+from ..utils import tracing
+from .. import config
 
 logger = CustomLogger("PokeSearch")
 
 class SearchService:
-    def __init__(self):
-        self.pokeapi = PokeAPIService()
-        self.stats = StatsService()
-        self.images = ImageService()
+    def __init__(self, pokeapi=None, stats=None, images=None):
+        # Reutiliza las instancias de la aplicación si se pasan (evita cargar datos dos veces)
+        self.pokeapi = pokeapi or PokeAPIService()
+        self.stats = stats or StatsService()
+        self.images = images or ImageService()
+        # Índice local de nombres (CSV de stats + carpetas de images/); se construye en
+        # load_names() al arrancar, fuera del import (requiere el índice de images/)
+        self._names = None
     
-    def search_pokemon(self, pokemon_name: str):
+    def load_names(self):
+        if self._names is None:
+            self._names = NameIndex(self.stats.name_rows(), self.images.list_folders())
+        return self._names
+    
+    @property
+    def names(self):
+        return self.load_names()
+    
+    def suggest(self, query: str, limit: int = 10):
+        """Autocompletado local, sin llamadas a PokeAPI"""
+        start_time = logger.log("search", "suggest", f"Suggesting for {query}")
+        suggestions = [entry.to_dict() for entry in self.names.suggest(query, limit)]
+        monitor.log_request("PokeSearch", "suggest", 200,
+                          round((logger.log("search", "suggest", "Suggestions ready", start_time) - start_time) * 1000, 3))
+        return suggestions
+    
+    def _list_image_urls(self, folder_name):
+        folder = self.images.get_folder(folder_name) if folder_name else None
+        if folder is None:
+            return []
+        return [f"/api/images/{folder.name}/{Path(image).stem}" for image in folder.images]
+    
+    async def _get_image_urls(self, folder_name):
+        return self._list_image_urls(folder_name)
+    
+    def _record_source(self, source, start, status, status_code):
+        latency_ms = (time.perf_counter() - start) * 1000
+        tracing.annotate(status=status)
+        monitor.log_request("PokeSearch", f"source_{source}", status_code, round(latency_ms, 3))
+        return {"status": status, "latency_ms": round(latency_ms, 3)}
+    
+    def _error_status(self, source, error):
+        if isinstance(error, HTTPException):
+            return ("not_found" if error.status_code == 404 else "error"), error.status_code
+        logger.log("search", source, f"Error: {str(error)}", level=logging.ERROR)
+        return "error", 500
+    
+    async def _run_source(self, source, awaitable, timeout):
+        """Ejecuta una fuente con su timeout; nunca lanza, devuelve (valor, estado)"""
+        with tracing.span(f"search.{source}"):
+            start = time.perf_counter()
+            try:
+                value = await asyncio.wait_for(awaitable, timeout)
+                return value, self._record_source(source, start, "ok", 200)
+            except asyncio.TimeoutError:
+                return None, self._record_source(source, start, "timeout", 504)
+            except Exception as e:
+                return None, self._record_source(source, start, *self._error_status(source, e))
+    
+    def _run_local(self, source, function, *args):
+        """Variante síncrona de _run_source para fuentes locales (índices en memoria)"""
+        with tracing.span(f"search.{source}"):
+            start = time.perf_counter()
+            try:
+                value = function(*args)
+                return value, self._record_source(source, start, "ok", 200)
+            except Exception as e:
+                return None, self._record_source(source, start, *self._error_status(source, e))
+    
+    async def _get_stats(self, stats_name):
+        return self.stats.get_stats(stats_name)
+    
+    @tracing.traced("search.resolve")
+    def _resolve(self, pokemon_name):
+        """Resuelve localmente nombres aproximados, formas o números ("charzard" -> "Charizard")"""
+        entry = self.names.resolve(pokemon_name)
+        stats_name = entry.name if entry else pokemon_name
+        folder_name = entry.folder if entry else pokemon_name
+        upstream_id = str(entry.id) if entry and entry.id else (entry.name if entry else pokemon_name)
+        return entry, stats_name, folder_name, upstream_id
+    
+    @tracing.traced("search.build")
+    def _build_response(self, entry, stats_name, api, stats, images):
+        """Respuesta unificada (parcial si alguna fuente falló); lanza HTTPException si no hay nada"""
+        (api_data, api_source), (stats_data, stats_source), (image_urls, images_source) = api, stats, images
+        sources = {"pokeapi": api_source, "stats": stats_source, "images": images_source}
+        
+        # Sin coincidencia local y sin datos en ninguna fuente: el Pokémon no existe
+        if api_data is None and stats_data is None and not image_urls and entry is None:
+            if api_source["status"] == "not_found" and stats_source["status"] == "not_found":
+                raise HTTPException(status_code=404, detail="Pokemon not found")
+            raise HTTPException(status_code=503, detail={"message": "All sources failed", "sources": sources})
+        
+        return {
+            "name": api_data.name if api_data else (stats_data.name if stats_data else stats_name),
+            "stats": stats_data.dict() if stats_data else None,
+            "images": image_urls or [],
+            "sources": sources
+        }
+    
+    @tracing.traced("search")
+    async def search_pokemon(self, pokemon_name: str):
         start_time = logger.log("search", "search_pokemon", f"Searching for {pokemon_name}")
         try:
-            # Obtener datos de PokeAPI
-            api_data = self.pokeapi.get_pokemon(pokemon_name)
+            entry, stats_name, folder_name, upstream_id = self._resolve(pokemon_name)
             
-            # Obtener stats del CSV
-            stats_data = self.stats.get_stats(pokemon_name)
-            
-            # Obtener lista de imágenes
-            pokemon_folder = Path("images") / pokemon_name.lower()
-            image_urls = []
-            if pokemon_folder.exists():
-                image_urls = sorted([
-                    f"/api/images/{pokemon_name}/{img.stem}"
-                    for img in pokemon_folder.glob("*.jpg")
-                ])
-            
-            # Construir respuesta unificada
-            response = {
-                "name": api_data.name,
-                "stats": stats_data.dict(),
-                "images": image_urls
-            }
+            # PokeAPI, stats e imágenes en paralelo, cada una con su timeout y un plazo total
+            deadline = config.SEARCH_DEADLINE
+            api, stats, images = await asyncio.gather(
+                self._run_source("pokeapi", self.pokeapi.get_pokemon_async(upstream_id),
+                                 min(config.SEARCH_TIMEOUT_POKEAPI, deadline)),
+                self._run_source("stats", self._get_stats(stats_name),
+                                 min(config.SEARCH_TIMEOUT_STATS, deadline)),
+                self._run_source("images", self._get_image_urls(folder_name),
+                                 min(config.SEARCH_TIMEOUT_IMAGES, deadline))
+            )
+            response = self._build_response(entry, stats_name, api, stats, images)
             
             monitor.log_request("PokeSearch", "search_pokemon", 200,
-                              int((logger.log("search", "search_pokemon", "Search completed", start_time) - start_time) * 1000))
+                              round((logger.log("search", "search_pokemon", "Search completed", start_time) - start_time) * 1000, 3))
             return response
             
         except HTTPException as he:
@@ -48,5 +142,73 @@ class SearchService:
             raise he
         except Exception as e:
             monitor.log_request("PokeSearch", "search_pokemon", 500, 0)
-            logger.log("search", "search_pokemon", f"Error: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+            logger.log("search", "search_pokemon", f"Error: {str(e)}", level=logging.ERROR)
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    async def iter_batch(self, identifiers):
+        """
+        Búsqueda por lotes: de-duplica, resuelve stats e imágenes localmente en una
+        pasada y consulta PokeAPI en paralelo con concurrencia acotada. Devuelve los
+        elementos a medida que terminan, cada uno con su índice en la petición.
+        """
+        start_time = logger.log("search", "search_batch", f"Batch of {len(identifiers)} identifiers")
+        # Un grupo por elemento local (fila de stats + carpeta de imágenes): las formas
+        # (p. ej. Mega Venusaur) comparten id en PokeAPI pero no stats ni imágenes
+        groups = {}
+        for index, identifier in enumerate(identifiers):
+            resolution = self._resolve(str(identifier))
+            _, stats_name, folder_name, upstream_id = resolution
+            key = (upstream_id.lower(), str(stats_name).lower(), str(folder_name or "").lower())
+            groups.setdefault(key, (resolution, []))[1].append(index)
+        # Una sola consulta a PokeAPI por id, compartida por los grupos que lo usan
+        upstream = {}
+        for key, (resolution, _) in groups.items():
+            upstream.setdefault(key[0], (resolution[3], []))[1].append(key)
+        
+        # Fuentes locales: una pasada sobre los elementos únicos
+        local = {}
+        for key, ((entry, stats_name, folder_name, _), _) in groups.items():
+            local[key] = (self._run_local("stats", self.stats.get_stats, stats_name),
+                          self._run_local("images", self._list_image_urls, folder_name))
+        
+        semaphore = asyncio.Semaphore(config.SEARCH_BATCH_CONCURRENCY)
+        timeout = min(config.SEARCH_TIMEOUT_POKEAPI, config.SEARCH_DEADLINE)
+        
+        def release(task):
+            semaphore.release()
+            if not task.cancelled():
+                # Resultado de una consulta que ya agotó su timeout: se descarta sin avisos
+                task.exception()
+        
+        async def fetch(upstream_key):
+            upstream_id = upstream[upstream_key][0]
+            await semaphore.acquire()
+            # El permiso se libera cuando termina la consulta, no al vencer el timeout:
+            # así SEARCH_BATCH_CONCURRENCY acota también las peticiones que siguen en vuelo
+            task = asyncio.ensure_future(self.pokeapi.get_pokemon_async(upstream_id))
+            task.add_done_callback(release)
+            return upstream_key, await self._run_source("pokeapi", asyncio.shield(task), timeout)
+        
+        errors = 0
+        for next_done in asyncio.as_completed([fetch(upstream_key) for upstream_key in upstream]):
+            upstream_key, api = await next_done
+            for key in upstream[upstream_key][1]:
+                (entry, stats_name, _, _), indexes = groups[key]
+                stats, images = local[key]
+                try:
+                    item = {"result": self._build_response(entry, stats_name, api, stats, images)}
+                except HTTPException as he:
+                    errors += 1
+                    item = {"error": {"status_code": he.status_code, "detail": he.detail}}
+                for index in indexes:
+                    yield {"index": index, "query": identifiers[index], **item}
+        
+        monitor.log_request("PokeSearch", "search_batch", 200,
+                          round((logger.log("search", "search_batch",
+                                            f"Batch completed ({len(groups)} unique, {len(upstream)} upstream,"
+                                            f" {errors} errors)", start_time) - start_time) * 1000, 3))
+    
+    async def search_batch(self, identifiers):
+        """Resultados completos del lote en el orden de la petición"""
+        items = [item async for item in self.iter_batch(identifiers)]
+        return sorted(items, key=lambda item: item["index"])
@@ -1,46 +1,124 @@
-import csv
+import logging
+from threading import Lock
 from fastapi import HTTPException
 from pathlib import Path
 from ..utils.logger import CustomLogger
 from ..utils.monitoring import monitor
-from ..models.pokemon import PokemonStats
+from ..utils import tracing
+from .stats_snapshot import StatsSnapshot
+from .stats_table import StatsTable
 
 logger = CustomLogger("PokeStats")
 
+class _StatsData:
+    """Datos cargados e índices; una sola instancia por fichero y proceso"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.names = snapshot.names()
+        self.ids = ids = snapshot.columns["id"].tolist()
+        # Índices hash por id (todas las formas, la base primero) y por nombre normalizado
+        self.by_id = {}
+        self.by_name = {}
+        for index, (pokemon_id, name) in enumerate(zip(ids, self.names)):
+            self.by_id.setdefault(pokemon_id, []).append(index)
+            self.by_name.setdefault(name.lower(), index)
+        self._rows = {}
+        self.table = StatsTable(snapshot.columns, snapshot.type_vocab, self.row)
+
+    def row(self, index):
+        """Modelo PokemonStats de una fila, materializado bajo demanda"""
+        row = self._rows.get(index)
+        if row is None:
+            row = self._rows[index] = self.snapshot.row(index)
+        return row
+
+
 class StatsService:
-    def __init__(self):
-        self.data = []
-        self.csv_path = Path("data/pokemon_stats.csv")
+    _shared = {}
+    _shared_lock = Lock()
+
+    def __init__(self, csv_path="data/pokemon_stats.csv"):
+        self.csv_path = Path(csv_path)
         self._load_data()
-    
+
     def _load_data(self):
-        start_time = logger.log("stats", "_load_data", "Loading CSV data")
+        start_time = logger.log("stats", "_load_data", "Loading stats snapshot")
         try:
-            with open(self.csv_path, mode='r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                self.data = [PokemonStats.from_csv_row(row) for row in reader]
-            logger.log("stats", "_load_data", "CSV data loaded", start_time)
+            key = str(self.csv_path.resolve())
+            with self._shared_lock:
+                stats_data = self._shared.get(key)
+                if stats_data is None:
+                    stats_data = self._shared[key] = _StatsData(StatsSnapshot.load_or_build(self.csv_path))
+            self._data = stats_data
+            logger.log("stats", "_load_data", "Stats snapshot loaded", start_time)
         except Exception as e:
-            logger.log("stats", "_load_data", f"Error loading CSV: {str(e)}")
+            logger.log("stats", "_load_data", f"Error loading CSV: {str(e)}", level=logging.ERROR)
             raise HTTPException(status_code=500, detail="Failed to load stats data")
-    
+
+    @property
+    def names(self):
+        return self._data.names
+
+    def name_rows(self):
+        """Pares (id, nombre) en el orden del CSV"""
+        return list(zip(self._data.ids, self._data.names))
+
+    @property
+    def table(self):
+        return self._data.table
+
+    @tracing.traced("stats.get_stats")
     def get_stats(self, identifier):
         start_time = logger.log("stats", "get_stats", "Fetching Pokemon stats")
         try:
             result = None
             if identifier.isdigit():
-                result = next((item for item in self.data if item.id == int(identifier)), None)
+                forms = self._data.by_id.get(int(identifier))
+                result = self._data.row(forms[0]) if forms else None
             else:
-                result = next((item for item in self.data if item.name.lower() == identifier.lower()), None)
-            
+                index = self._data.by_name.get(identifier.lower())
+                result = self._data.row(index) if index is not None else None
+
             if result:
-                monitor.log_request("PokeStats", "get_stats", 200, 
-                                  int((logger.log("stats", "get_stats", "Stats fetched", start_time) - start_time) * 1000))
+                monitor.log_request("PokeStats", "get_stats", 200,
+                                  round((logger.log("stats", "get_stats", "Stats fetched", start_time) - start_time) * 1000, 3))
                 return result
             else:
                 monitor.log_request("PokeStats", "get_stats", 404, 0)
                 raise HTTPException(status_code=404, detail="Pokemon stats not found")
+        except HTTPException:
+            raise
         except Exception as e:
             monitor.log_request("PokeStats", "get_stats", 500, 0)
-            logger.log("stats", "get_stats", f"Error: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+            logger.log("stats", "get_stats", f"Error: {str(e)}", level=logging.ERROR)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @tracing.traced("stats.get_forms")
+    def get_forms(self, identifier):
+        """Todas las formas (p. ej. Mega) que comparten el mismo número"""
+        start_time = logger.log("stats", "get_forms", "Fetching Pokemon forms")
+        if identifier.isdigit():
+            forms = self._data.by_id.get(int(identifier), [])
+        else:
+            index = self._data.by_name.get(identifier.lower())
+            forms = self._data.by_id.get(self._data.row(index).id, []) if index is not None else []
+        if not forms:
+            monitor.log_request("PokeStats", "get_forms", 404, 0)
+            raise HTTPException(status_code=404, detail="Pokemon stats not found")
+        monitor.log_request("PokeStats", "get_forms", 200,
+                          round((logger.log("stats", "get_forms", "Forms fetched", start_time) - start_time) * 1000, 3))
+        return [self._data.row(index) for index in forms]
+
+    @tracing.traced("stats.query")
+    def query_stats(self, **filters):
+        """Filtro/orden/top-k vectorizado sobre la tabla columnar (ver StatsTable.query)"""
+        start_time = logger.log("stats", "query_stats", "Querying stats")
+        try:
+            results = self.table.query(**filters)
+        except ValueError as e:
+            monitor.log_request("PokeStats", "query_stats", 400, 0)
+            raise HTTPException(status_code=400, detail=str(e))
+        monitor.log_request("PokeStats", "query_stats", 200,
+                          round((logger.log("stats", "query_stats", f"{len(results)} rows", start_time) - start_time) * 1000, 3))
+        return results
@@ -0,0 +1,174 @@
+import csv
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+import numpy as np
+from ..models.pokemon import PokemonStats
+
+MAGIC = b"PKSTATS1"
+ALIGNMENT = 8
+
+# Columnas numéricas de ancho fijo (orden dentro del fichero)
+NUMERIC_COLUMNS = {
+    "id": np.int32,
+    "total": np.int32,
+    "hp": np.int32,
+    "attack": np.int32,
+    "defense": np.int32,
+    "sp_atk": np.int32,
+    "sp_def": np.int32,
+    "speed": np.int32,
+    "generation": np.int32,
+    "legendary": np.uint8,
+    "type1": np.int16,
+    "type2": np.int16,
+    "name_offsets": np.int32,
+}
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, mode='rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StatsSnapshot:
+    """
+    Snapshot binario del CSV de stats: columnas numéricas de ancho fijo más una
+    tabla de cadenas (nombres), cargado con np.memmap para que todos los workers
+    de una máquina compartan las mismas páginas. Se regenera automáticamente
+    cuando cambia el mtime/tamaño (y el hash) del CSV.
+    """
+
+    def __init__(self, path, header, columns, names_blob):
+        self.path = path
+        self.header = header
+        self.columns = columns
+        self._names_blob = names_blob
+        self.type_vocab = header["type_vocab"]
+        self.rows = header["rows"]
+
+    def name(self, index):
+        offsets = self.columns["name_offsets"]
+        return bytes(self._names_blob[offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+    def names(self):
+        blob = bytes(self._names_blob)
+        offsets = self.columns["name_offsets"].tolist()
+        return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(self.rows)]
+
+    def row(self, index):
+        """Construye el modelo PokemonStats de una fila (bajo demanda)"""
+        type2 = int(self.columns["type2"][index])
+        return PokemonStats(
+            id=int(self.columns["id"][index]),
+            name=self.name(index),
+            type1=self.type_vocab[int(self.columns["type1"][index])],
+            type2=self.type_vocab[type2] if type2 >= 0 else None,
+            total=int(self.columns["total"][index]),
+            hp=int(self.columns["hp"][index]),
+            attack=int(self.columns["attack"][index]),
+            defense=int(self.columns["defense"][index]),
+            sp_atk=int(self.columns["sp_atk"][index]),
+            sp_def=int(self.columns["sp_def"][index]),
+            speed=int(self.columns["speed"][index]),
+            generation=int(self.columns["generation"][index]),
+            legendary=bool(self.columns["legendary"][index])
+        )
+
+    @classmethod
+    def load_or_build(cls, csv_path, snapshot_path=None):
+        csv_path = Path(csv_path)
+        snapshot_path = Path(snapshot_path) if snapshot_path else csv_path.with_suffix(".bin")
+        stat = csv_path.stat()
+        snapshot = None
+        if snapshot_path.exists():
+            try:
+                snapshot = cls.load(snapshot_path)
+            except (ValueError, KeyError, struct.error):
+                snapshot = None
+        if snapshot is not None:
+            header = snapshot.header
+            if header["csv_mtime_ns"] == stat.st_mtime_ns and header["csv_size"] == stat.st_size:
+                return snapshot
+            # El mtime cambió pero el contenido puede ser el mismo (p. ej. checkout)
+            if header["csv_size"] == stat.st_size and header["csv_sha256"] == _file_hash(csv_path):
+                return snapshot
+        cls.build(csv_path, snapshot_path)
+        return cls.load(snapshot_path)
+
+    @classmethod
+    def build(cls, csv_path, snapshot_path):
+        """Compila el CSV al formato binario (escritura atómica vía fichero temporal)"""
+        csv_path = Path(csv_path)
+        stat = csv_path.stat()
+        with open(csv_path, mode='r', encoding='utf-8') as file:
+            rows = [PokemonStats.from_csv_row(row) for row in csv.DictReader(file)]
+
+        type_vocab = sorted({r.type1 for r in rows} | {r.type2 for r in rows if r.type2})
+        type_codes = {name: code for code, name in enumerate(type_vocab)}
+        encoded_names = [r.name.encode("utf-8") for r in rows]
+        name_offsets = np.zeros(len(rows) + 1, dtype=np.int32)
+        np.cumsum([len(n) for n in encoded_names], out=name_offsets[1:])
+
+        arrays = {column: np.array([getattr(r, column) for r in rows], dtype=dtype)
+                  for column, dtype in NUMERIC_COLUMNS.items()
+                  if column not in ("type1", "type2", "name_offsets")}
+        arrays["type1"] = np.array([type_codes[r.type1] for r in rows], dtype=np.int16)
+        arrays["type2"] = np.array([type_codes[r.type2] if r.type2 else -1 for r in rows], dtype=np.int16)
+        arrays["name_offsets"] = name_offsets
+        names_blob = b"".join(encoded_names)
+
+        # Desplazamientos relativos al inicio de la zona de datos, alineados
+        layout = {}
+        offset = 0
+        for column, dtype in NUMERIC_COLUMNS.items():
+            layout[column] = [offset, len(arrays[column]), np.dtype(dtype).str]
+            offset += -(-arrays[column].nbytes // ALIGNMENT) * ALIGNMENT
+        header = {
+            "rows": len(rows),
+            "csv_mtime_ns": stat.st_mtime_ns,
+            "csv_size": stat.st_size,
+            "csv_sha256": _file_hash(csv_path),
+            "type_vocab": type_vocab,
+            "columns": layout,
+            "names": [offset, len(names_blob)],
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+        tmp_path = Path(f"{snapshot_path}.{os.getpid()}.tmp")
+        with open(tmp_path, mode='wb') as file:
+            file.write(MAGIC)
+            file.write(struct.pack("<I", len(header_bytes)))
+            file.write(header_bytes)
+            file.write(b"\0" * (data_start - file.tell()))
+            for column in NUMERIC_COLUMNS:
+                file.seek(data_start + layout[column][0])
+                file.write(arrays[column].tobytes())
+            file.seek(data_start + offset)
+            file.write(names_blob)
+        os.replace(tmp_path, snapshot_path)
+
+    @classmethod
+    def load(cls, snapshot_path):
+        snapshot_path = Path(snapshot_path)
+        with open(snapshot_path, mode='rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Invalid stats snapshot: {snapshot_path}")
+            (header_len,) = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(header_len).decode("utf-8"))
+        data_start = -(-(len(MAGIC) + 4 + header_len) // ALIGNMENT) * ALIGNMENT
+
+        buffer = np.memmap(snapshot_path, dtype=np.uint8, mode='r')
+        columns = {}
+        for column, (offset, length, dtype) in header["columns"].items():
+            start = data_start + offset
+            columns[column] = buffer[start:start + length * np.dtype(dtype).itemsize].view(dtype)
+        names_offset, names_length = header["names"]
+        names_blob = buffer[data_start + names_offset:data_start + names_offset + names_length]
+        return cls(snapshot_path, header, columns, names_blob)
@@ -0,0 +1,79 @@
+import numpy as np
+
+# Columnas numéricas consultables (nombre del campo en PokemonStats)
+STAT_COLUMNS = ("total", "hp", "attack", "defense", "sp_atk", "sp_def", "speed", "generation")
+
+
+class StatsTable:
+    """
+    Representación columnar (NumPy) de las stats para filtrar, ordenar y hacer
+    top-k con operaciones vectorizadas en lugar de bucles sobre modelos pydantic.
+    Los tipos se codifican como categorías (índice en un vocabulario).
+    """
+
+    def __init__(self, columns, type_vocab, row_factory):
+        """
+        - columns: arrays NumPy por columna (STAT_COLUMNS, legendary, type1, type2)
+        - type_vocab: nombres de tipo; type1/type2 guardan su índice (-1 = sin tipo)
+        - row_factory: función índice -> PokemonStats para materializar resultados
+        """
+        self.row_factory = row_factory
+        self.size = len(columns["total"])
+        self.columns = {column: columns[column] for column in STAT_COLUMNS}
+        self.legendary = columns["legendary"].view(np.bool_)
+        self.type1 = columns["type1"]
+        self.type2 = columns["type2"]
+        self.type_vocab = list(type_vocab)
+        self._type_codes = {name.lower(): code for code, name in enumerate(self.type_vocab)}
+
+    def _type_code(self, type_name):
+        if type_name.lower() == "none":
+            return -1
+        code = self._type_codes.get(type_name.lower())
+        if code is None:
+            raise ValueError(f"Unknown type: {type_name}")
+        return code
+
+    def query(self, type1=None, type2=None, generation=None, legendary=None,
+              ranges=None, sort_by=None, descending=True, limit=None):
+        """
+        Devuelve las filas que cumplen los filtros:
+        - type1/type2: nombre de tipo ("none" para type2 vacío)
+        - ranges: {columna: (mínimo, máximo)}, cualquiera de los dos puede ser None
+        - sort_by: columna de STAT_COLUMNS; limit: top-k
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if type1 is not None:
+            mask &= self.type1 == self._type_code(type1)
+        if type2 is not None:
+            mask &= self.type2 == self._type_code(type2)
+        if generation is not None:
+            mask &= self.columns["generation"] == generation
+        if legendary is not None:
+            mask &= self.legendary == legendary
+        for column, (low, high) in (ranges or {}).items():
+            values = self._column(column)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+
+        indices = np.flatnonzero(mask)
+        if sort_by is not None:
+            values = self._column(sort_by)[indices]
+            keys = -values if descending else values
+            if limit is not None and limit < len(indices):
+                # Top-k en O(n) con argpartition y orden solo de los k elegidos
+                top = np.argpartition(keys, limit - 1)[:limit]
+                indices = indices[top[np.argsort(keys[top], kind="stable")]]
+            else:
+                indices = indices[np.argsort(keys, kind="stable")]
+        if limit is not None:
+            indices = indices[:limit]
+        return [self.row_factory(int(i)) for i in indices]
+
+    def _column(self, column):
+        values = self.columns.get(column)
+        if values is None:
+            raise ValueError(f"Unknown stat column: {column}")
+        return values
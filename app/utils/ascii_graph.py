@@ -0,0 +1,83 @@
+from datetime import datetime
+
+GLYPHS = "*+ox#@"
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets: reduce [(x, y)] a `threshold` puntos
+    conservando la forma (picos y valles) mejor que promediar por bloques.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        # Media del bucket siguiente (el último punto para el bucket final)
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        following = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(x for x, _ in following) / len(following)
+        avg_y = sum(y for _, y in following) / len(following)
+
+        anchor_x, anchor_y = points[selected]
+        best_area = -1
+        best = start
+        for index in range(start, min(end, len(points) - 1)):
+            x, y = points[index]
+            area = abs((anchor_x - avg_x) * (y - anchor_y) - (anchor_x - x) * (avg_y - anchor_y))
+            if area > best_area:
+                best_area = area
+                best = index
+        sampled.append(points[best])
+        selected = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def render_panel(title, series, start, end, width, height, unit):
+    """
+    Panel ASCII con una o varias series [(nombre, [(x, y)])] sobre un eje Y
+    común; x se escala al ancho según [start, end].
+    """
+    values = [y for _, points in series for _, y in points]
+    if not values:
+        return [title, "(sin datos)"]
+    min_val = min(values)
+    max_val = max(values)
+    range_val = max_val - min_val if max_val != min_val else 1
+    span = end - start if end != start else 1
+
+    grid = [[" "] * width for _ in range(height + 1)]
+    for position, (_, points) in enumerate(series):
+        glyph = GLYPHS[position % len(GLYPHS)]
+        for x, y in points:
+            column = min(width - 1, max(0, int((x - start) / span * (width - 1))))
+            row = int(round((y - min_val) / range_val * height))
+            grid[height - row][column] = glyph
+
+    label_width = max(len(f"{max_val:.1f}"), len(f"{min_val:.1f}"))
+    lines = [title]
+    for index, row in enumerate(grid):
+        if index == 0:
+            label = f"{max_val:.1f}"
+        elif index == height:
+            label = f"{min_val:.1f}"
+        else:
+            label = ""
+        lines.append(f"{label:>{label_width}} |{''.join(row)}")
+    lines.append(" " * label_width + " +" + "-" * width)
+    legend = "  ".join(f"{GLYPHS[position % len(GLYPHS)]} {name}" for position, (name, _) in enumerate(series))
+    lines.append(" " * label_width + f"  {legend}  ({unit})")
+    return lines
+
+
+def time_axis(start, end, width, resolution):
+    """Etiquetas de inicio y fin del eje X en el formato de la resolución"""
+    fmt = "%m/%d" if resolution >= 86400 else "%m/%d %H:%M"
+    left = datetime.fromtimestamp(start).strftime(fmt)
+    right = datetime.fromtimestamp(end).strftime(fmt)
+    return left + right.rjust(max(1, width - len(left)))
@@ -0,0 +1,124 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+def normalize_identifier(identifier):
+    """Normaliza nombre o id: 'Pikachu ' -> 'pikachu', '025' -> '25'"""
+    key = str(identifier).strip().lower()
+    if key.isdigit():
+        return str(int(key))
+    return key
+
+
+class TTLCache:
+    """
+    Caché LRU acotada con TTL y ventana stale-while-revalidate.
+    - ttl: segundos en los que una entrada es fresca
+    - stale_ttl: segundos adicionales en los que se sirve vencida mientras se refresca
+    - max_entries: número máximo de entradas (se expulsa la menos usada)
+    Varias claves (alias) pueden apuntar a la misma entrada, p. ej. nombre e id.
+    Las entradas vencidas siguen disponibles con peek() (último valor conocido).
+    """
+
+    def __init__(self, ttl, stale_ttl=0, max_entries=1024):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._aliases = {}
+        self._alias_index = {}
+        self._lock = Lock()
+
+    def resolve(self, key):
+        """Devuelve la clave canónica de un alias (o la misma clave)"""
+        return self._aliases.get(key, key)
+
+    def get(self, key):
+        """Devuelve (valor, estado) donde estado es FRESH, STALE o None"""
+        with self._lock:
+            canonical = self._aliases.get(key, key)
+            entry = self._entries.get(canonical)
+            if entry is None:
+                return None, None
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age <= self.ttl:
+                self._entries.move_to_end(canonical)
+                return value, FRESH
+            if age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(canonical)
+                return value, STALE
+            # Vencida: se conserva como último valor conocido hasta que la expulse el LRU
+            return None, None
+
+    def peek(self, key):
+        """Último valor conocido sin importar su antigüedad (o None)"""
+        with self._lock:
+            entry = self._entries.get(self._aliases.get(key, key))
+            return entry[0] if entry is not None else None
+
+    def set(self, canonical, value, aliases=()):
+        with self._lock:
+            self._entries[canonical] = (value, time.monotonic())
+            self._entries.move_to_end(canonical)
+            for alias in aliases:
+                if alias != canonical:
+                    self._aliases[alias] = canonical
+                    self._alias_index.setdefault(canonical, set()).add(alias)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._evict(oldest)
+
+    def _evict(self, canonical):
+        self._entries.pop(canonical, None)
+        for alias in self._alias_index.pop(canonical, ()):
+            self._aliases.pop(alias, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self._alias_index.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ByteLRUCache:
+    """Caché LRU de bytes acotada por tamaño total (no por número de entradas)"""
+
+    def __init__(self, max_bytes, max_item_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes or max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        """Guarda si cabe; devuelve False si el elemento supera el tamaño máximo"""
+        if len(data) > self.max_item_bytes or len(data) > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return True
+
+    def __len__(self):
+        return len(self._entries)
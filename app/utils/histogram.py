@@ -0,0 +1,105 @@
+import math
+
+# Sub-buckets por octava = 2 ** (SUB_BUCKET_BITS - 1): error relativo máximo ~3%
+SUB_BUCKET_BITS = 6
+_HALF = 1 << (SUB_BUCKET_BITS - 1)
+_EXACT = 1 << SUB_BUCKET_BITS
+
+
+def _index(value_us):
+    """Índice log-lineal (estilo HDR): exacto por debajo de 64µs, ~3% por encima"""
+    if value_us < _EXACT:
+        return value_us
+    exponent = value_us.bit_length() - SUB_BUCKET_BITS
+    return exponent * _HALF + (value_us >> exponent)
+
+
+def _bounds(index):
+    """Rango [mínimo, máximo] en µs que representa un índice"""
+    if index < _EXACT:
+        return index, index
+    exponent = index // _HALF - 1
+    mantissa = index - exponent * _HALF
+    return mantissa << exponent, ((mantissa + 1) << exponent) - 1
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias combinable: guarda conteos por bucket log-lineal
+    en µs, más conteo, suma y máximo exactos. Dos histogramas (de otro bucket
+    de tiempo u otro worker) se combinan sumando conteos.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency_ms):
+        index = _index(max(0, int(latency_ms * 1000)))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += latency_ms
+        if latency_ms > self.max:
+            self.max = latency_ms
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentiles(self, quantiles):
+        """{q: latencia en ms} para cada q en (0, 1]; un solo recorrido ordenado"""
+        if not self.count:
+            return {q: None for q in quantiles}
+        targets = sorted((max(1, math.ceil(q * self.count)), q) for q in quantiles)
+        result = {}
+        seen = 0
+        position = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            while position < len(targets) and targets[position][0] <= seen:
+                low, high = _bounds(index)
+                # Punto medio del bucket, acotado por el máximo exacto
+                result[targets[position][1]] = min((low + high) / 2000, self.max)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+    def summary(self):
+        """Resumen estándar: media, p50/p90/p95/p99 y máximo (ms)"""
+        percentiles = self.percentiles((0.5, 0.9, 0.95, 0.99))
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": percentiles[0.5],
+            "p90": percentiles[0.9],
+            "p95": percentiles[0.95],
+            "p99": percentiles[0.99],
+            "max": self.max if self.count else None,
+        }
+
+    def to_dict(self):
+        """Forma serializable (JSON) para combinar histogramas entre workers"""
+        return {"counts": {str(k): v for k, v in self.counts.items()},
+                "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(k): v for k, v in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
@@ -0,0 +1,181 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+
+# Bloques de ~32 MB: suficientes para repartir entre procesos sin disparar la memoria
+CHUNK_BYTES = 32 * 1024 * 1024
+# Por debajo de este tamaño el pool cuesta más de lo que ahorra
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+
+class LogColumns:
+    """
+    Log parseado en columnas NumPy: día (ordinal), timestamp (epoch), status,
+    latencia (ms) y códigos de módulo/api/función sobre vocabularios internados.
+    """
+
+    FIELDS = ("day", "ts", "status", "latency", "module", "api", "function")
+
+    def __init__(self, day, ts, status, latency, module, api, function, modules, apis, functions):
+        self.day = day
+        self.ts = ts
+        self.status = status
+        self.latency = latency
+        self.module = module
+        self.api = api
+        self.function = function
+        self.modules = modules
+        self.apis = apis
+        self.functions = functions
+
+    def __len__(self):
+        return len(self.ts)
+
+    def mask(self, module=None, function=None, start_day=None, end_day=None):
+        """Máscara booleana de filas: módulo/función exactos y start_day <= día < end_day (ordinales)"""
+        mask = np.ones(len(self.ts), dtype=bool)
+        for value, vocabulary, column in ((module, self.modules, self.module),
+                                          (function, self.functions, self.function)):
+            if value:
+                mask &= column == (vocabulary.index(value) if value in vocabulary else -1)
+        if start_day is not None:
+            mask &= self.day >= start_day
+        if end_day is not None:
+            mask &= self.day < end_day
+        return mask
+
+    @classmethod
+    def concat(cls, parts):
+        """Une resultados parciales re-mapeando sus códigos a un vocabulario común"""
+        vocabularies = ([], [], [])
+        indexes = ({}, {}, {})
+        columns = {field: [] for field in cls.FIELDS}
+        for part in parts:
+            for field in ("day", "ts", "status", "latency"):
+                columns[field].append(getattr(part, field))
+            for position, field in enumerate(("module", "api", "function")):
+                local = (part.modules, part.apis, part.functions)[position]
+                index = indexes[position]
+                mapping = np.empty(len(local), dtype=np.int32)
+                for code, value in enumerate(local):
+                    if value not in index:
+                        index[value] = len(vocabularies[position])
+                        vocabularies[position].append(value)
+                    mapping[code] = index[value]
+                codes = getattr(part, field)
+                columns[field].append(mapping[codes] if len(codes) else codes)
+        merged = {field: np.concatenate(values) if values else np.empty(0)
+                  for field, values in columns.items()}
+        return cls(**merged, modules=vocabularies[0], apis=vocabularies[1], functions=vocabularies[2])
+
+
+def split_ranges(path, parts):
+    """Hasta `parts` rangos [inicio, fin) de bytes alineados a fin de línea"""
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as file:
+        for part in range(1, parts):
+            file.seek(max(part * size // parts, boundaries[-1]))
+            file.readline()
+            position = file.tell()
+            if position >= size:
+                break
+            boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _number_after(message, label, terminator):
+    """Número tras 'label' (p. ej. 'Latency: ') hasta 'terminator'; None si no aparece"""
+    position = message.find(label)
+    if position < 0:
+        return None
+    position += len(label)
+    stop = message.find(terminator, position) if terminator else -1
+    return message[position:stop if stop >= 0 else len(message)].strip()
+
+
+def parse_range(path, start, end):
+    """
+    Parsea un rango de bytes sin regex: split por '|', timestamp decodificado
+    con una caché por hora y status/latencia con find(). Devuelve LogColumns.
+    """
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start).decode("utf-8", errors="replace")
+
+    hour_cache = {}
+    vocabularies = ({}, {}, {})
+    days, stamps, statuses, latencies = [], [], [], []
+    codes = ([], [], [])
+    for line in data.splitlines():
+        parts = line.split("|", 4)
+        if len(parts) != 5 or len(parts[0]) != 19:
+            continue
+        timestamp = parts[0]
+        hour = hour_cache.get(timestamp[:13])
+        if hour is None:
+            try:
+                year, month, day_of_month = int(timestamp[:4]), int(timestamp[5:7]), int(timestamp[8:10])
+                hour_value = int(timestamp[11:13])
+                hour = hour_cache[timestamp[:13]] = (
+                    date(year, month, day_of_month).toordinal(),
+                    time.mktime((year, month, day_of_month, hour_value, 0, 0, 0, 0, -1)),
+                )
+            except ValueError:
+                continue
+        try:
+            seconds = int(timestamp[14:16]) * 60 + int(timestamp[17:19])
+        except ValueError:
+            continue
+        message = parts[4]
+        status = _number_after(message, "Status: ", " ")
+        latency = _number_after(message, "Latency: ", "ms")
+        status = int(status) if status and status.isdigit() else 200
+        try:
+            latency = float(latency) if latency else 0.0
+        except ValueError:
+            latency = 0.0
+
+        days.append(hour[0])
+        stamps.append(hour[1] + seconds)
+        statuses.append(status)
+        latencies.append(latency)
+        for position in range(3):
+            value = parts[1 + position]
+            vocabulary = vocabularies[position]
+            code = vocabulary.get(value)
+            if code is None:
+                code = vocabulary[value] = len(vocabulary)
+            codes[position].append(code)
+
+    return LogColumns(
+        np.array(days, dtype=np.int32),
+        np.array(stamps, dtype=np.float64),
+        np.array(statuses, dtype=np.int16),
+        np.array(latencies, dtype=np.float64),
+        *(np.array(values, dtype=np.int32) for values in codes),
+        *(list(vocabulary) for vocabulary in vocabularies),
+    )
+
+
+def parse_file(path, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Parsea el fichero completo; si es grande, en paralelo por bloques en un pool de procesos"""
+    size = os.path.getsize(path)
+    workers = workers or os.cpu_count() or 1
+    if size < PARALLEL_MIN_BYTES:
+        return LogColumns.concat([parse_range(path, 0, size)])
+    if workers == 1:
+        # Secuencial, pero por bloques: la memoria pico es la de un bloque, no la del fichero
+        ranges = split_ranges(path, math.ceil(size / chunk_bytes))
+        return LogColumns.concat([parse_range(path, start, end) for start, end in ranges])
+    # Al menos dos bloques por proceso para repartir la carga
+    ranges = split_ranges(path, max(workers * 2, math.ceil(size / chunk_bytes)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(parse_range, [path] * len(ranges),
+                              [start for start, _ in ranges], [end for _, end in ranges]))
+    return LogColumns.concat(parts)
@@ -0,0 +1,273 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from .log_segments import SegmentHandler
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+DROP_POLICIES = ("drop_new", "drop_old", "block")
+ROTATED_SUFFIX = "%Y-%m-%d_%H-%M-%S"
+
+_STOP = object()
+
+
+def parse_module_map(raw, cast):
+    """'Modulo=valor,...' -> {modulo: valor}; '*' es el valor por defecto"""
+    result = {}
+    for item in raw.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            result[name.strip()] = cast(value.strip())
+    return result
+
+
+def parse_level(value):
+    level = logging.getLevelName(value.upper()) if not value.isdigit() else int(value)
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {value}")
+    return level
+
+
+class LogPipeline:
+    """
+    Escritura de logs fuera del hilo de la petición: los registros se encolan
+    (cola acotada) y un único hilo escritor, dueño del fichero, los formatea y
+    escribe por lotes. Con la cola llena aplica la política configurada:
+    descartar el nuevo, descartar el más antiguo o esperar un tiempo acotado.
+    Rota el fichero por tamaño y/o por día.
+    """
+
+    def __init__(self, path, formatter, console=True, max_queue=10000, batch_size=512,
+                 flush_interval=0.5, drop_policy="drop_new", block_timeout=0.05,
+                 rotate_bytes=0, rotate_daily=True, backup_count=14, segments=None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {DROP_POLICIES}")
+        self.path = Path(path)
+        self.formatter = formatter
+        self.console = console
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.rotate_bytes = rotate_bytes
+        self.rotate_daily = rotate_daily
+        self.backup_count = backup_count
+        # SegmentWriter opcional: copia estructurada (JSONL) de cada lote
+        self.segments = segments
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._file_day = None
+        self.counters = {"written": 0, "dropped": 0, "batches": 0, "rotations": 0, "errors": 0}
+
+    # --- productores (cualquier hilo / event loop) ---
+
+    def put(self, record):
+        self._ensure_writer()
+        try:
+            if self.drop_policy == "block":
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            if self.drop_policy != "drop_old":
+                self.counters["dropped"] += 1
+                return
+        # drop_old: se sacrifica el registro más antiguo para hacer sitio
+        while True:
+            try:
+                self._queue.get_nowait()
+                self.counters["dropped"] += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(record)
+                return
+            except queue.Full:
+                continue
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout=2):
+        """Vacía la cola y cierra el fichero (al apagar la app o al salir del proceso)"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        return {**self.counters, "queued": self._queue.qsize(), "capacity": self._queue.maxsize,
+                "drop_policy": self.drop_policy}
+
+    # --- hilo escritor ---
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is _STOP for record in batch)
+            self._write([record for record in batch if record is not _STOP])
+            if stop:
+                self._close_file()
+                if self.segments is not None:
+                    self.segments.close()
+                return
+
+    def _write(self, records):
+        if not records:
+            return
+        try:
+            lines = [self.formatter.format(record) + "\n" for record in records]
+            data = "".join(lines)
+            self._maybe_rotate(len(data.encode("utf-8")), records[-1].created)
+            self._file.write(data)
+            self._file.flush()
+            if self.console:
+                sys.stderr.write(data)
+            if self.segments is not None:
+                self.segments.write(records)
+            self.counters["written"] += len(records)
+            self.counters["batches"] += 1
+        except Exception:
+            self.counters["errors"] += 1
+
+    def _open_file(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._file_day = (date.fromtimestamp(self.path.stat().st_mtime)
+                          if self.path.stat().st_size else date.today())
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _moved(self):
+        """¿Otro proceso (worker) ya rotó el fichero que tenemos abierto?"""
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    def _maybe_rotate(self, incoming_bytes, created):
+        if self._file is not None and self._moved():
+            self._close_file()
+        if self._file is None:
+            self._open_file()
+        size = self._file.tell()
+        if not size:
+            self._file_day = date.fromtimestamp(created)
+            return
+        if (self.rotate_daily and date.fromtimestamp(created) != self._file_day) or \
+                (self.rotate_bytes and size + incoming_bytes > self.rotate_bytes):
+            self._rotate()
+
+    def _rotate(self):
+        """
+        monitoring.log -> monitoring.log.<fecha>; se conservan backup_count ficheros
+        rotados. Con varios workers escribiendo el mismo fichero, la rotación se hace
+        bajo un lock de fichero y solo si nadie la ha hecho ya (los demás reabren).
+        """
+        with open(self.path.with_name(f"{self.path.name}.lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not self._moved():
+                    self._rotate_locked()
+                else:
+                    self._close_file()
+                    self._open_file()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rotate_locked(self):
+        self._close_file()
+        target = self.path.with_name(f"{self.path.name}.{datetime.now().strftime(ROTATED_SUFFIX)}")
+        suffix = 1
+        while target.exists():
+            target = self.path.with_name(f"{self.path.name}.{datetime.now().strftime(ROTATED_SUFFIX)}.{suffix}")
+            suffix += 1
+        os.replace(self.path, target)
+        self.counters["rotations"] += 1
+        if self.backup_count:
+            rotated = sorted((path for path in self.path.parent.glob(f"{self.path.name}.*")
+                              if path.suffix != ".lock"), key=lambda p: p.stat().st_mtime)
+            for old in rotated[:-self.backup_count]:
+                old.unlink(missing_ok=True)
+        self._open_file()
+
+
+class QueueLogHandler(logging.Handler):
+    """Handler de logging que solo encola el registro; el formateo y la E/S los hace el escritor"""
+
+    def __init__(self, pipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def emit(self, record):
+        self.pipeline.put(record)
+
+
+_pipeline = None
+_handlers = None
+
+
+def get_pipeline():
+    return _pipeline
+
+
+def get_handlers(formatter, path, mode="queue", console=True, segments=None, **options):
+    """
+    Handlers compartidos por todos los CustomLogger del proceso: un solo
+    fichero abierto en lugar de un FileHandler por módulo. Las opciones de
+    cola/rotación solo aplican en modo "queue". Con segments (SegmentWriter)
+    se escribe además el log estructurado.
+    """
+    global _pipeline, _handlers
+    if _handlers is not None:
+        return _handlers
+    if mode == "queue":
+        _pipeline = LogPipeline(path, formatter, console=console, segments=segments, **options)
+        atexit.register(_pipeline.close)
+        _handlers = [QueueLogHandler(_pipeline)]
+    else:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(filename=path, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        _handlers = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(formatter)
+            _handlers.append(console_handler)
+        if segments is not None:
+            atexit.register(segments.close)
+            _handlers.append(SegmentHandler(segments))
+    return _handlers
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+SEGMENT_PREFIX = "segment-"
+INDEX_SUFFIX = ".idx.json"
+
+
+def structured_record(record):
+    """
+    LogRecord -> dict con campos tipados (latencia en µs, status entero o None);
+    custom_fields sustituye module/api/function (p. ej. las peticiones del monitor)
+    """
+    fields = getattr(record, "custom_fields", None)
+    structured = {
+        "ts": round(record.created, 6),
+        "level": record.levelname,
+        "module": getattr(record, "custom_module", record.name),
+        "api": getattr(record, "custom_api", None),
+        "function": getattr(record, "custom_function", None),
+        "status": getattr(record, "custom_status", None),
+        "latency_us": getattr(record, "custom_latency_us", None),
+    }
+    if fields:
+        structured.update(fields)
+    return structured
+
+
+class SegmentWriter:
+    """
+    Log estructurado (JSONL) en segmentos rotados: segment-<inicio>.jsonl con
+    un índice lateral segment-<inicio>.idx.json ({min_ts, max_ts, count}) que
+    se escribe al cerrar el segmento. Un segmento se cierra al superar
+    max_bytes o max_seconds, así una consulta por rango de tiempo puede
+    descartar segmentos completos mirando solo su índice.
+    """
+
+    def __init__(self, directory, max_bytes=16 * 1024 * 1024, max_seconds=3600, keep=0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._min_ts = None
+        self._max_ts = None
+        self._count = 0
+
+    def write(self, records):
+        """Escribe un lote de LogRecord (llamado por el hilo escritor o por el handler síncrono)"""
+        if not records:
+            return
+        with self._lock:
+            for record in records:
+                entry = structured_record(record)
+                if self._file is None or self._should_roll(entry["ts"]):
+                    self._roll(entry["ts"])
+                self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                self._count += 1
+                self._min_ts = entry["ts"] if self._min_ts is None else min(self._min_ts, entry["ts"])
+                self._max_ts = entry["ts"] if self._max_ts is None else max(self._max_ts, entry["ts"])
+            self._file.flush()
+
+    def _should_roll(self, ts):
+        return (self.max_bytes and self._file.tell() >= self.max_bytes) or \
+            (self.max_seconds and ts - self._min_ts >= self.max_seconds)
+
+    def _roll(self, ts):
+        self._finish()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # El pid evita colisiones entre workers que comparten el directorio
+        stamp = datetime.fromtimestamp(ts).strftime("%Y%m%dT%H%M%S")
+        path = self.directory / f"{SEGMENT_PREFIX}{stamp}-{os.getpid()}.jsonl"
+        suffix = 1
+        while path.exists():
+            path = self.directory / f"{SEGMENT_PREFIX}{stamp}-{os.getpid()}-{suffix}.jsonl"
+            suffix += 1
+        self._path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._min_ts = self._max_ts = None
+        self._count = 0
+        self._prune()
+
+    def _finish(self):
+        """Cierra el segmento activo y escribe su índice"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if self._count:
+            index = {"min_ts": self._min_ts, "max_ts": self._max_ts, "count": self._count}
+            index_path(self._path).write_text(json.dumps(index), encoding="utf-8")
+        else:
+            self._path.unlink(missing_ok=True)
+
+    def _prune(self):
+        if not self.keep:
+            return
+        for old in list_segments(self.directory)[:-self.keep]:
+            old.unlink(missing_ok=True)
+            index_path(old).unlink(missing_ok=True)
+
+    def close(self):
+        with self._lock:
+            self._finish()
+
+
+class SegmentHandler(logging.Handler):
+    """Handler síncrono (LOG_MODE=sync) que escribe directamente en los segmentos"""
+
+    def __init__(self, writer):
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record):
+        try:
+            self.writer.write([record])
+        except Exception:
+            self.handleError(record)
+
+
+def index_path(segment_path):
+    return segment_path.with_name(segment_path.name[:-len(".jsonl")] + INDEX_SUFFIX)
+
+
+def list_segments(directory):
+    """Segmentos ordenados por inicio (el nombre lleva la fecha del primer registro)"""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return sorted(directory.glob(f"{SEGMENT_PREFIX}*.jsonl"))
+
+
+def read_index(segment_path):
+    """Índice del segmento; None si sigue abierto (o su proceso terminó sin cerrarlo)"""
+    try:
+        return json.loads(index_path(segment_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def iter_records(directory, start=None, end=None, module=None, function=None):
+    """
+    Registros con start <= ts < end (epoch), filtrando opcionalmente por
+    módulo y función. Los segmentos cerrados cuyo índice no solapa el rango
+    no se abren; el segmento activo (sin índice) se lee siempre.
+    """
+    for path in list_segments(directory):
+        index = read_index(path)
+        if index is not None and ((start is not None and index["max_ts"] < start)
+                                  or (end is not None and index["min_ts"] >= end)):
+            continue
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última línea a medio escribir
+                    continue
+                ts = record["ts"]
+                if (start is not None and ts < start) or (end is not None and ts >= end):
+                    continue
+                if (module is not None and record["module"] != module) or \
+                        (function is not None and record["function"] != function):
+                    continue
+                yield record
+
+
+def segment_stats(directory):
+    """Resumen de los segmentos en disco (para diagnóstico)"""
+    segments = list_segments(directory)
+    closed = [read_index(path) for path in segments]
+    return {
+        "segments": len(segments),
+        "closed": sum(1 for index in closed if index is not None),
+        "records_closed": sum(index["count"] for index in closed if index is not None),
+        "bytes": sum(path.stat().st_size for path in segments),
+    }
@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+
+
+class LogTail:
+    """
+    Lectura incremental de un log de texto: recuerda (inodo, offset) y en cada
+    lectura devuelve solo las líneas completas añadidas desde entonces.
+    Si el fichero rotó (cambió el inodo) termina primero el fichero rotado
+    (monitoring.log.<fecha>) y sigue con el nuevo desde el principio; si se
+    truncó (tamaño menor que el offset) vuelve a empezar.
+    """
+
+    def __init__(self, path, inode=None, offset=0, chunk_size=1024 * 1024):
+        self.path = Path(path)
+        self.inode = inode
+        self.offset = offset
+        self.chunk_size = chunk_size
+
+    def checkpoint(self):
+        return {"inode": self.inode, "offset": self.offset}
+
+    def _find_rotated(self):
+        """Fichero rotado que conserva el inodo del checkpoint (o None)"""
+        for candidate in self.path.parent.glob(f"{self.path.name}.*"):
+            try:
+                if candidate.stat().st_ino == self.inode:
+                    return candidate
+            except OSError:
+                continue
+        return None
+
+    def _read_from(self, path, offset):
+        """Genera líneas completas desde offset; self.offset avanza bloque a bloque"""
+        with open(path, "rb") as file:
+            file.seek(offset)
+            pending = b""
+            while True:
+                chunk = file.read(self.chunk_size)
+                if not chunk:
+                    break
+                data = pending + chunk
+                cut = data.rfind(b"\n") + 1
+                if cut:
+                    yield from data[:cut].decode("utf-8", errors="replace").splitlines()
+                    offset += cut
+                    self.offset = offset
+                pending = data[cut:]
+        # Una línea sin salto final puede estar a medio escribir: se lee en la próxima pasada
+
+    def read_new(self):
+        """Genera las líneas añadidas desde el último checkpoint (memoria constante)"""
+        try:
+            stat_result = os.stat(self.path)
+        except FileNotFoundError:
+            stat_result = None
+
+        if self.inode is not None and (stat_result is None or stat_result.st_ino != self.inode):
+            # Rotación: terminar el fichero anterior si sigue en disco
+            rotated = self._find_rotated()
+            if rotated is not None:
+                yield from self._read_from(rotated, self.offset)
+            self.inode, self.offset = None, 0
+        if stat_result is None:
+            return
+        if self.inode is None:
+            self.inode = stat_result.st_ino
+        if stat_result.st_size < self.offset:
+            # Truncado: el contenido anterior ya no existe
+            self.offset = 0
+        yield from self._read_from(self.path, self.offset)
@@ -1,64 +1,92 @@
 import logging
-from datetime import datetime
+import random
 import time
-import os
-from pathlib import Path
+from .log_pipeline import get_handlers, parse_level, parse_module_map
+from .log_segments import SegmentWriter
+from . import tracing
+from .. import config
+
+# Formato consistente con tu estructura original
+FORMATTER = logging.Formatter(
+    '%(asctime)s|%(custom_module)s|%(custom_api)s|%(custom_function)s|%(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+LEVELS = parse_module_map(config.LOG_LEVELS, parse_level)
+SAMPLING = parse_module_map(config.LOG_SAMPLING, float)
+# Log estructurado (JSONL por segmentos con índice de tiempo)
+SEGMENTS = SegmentWriter(
+    config.LOG_SEGMENT_DIR,
+    max_bytes=config.LOG_SEGMENT_BYTES,
+    max_seconds=config.LOG_SEGMENT_SECONDS,
+    keep=config.LOG_SEGMENT_KEEP
+) if config.LOG_STRUCTURED else None
 
 class CustomLogger:
     def __init__(self, module_name):
         self.module_name = module_name
         self.logger = logging.getLogger(module_name)
-        self.logger.setLevel(logging.INFO)
-        
-        # Crear directorio de logs si no existe
-        logs_dir = Path("logs")
-        logs_dir.mkdir(exist_ok=True)
-        
-        # Formato consistente con tu estructura original
-        formatter = logging.Formatter(
-            '%(asctime)s|%(custom_module)s|%(custom_api)s|%(custom_function)s|%(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        # Handler para consola
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
+        self.logger.setLevel(LEVELS.get(module_name, LEVELS.get("*", logging.INFO)))
+        # Fracción de mensajes informativos que se escriben (los WARNING/ERROR siempre)
+        self.sample_rate = SAMPLING.get(module_name, SAMPLING.get("*", 1.0))
         
-        # Handler para archivo (con rotación diaria)
-        file_handler = logging.FileHandler(
-            filename=logs_dir / 'monitoring.log',
-            encoding='utf-8'
-        )
-        file_handler.setFormatter(formatter)
-        
-        # Limpiar handlers existentes y añadir los nuevos
+        # Handlers compartidos: un único fichero para todos los módulos y,
+        # en modo "queue", un hilo escritor que hace la E/S fuera de la petición
         self.logger.handlers.clear()
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
+        for handler in get_handlers(
+            FORMATTER, config.LOG_FILE, mode=config.LOG_MODE, console=config.LOG_CONSOLE, segments=SEGMENTS,
+            max_queue=config.LOG_QUEUE_SIZE,
+            batch_size=config.LOG_BATCH_SIZE,
+            flush_interval=config.LOG_FLUSH_INTERVAL,
+            drop_policy=config.LOG_DROP_POLICY,
+            block_timeout=config.LOG_BLOCK_TIMEOUT,
+            rotate_bytes=config.LOG_ROTATE_BYTES,
+            rotate_daily=config.LOG_ROTATE_DAILY,
+            backup_count=config.LOG_BACKUP_COUNT
+        ):
+            self.logger.addHandler(handler)
         
         # Evitar propagación al logger root
         self.logger.propagate = False
     
-    def log(self, api_name, function_name, message, start_time=None):
+    def log(self, api_name, function_name, message, start_time=None, level=logging.INFO, status=None, latency=None,
+            fields=None):
         """
         Registra un mensaje con:
         - api_name: Nombre de la API (ej. "pokeapi")
         - function_name: Nombre de la función (ej. "get_pokemon")
         - message: Mensaje descriptivo
         - start_time: Timestamp para calcular latencia (opcional)
+        - level: nivel del mensaje (por defecto INFO)
+        - status / latency: status HTTP y latencia (ms) para el log estructurado
+        - fields: module/api/function que sustituyen a los del logger solo en el log estructurado
         """
+        # El tiempo gastado en logging se acumula en la traza de la petición (Server-Timing "log")
+        started_ns = time.perf_counter_ns()
+        try:
+            return self._log(api_name, function_name, message, start_time, level, status, latency, fields)
+        finally:
+            tracing.add_timing("log", time.perf_counter_ns() - started_ns)
+
+    def _log(self, api_name, function_name, message, start_time, level, status, latency, fields=None):
+        if not self.logger.isEnabledFor(level) or (
+                level < logging.WARNING and self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return time.time()
         try:
             if start_time:
-                latency = int((time.time() - start_time) * 1000)  # in ms
+                latency = round((time.time() - start_time) * 1000, 3)  # in ms (sub-ms precision)
                 message = f"{message} | Latency: {latency}ms"
             
             extra = {
                 'custom_module': self.module_name,
                 'custom_api': api_name,
-                'custom_function': function_name
+                'custom_function': function_name,
+                'custom_status': status,
+                'custom_latency_us': round(latency * 1000) if latency is not None else None,
+                'custom_fields': fields
             }
             
-            self.logger.info(
+            self.logger.log(
+                level,
                 message,
                 extra=extra
             )
@@ -0,0 +1,132 @@
+import time
+from threading import Lock
+from .histogram import LatencyHistogram
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+
+def status_class(status):
+    """Clasificación común de status: 'success' (<400), 'client_error' (4xx) o 'server_error' (>=500)"""
+    if status < 400:
+        return "success"
+    return "client_error" if status < 500 else "server_error"
+
+
+class _Tier:
+    """Ring buffer de buckets de una resolución fija (minuto, hora o día)"""
+
+    def __init__(self, resolution, retention):
+        self.resolution = resolution
+        self.size = retention
+        # Cada slot: [inicio del bucket, {clave: LatencyHistogram}]
+        self.slots = [[None, {}] for _ in range(retention)]
+
+    def slot(self, bucket_start):
+        """Slot del bucket; si contiene un bucket viejo se recicla (expiración perezosa)"""
+        slot = self.slots[(bucket_start // self.resolution) % self.size]
+        if slot[0] != bucket_start:
+            slot[0] = bucket_start
+            slot[1] = {}
+        return slot[1]
+
+    def peek(self, bucket_start):
+        slot = self.slots[(bucket_start // self.resolution) % self.size]
+        return slot[1] if slot[0] == bucket_start else None
+
+    def retains(self, bucket_start, now):
+        return bucket_start > now - self.size * self.resolution
+
+
+class MetricsStore:
+    """
+    Métricas de peticiones en memoria acotada: histograma de latencias (con
+    conteo, suma y máximo) por (módulo, api, status) en buckets por minuto,
+    hora y día, cada nivel con su retención. Registrar es O(1); consultar un
+    rango es O(buckets del rango), usando el bucket más grueso que cabe dentro
+    del rango en cada tramo.
+    """
+
+    def __init__(self, minute_retention=180, hour_retention=24 * 30, day_retention=400, clock=time.time):
+        self.tiers = [
+            _Tier(DAY, day_retention),
+            _Tier(HOUR, hour_retention),
+            _Tier(MINUTE, minute_retention),
+        ]
+        self.clock = clock
+        self._lock = Lock()
+        # Peticiones registradas: sirve de marca de datos para las cachés de lectura
+        self.writes = 0
+
+    def record(self, module, api, status_code, latency, timestamp=None):
+        timestamp = int(self.clock() if timestamp is None else timestamp)
+        key = (module, api, status_code)
+        with self._lock:
+            self.writes += 1
+            for tier in self.tiers:
+                bucket = tier.slot(timestamp - timestamp % tier.resolution)
+                histogram = bucket.get(key)
+                if histogram is None:
+                    histogram = bucket[key] = LatencyHistogram()
+                histogram.record(latency)
+
+    def _buckets(self, start, end):
+        """Buckets que cubren [start, end) eligiendo el nivel más grueso posible en cada tramo"""
+        now = self.clock()
+        t = start - start % MINUTE
+        while t < end:
+            for tier in self.tiers:
+                if t % tier.resolution == 0 and t + tier.resolution <= end and tier.retains(t, now):
+                    break
+            else:
+                # Extremos del rango: el bucket retenido más fino que contiene t
+                tier = next((tier for tier in reversed(self.tiers)
+                             if tier.retains(t - t % tier.resolution, now)), None)
+                if tier is None:
+                    # Anterior a toda la retención: seguir desde el día retenido más antiguo
+                    coarsest = self.tiers[0]
+                    oldest = int(now) - coarsest.size * coarsest.resolution
+                    t = oldest - oldest % coarsest.resolution + coarsest.resolution
+                    continue
+            bucket_start = t - t % tier.resolution
+            bucket = tier.peek(bucket_start)
+            if bucket:
+                yield bucket
+            t = bucket_start + tier.resolution
+
+    def query(self, start, end, module=None, api=None):
+        """Agrega [start, end) (epoch) -> {(módulo, api, status): LatencyHistogram combinado}"""
+        result = {}
+        with self._lock:
+            for bucket in self._buckets(int(start), int(end)):
+                for key, histogram in bucket.items():
+                    if (module is not None and key[0] != module) or (api is not None and key[1] != api):
+                        continue
+                    merged = result.get(key)
+                    if merged is None:
+                        merged = result[key] = LatencyHistogram()
+                    merged.merge(histogram)
+        return result
+
+    def series(self, resolution, start, end, module=None, api=None):
+        """
+        Buckets de un nivel concreto (MINUTE, HOUR o DAY) en [start, end):
+        [(inicio del bucket, {(módulo, api, status): LatencyHistogram})], solo los retenidos con datos
+        """
+        tier = next(tier for tier in self.tiers if tier.resolution == resolution)
+        now = self.clock()
+        result = []
+        with self._lock:
+            t = int(start) - int(start) % resolution
+            while t < end:
+                bucket = tier.peek(t) if tier.retains(t, now) else None
+                if bucket:
+                    selected = {key: histogram for key, histogram in bucket.items()
+                                if (module is None or key[0] == module) and (api is None or key[1] == api)}
+                    if selected:
+                        # Copias: el bucket actual sigue recibiendo muestras
+                        result.append((t, {key: LatencyHistogram().merge(histogram)
+                                           for key, histogram in selected.items()}))
+                t += resolution
+        return result
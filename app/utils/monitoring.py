@@ -1,53 +1,160 @@
-import csv
-import os
+import logging
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
-from fastapi import HTTPException
 from .logger import CustomLogger
+from .metrics_store import MetricsStore, HOUR, DAY, status_class
+from .histogram import LatencyHistogram
+from .rollup_store import RollupStore
+from .prometheus import RequestMetrics
+from .. import config
 
 class Monitor:
     def __init__(self):
-        self.logs = []
+        # Memoria fija: buckets por minuto/hora/día en lugar de una lista sin límite
+        self.store = MetricsStore(
+            minute_retention=config.METRICS_MINUTE_RETENTION,
+            hour_retention=config.METRICS_HOUR_RETENTION,
+            day_retention=config.METRICS_DAY_RETENTION
+        )
+        # Agregados por hora/día en SQLite: sobreviven reinicios y se comparten entre workers
+        self.rollups = RollupStore(config.ROLLUP_DB_PATH) if config.ROLLUP_DB_PATH else None
+        self.counters = defaultdict(int)
+        # Contadores e histogramas acumulados para /metrics (Prometheus)
+        self.metrics = RequestMetrics()
+        # Circuit breakers y bulkheads de las dependencias (nombre -> objeto con stats())
+        self.resilience = {}
         self.logger = CustomLogger("Monitor")
     
     def log_request(self, module, api, status_code, latency):
-        timestamp = datetime.now()
-        self.logs.append({
-            "timestamp": timestamp,
-            "module": module,
-            "api": api,
-            "status_code": status_code,
-            "latency": latency
-        })
+        self.metrics.observe(module, api, status_code, latency)
+        self.store.record(module, api, status_code, latency)
+        if self.rollups is not None:
+            self.rollups.add(time.time(), module, api, status_code, latency)
+        # Los errores nunca se muestrean ni se filtran por nivel INFO
+        level = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+        # La línea de texto se mantiene (Monitor|api|log_request); el registro estructurado
+        # lleva el módulo y la api reales para poder filtrarlo por módulo/función
         self.logger.log(api, "log_request", 
-                       f"Request logged | Status: {status_code} | Latency: {latency}ms")
+                       f"Request logged | Status: {status_code} | Latency: {latency}ms", level=level,
+                       status=status_code, latency=latency,
+                       fields={"module": module, "api": api, "function": api})
+    
+    def increment(self, module, counter, amount=1):
+        """Incrementa un contador (p. ej. aciertos de caché) de un módulo"""
+        self.counters[(module, counter)] += amount
+    
+    def register_resilience(self, name, component):
+        """Publica el estado de un circuit breaker o bulkhead en /bot/CheckResilience y /metrics"""
+        self.resilience[name] = component
+    
+    def get_resilience(self):
+        return {name: component.stats() for name, component in self.resilience.items()}
+    
+    def get_counters(self, module=None):
+        """Devuelve los contadores agrupados por módulo"""
+        result = defaultdict(dict)
+        for (counter_module, counter), value in list(self.counters.items()):
+            if module is None or counter_module == module:
+                result[counter_module][counter] = value
+        return dict(result)
+    
+    def get_summary(self, start_date, end_date, module=None, api=None):
+        """Histograma de latencias por (módulo, api, status) entre dos datetimes (ambos incluidos)"""
+        return self.store.query(start_date.timestamp(), end_date.timestamp() + 1, module, api)
+    
+    def get_rollup_totals(self, module, start_date, end_date, api=None):
+        """Agregado de los días start_date..end_date (incluidos) desde los rollups; None si no hay datos"""
+        return self.rollups.totals(module, start_date.date(), end_date.date() + timedelta(days=1), api)
+    
+    def get_latency_histogram(self, module, start_date, end_date, api=None):
+        """Histograma combinado del módulo (todas las apis y status) en el periodo"""
+        if self.rollups is not None:
+            totals = self.get_rollup_totals(module, start_date, end_date, api)
+            return totals["histogram"] if totals else LatencyHistogram()
+        histogram = LatencyHistogram()
+        for partial in self.get_summary(start_date, end_date, module, api).values():
+            histogram.merge(partial)
+        return histogram
     
     def get_latency(self, module, start_date, end_date):
         start_time = time.time()
-        filtered = [log for log in self.logs 
-                   if log["module"] == module 
-                   and start_date <= log["timestamp"] <= end_date]
+        histogram = self.get_latency_histogram(module, start_date, end_date)
         
-        if not filtered:
+        if not histogram.count:
             return None
         
-        avg_latency = sum(log["latency"] for log in filtered) / len(filtered)
         self.logger.log("Monitor", "get_latency", 
                        f"Latency calculated for {module}", start_time)
-        return avg_latency
+        return histogram.mean
+    
+    def get_latency_percentiles(self, module, start_date, end_date, api=None):
+        """Media, p50/p90/p95/p99 y máximo; None si no hay datos"""
+        histogram = self.get_latency_histogram(module, start_date, end_date, api)
+        return histogram.summary() if histogram.count else None
+    
+    @staticmethod
+    def _point(count, success, server_errors, summary):
+        """Punto de una serie: percentiles de latencia y disponibilidad (200-399 frente a 5xx)"""
+        answered = success + server_errors
+        return {**summary, "count": count, "availability": (success / answered) * 100 if answered else None}
+    
+    def get_series(self, module, resolution, start, end, api=None):
+        """
+        Serie temporal [(inicio del bucket epoch, punto)] en [start, end) con
+        resolución MINUTE, HOUR o DAY. Minutos desde memoria; horas y días
+        desde los rollups si están activos.
+        """
+        if self.rollups is not None and resolution in (HOUR, DAY):
+            if resolution == HOUR:
+                rows = self.rollups.hourly(module, int(start), int(end), api).items()
+            else:
+                rows = ((datetime.combine(day, datetime.min.time()).timestamp(), stats)
+                        for day, stats in self.rollups.daily(module, datetime.fromtimestamp(start).date(),
+                                                             datetime.fromtimestamp(end).date() + timedelta(days=1),
+                                                             api).items())
+            points = []
+            for t, stats in rows:
+                if start - resolution < t < end:
+                    summary = stats["histogram"].summary()
+                    points.append((t, self._point(stats["count"], stats["success"], stats["server_errors"],
+                                                  summary)))
+            return sorted(points, key=lambda point: point[0])
+        
+        points = []
+        for t, histograms in self.store.series(resolution, start, end, module, api):
+            merged = LatencyHistogram()
+            success = server_errors = 0
+            for (_, _, status), histogram in histograms.items():
+                merged.merge(histogram)
+                if status_class(status) == "success":
+                    success += histogram.count
+                elif status_class(status) == "server_error":
+                    server_errors += histogram.count
+            points.append((t, self._point(merged.count, success, server_errors, merged.summary())))
+        return points
     
     def get_availability(self, module, days):
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        filtered = [log for log in self.logs 
-                   if log["module"] == module 
-                   and start_date <= log["timestamp"] <= end_date]
+        if self.rollups is not None:
+            # Una fila por día y función en lugar de recorrer peticiones individuales
+            totals = self.get_rollup_totals(module, start_date, end_date)
+            if totals is None:
+                return None
+            success, errors = totals["success"], totals["server_errors"]
+            return (success / (success + errors)) * 100 if (success + errors) > 0 else 0
         
-        if not filtered:
+        summary = self.get_summary(start_date, end_date, module)
+        if not summary:
             return None
         
-        success = sum(1 for log in filtered if log["status_code"] == 200)
-        errors = sum(1 for log in filtered if log["status_code"] == 500)
+        # Misma clasificación que los rollups: éxito <400, error >=500 (los 4xx no cuentan)
+        success = sum(histogram.count for (_, _, status), histogram in summary.items()
+                      if status_class(status) == "success")
+        errors = sum(histogram.count for (_, _, status), histogram in summary.items()
+                     if status_class(status) == "server_error")
         
         availability = (success / (success + errors)) * 100 if (success + errors) > 0 else 0
         return availability
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Límites de los buckets de latencia (segundos), al estilo de los clientes de Prometheus
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_BOUNDS_MS = tuple(bound * 1000 for bound in LATENCY_BUCKETS)
+_LE_LABELS = tuple(f"{bound:g}" for bound in LATENCY_BUCKETS) + ("+Inf",)
+_START_TIME = time.time()
+
+
+class _Series:
+    """Contadores preasignados de una combinación (módulo, api, status)"""
+
+    __slots__ = ("buckets", "count", "sum", "lock")
+
+    def __init__(self):
+        # Un contador por bucket (no acumulado); el acumulado se calcula al exportar
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class RequestMetrics:
+    """
+    Contador de peticiones e histograma de latencias por (módulo, api, status)
+    para /metrics. Registrar una muestra es un dict.get, un bisect y tres
+    sumas bajo un lock propio de la serie (sin contención entre series).
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._create_lock = threading.Lock()
+
+    def observe(self, module, api, status_code, latency_ms):
+        key = (module, api, status_code)
+        series = self._series.get(key)
+        if series is None:
+            with self._create_lock:
+                series = self._series.setdefault(key, _Series())
+        index = bisect_left(_BOUNDS_MS, latency_ms)
+        with series.lock:
+            series.buckets[index] += 1
+            series.count += 1
+            series.sum += latency_ms
+
+    def render(self, lines):
+        lines.append("# HELP pokemon_requests_total Requests handled, by module, api and status.")
+        lines.append("# TYPE pokemon_requests_total counter")
+        snapshot = []
+        for (module, api, status), series in list(self._series.items()):
+            with series.lock:
+                snapshot.append(((module, api, status), list(series.buckets), series.count, series.sum))
+        snapshot.sort(key=lambda item: tuple(str(part) for part in item[0]))
+        for (module, api, status), _, count, _ in snapshot:
+            lines.append(f"pokemon_requests_total{{{_labels(module=module, api=api, status=status)}}} {count}")
+
+        lines.append("# HELP pokemon_request_latency_seconds Request latency, by module, api and status.")
+        lines.append("# TYPE pokemon_request_latency_seconds histogram")
+        for (module, api, status), buckets, count, total in snapshot:
+            labels = _labels(module=module, api=api, status=status)
+            cumulative = 0
+            for le, bucket_count in zip(_LE_LABELS, buckets):
+                cumulative += bucket_count
+                lines.append(f'pokemon_request_latency_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"pokemon_request_latency_seconds_sum{{{labels}}} {total / 1000:.6f}")
+            lines.append(f"pokemon_request_latency_seconds_count{{{labels}}} {count}")
+
+
+def render_family(lines, name, metric_type, help_text, samples):
+    """Añade una familia de métricas: samples = [({labels}, valor)]"""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        if value is None:
+            continue
+        label_text = f"{{{_labels(**labels)}}}" if labels else ""
+        lines.append(f"{name}{label_text} {value}")
+
+
+def process_samples():
+    """Métricas estándar de proceso (nombres de prometheus_client) desde /proc o resource"""
+    cpu = os.times()
+    samples = {
+        "process_cpu_seconds_total": ("counter", "Total user and system CPU time in seconds.",
+                                      round(cpu.user + cpu.system, 6)),
+        "process_start_time_seconds": ("gauge", "Start time of the process since unix epoch in seconds.",
+                                       round(_START_TIME, 3)),
+        "process_python_threads": ("gauge", "Number of Python threads in the process.", threading.active_count()),
+    }
+    try:
+        with open("/proc/self/statm") as file:
+            pages = file.read().split()
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        samples["process_virtual_memory_bytes"] = ("gauge", "Virtual memory size in bytes.",
+                                                   int(pages[0]) * page_size)
+        samples["process_resident_memory_bytes"] = ("gauge", "Resident memory size in bytes.",
+                                                    int(pages[1]) * page_size)
+        samples["process_open_fds"] = ("gauge", "Number of open file descriptors.",
+                                       len(os.listdir("/proc/self/fd")))
+    except (OSError, ValueError, AttributeError):
+        # Sin /proc (macOS, Windows): pico de memoria residente, si resource existe
+        if resource is not None:
+            samples["process_max_resident_memory_bytes"] = (
+                "gauge", "Peak resident memory size in bytes.",
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+    return samples
+
+
+def render_process(lines):
+    for name, (metric_type, help_text, value) in process_samples().items():
+        render_family(lines, name, metric_type, help_text, [({}, value)])
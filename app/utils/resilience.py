@@ -0,0 +1,205 @@
+import asyncio
+import time
+from collections import deque
+from threading import Lock
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por fallos consecutivos:
+    - closed: todo pasa; failure_threshold fallos seguidos lo abren
+    - open: se rechaza sin llamar durante reset_timeout segundos
+    - half_open: pasan hasta half_open_probes sondas; un éxito lo cierra, un fallo lo reabre
+    on_change(anterior, nuevo) se llama en cada transición (fuera del lock).
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, half_open_probes=1,
+                 on_change=None, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.on_change = on_change
+        self.clock = clock
+        self._lock = Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def _transition(self, new_state):
+        """Cambia de estado (con el lock tomado); devuelve la transición para notificarla"""
+        old_state = self._state
+        self._state = new_state
+        if new_state == OPEN:
+            self._opened_at = self.clock()
+            self.opened += 1
+        if new_state != OPEN:
+            self._probes = 0
+        return (old_state, new_state) if old_state != new_state else None
+
+    def _notify(self, change):
+        if change is not None and self.on_change is not None:
+            self.on_change(*change)
+
+    def allow(self):
+        """¿Se puede llamar ahora? En half_open reserva una sonda (libérala con record_*/release)"""
+        change = None
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN and self._state == OPEN:
+                change = self._transition(HALF_OPEN)
+            if state == CLOSED:
+                allowed = True
+            elif state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                allowed = True
+            else:
+                self.rejected += 1
+                allowed = False
+        self._notify(change)
+        return allowed
+
+    def record_success(self):
+        change = None
+        with self._lock:
+            self._failures = 0
+            # Solo cierra una sonda; un éxito tardío de antes de abrir no lo cierra
+            if self._state == HALF_OPEN:
+                change = self._transition(CLOSED)
+        self._notify(change)
+
+    def record_failure(self):
+        change = None
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                change = self._transition(OPEN)
+        self._notify(change)
+
+    def release(self):
+        """Devuelve una sonda reservada que no llegó a llamar (p. ej. cancelada)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state()
+            retry_in = max(0.0, self.reset_timeout - (self.clock() - self._opened_at)) if state == OPEN else None
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "retry_in": round(retry_in, 3) if retry_in is not None else None,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class BulkheadFull(Exception):
+    """No hubo hueco en el bulkhead dentro del tiempo de espera"""
+
+
+class Bulkhead:
+    """
+    Límite de llamadas simultáneas a una dependencia: si no hay hueco en
+    max_wait segundos se rechaza en lugar de encolar sin límite. Al liberar,
+    el hueco pasa directamente al primero en espera (orden de llegada).
+    """
+
+    def __init__(self, name, max_concurrent, max_wait=0.05):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected = 0
+        self._waiters = deque()
+
+    def _acquired(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    def try_acquire(self):
+        """Hueco inmediato o nada (para llamadas opcionales como las de cobertura)"""
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self._acquired()
+            return True
+        return False
+
+    async def acquire(self):
+        if self.try_acquire():
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            if waiter.done() and not waiter.cancelled():
+                # El hueco llegó a traspasarse pero la tarea ya no lo usará: se devuelve
+                self.release()
+            if isinstance(error, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            raise BulkheadFull(f"{self.name}: {self.in_flight} calls in flight") from None
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # El hueco se traspasa sin pasar por in_flight
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "max_concurrent": self.max_concurrent, "peak": self.peak,
+                "waiting": len(self._waiters), "rejected": self.rejected}
+
+
+class HedgePolicy:
+    """
+    Retardo de la petición de cobertura (hedged request): el cuantil `quantile`
+    de las últimas `window` latencias correctas, acotado a [min_delay, max_delay]
+    (ms). Sin suficientes muestras (o desactivado) no se cubre.
+    """
+
+    def __init__(self, enabled=False, quantile=0.95, min_delay=20.0, max_delay=2000.0, window=200, min_samples=20):
+        self.enabled = enabled
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+
+    def observe(self, latency_ms):
+        self._latencies.append(latency_ms)
+
+    def delay(self):
+        """Segundos a esperar antes de la segunda petición, o None"""
+        if not self.enabled or len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        value = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+        return min(self.max_delay, max(self.min_delay, value)) / 1000
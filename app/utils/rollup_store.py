@@ -0,0 +1,241 @@
+import json
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from .histogram import LatencyHistogram
+from .metrics_store import status_class
+
+HOUR = 3600
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+_TABLES = {"hour": "rollup_hour", "day": "rollup_day"}
+# Posición del contador de cada clase de status en el agregado
+_STATUS_POSITION = {"success": 1, "client_error": 2, "server_error": 3}
+
+
+def _empty():
+    # [count, success, client_errors, server_errors, latency_sum, latency_max, histograma]
+    return [0, 0, 0, 0, 0.0, 0.0, LatencyHistogram()]
+
+
+def _accumulate(target, source):
+    for position in range(4):
+        target[position] += source[position]
+    target[4] += source[4]
+    target[5] = max(target[5], source[5])
+    target[6].merge(source[6])
+    return target
+
+
+def _stats(values):
+    """Agregado -> dict de estadísticas (mismo formato en todos los informes)"""
+    count, success, client_errors, server_errors, latency_sum, latency_max, histogram = values
+    return {
+        "count": count,
+        "success": success,
+        "errors": client_errors + server_errors,
+        "client_errors": client_errors,
+        "server_errors": server_errors,
+        "avg_latency": latency_sum / count if count else None,
+        "percentiles": histogram.percentiles(QUANTILES),
+        "max_latency": latency_max,
+        "histogram": histogram,
+    }
+
+
+class RollupStore:
+    """
+    Agregados persistentes en SQLite por hora y por día, por módulo y función:
+    conteo, éxitos (<400), errores 4xx y 5xx, suma y máximo de latencia e
+    histograma. add() solo acumula en memoria; flush() lo vuelca sumando a
+    las filas existentes en una transacción (opcionalmente junto con el
+    checkpoint de ingesta, para que ambos avancen a la vez). Las lecturas
+    combinan lo ya guardado con lo pendiente, sin esperar a un volcado.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # _lock protege lo pendiente (add es O(1) y nunca espera a SQLite); _db_lock la conexión
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._pending = {}
+        # Lo que se está volcando: sigue visible para las lecturas hasta el commit
+        self._flushing = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table, bucket_type in (("rollup_hour", "INTEGER"), ("rollup_day", "TEXT")):
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f" bucket {bucket_type} NOT NULL,"
+                " module TEXT NOT NULL,"
+                " function TEXT NOT NULL,"
+                " count INTEGER NOT NULL,"
+                " success INTEGER NOT NULL,"
+                " client_errors INTEGER NOT NULL,"
+                " server_errors INTEGER NOT NULL,"
+                " latency_sum REAL NOT NULL,"
+                " latency_max REAL NOT NULL,"
+                " histogram TEXT NOT NULL,"
+                " PRIMARY KEY (bucket, module, function)) WITHOUT ROWID"
+            )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_state ("
+            " source TEXT PRIMARY KEY,"
+            " inode INTEGER,"
+            " byte_offset INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    # --- escritura ---
+
+    def add(self, timestamp, module, function, status, latency):
+        """Acumula una petición (timestamp epoch, latencia en ms) en los buckets pendientes"""
+        hour = int(timestamp) - int(timestamp) % HOUR
+        day = date.fromtimestamp(timestamp).isoformat()
+        with self._lock:
+            for key in (("hour", hour, module, function), ("day", day, module, function)):
+                values = self._pending.get(key)
+                if values is None:
+                    values = self._pending[key] = _empty()
+                values[0] += 1
+                values[_STATUS_POSITION[status_class(status)]] += 1
+                values[4] += latency
+                values[5] = max(values[5], latency)
+                values[6].record(latency)
+
+    def flush(self, checkpoint=None):
+        """Vuelca lo pendiente; checkpoint = (source, inode, offset) se guarda en la misma transacción"""
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending and checkpoint is None:
+                return 0
+            try:
+                self._write(pending, checkpoint)
+            except sqlite3.Error:
+                # La transacción se deshizo: devolver lo pendiente para el próximo intento
+                with self._lock:
+                    for key, values in pending.items():
+                        current = self._pending.get(key)
+                        self._pending[key] = values if current is None else _accumulate(values, current)
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+        return len(pending)
+
+    def _write(self, pending, checkpoint):
+        # BEGIN IMMEDIATE toma el bloqueo de escritura antes del primer SELECT: otro
+        # worker con la misma base no puede escribir entre la lectura y el INSERT
+        self._conn.execute("BEGIN IMMEDIATE")
+        with self._conn:
+            for (resolution, bucket, module, function), values in pending.items():
+                table = _TABLES[resolution]
+                row = self._conn.execute(
+                    f"SELECT count, success, client_errors, server_errors, latency_sum, latency_max, histogram"
+                    f" FROM {table} WHERE bucket = ? AND module = ? AND function = ?",
+                    (bucket, module, function)
+                ).fetchone()
+                if row is not None:
+                    values = _accumulate(self._row_values(row), values)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (bucket, module, function, *values[:6], json.dumps(values[6].to_dict()))
+                )
+            if checkpoint is not None:
+                self._conn.execute("INSERT OR REPLACE INTO ingest_state VALUES (?, ?, ?)", checkpoint)
+
+    def get_checkpoint(self, source):
+        """(inode, offset) guardado para una fuente de log; (None, 0) si no hay"""
+        with self._db_lock:
+            row = self._conn.execute("SELECT inode, byte_offset FROM ingest_state WHERE source = ?",
+                                     (source,)).fetchone()
+        return row if row is not None else (None, 0)
+
+    def start_flusher(self, interval):
+        """Hilo que vuelca periódicamente lo acumulado (idempotente)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, args=(interval,),
+                                        name="rollup-flush", daemon=True)
+        self._thread.start()
+
+    def stop_flusher(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self.flush()
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Base de datos ocupada por otro worker: se reintenta en el siguiente ciclo
+                pass
+
+    # --- lectura ---
+
+    @staticmethod
+    def _row_values(row):
+        return [*row[:6], LatencyHistogram.from_dict(json.loads(row[6]))]
+
+    def _select(self, resolution, start, end, module=None, function=None):
+        """Filas con start <= bucket < end, con filtro opcional de módulo/función"""
+        query = (f"SELECT bucket, count, success, client_errors, server_errors, latency_sum, latency_max, histogram"
+                 f" FROM {_TABLES[resolution]} WHERE 1 = 1")
+        params = []
+        for column, value, operator in (("bucket", start, ">="), ("bucket", end, "<"),
+                                        ("module", module, "="), ("function", function, "=")):
+            if value is not None:
+                query += f" AND {column} {operator} ?"
+                params.append(value)
+        with self._db_lock:
+            rows = self._conn.execute(query, params).fetchall()
+            # Lo no volcado aún (copiado: add() sigue modificándolo)
+            with self._lock:
+                unsaved = [(bucket, _accumulate(_empty(), values))
+                           for pending in (self._flushing, self._pending)
+                           for (pending_resolution, bucket, pending_module, pending_function), values
+                           in pending.items()
+                           if pending_resolution == resolution
+                           and (start is None or bucket >= start) and (end is None or bucket < end)
+                           and module in (None, pending_module) and function in (None, pending_function)]
+        return [(row[0], self._row_values(row[1:])) for row in rows] + unsaved
+
+    def _grouped(self, resolution, start, end, module=None, function=None):
+        grouped = {}
+        for bucket, values in self._select(resolution, start, end, module, function):
+            _accumulate(grouped.setdefault(bucket, _empty()), values)
+        return grouped
+
+    def daily(self, module=None, start=None, end=None, function=None):
+        """{fecha: estadísticas} para start <= fecha < end (datetime.date)"""
+        grouped = self._grouped("day", start.isoformat() if start else None,
+                                end.isoformat() if end else None, module, function)
+        return {datetime.strptime(day, "%Y-%m-%d").date(): _stats(values) for day, values in grouped.items()}
+
+    def hourly(self, module=None, start=None, end=None, function=None):
+        """{inicio de la hora (epoch): estadísticas} para start <= hora < end"""
+        grouped = self._grouped("hour", start, end, module, function)
+        return {hour: _stats(values) for hour, values in grouped.items()}
+
+    def totals(self, module=None, start=None, end=None, function=None):
+        """Estadísticas combinadas de los días start <= fecha < end; None si no hay datos"""
+        total = _empty()
+        for _, values in self._select("day", start.isoformat() if start else None,
+                                      end.isoformat() if end else None, module, function):
+            _accumulate(total, values)
+        return _stats(total) if total[0] else None
+
+    def close(self):
+        self.stop_flusher()
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,254 @@
+import functools
+import inspect
+import os
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+_current_trace = ContextVar("trace", default=None)
+_current_span = ContextVar("span", default=None)
+# Tope de tramos por traza (lotes grandes): los siguientes solo se cuentan
+MAX_SPANS = 512
+
+
+class Span:
+    """Tramo con nombre dentro de una traza (tiempos en ns de perf_counter)"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, name, span_id, parent_id, start_ns, attributes):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns = None
+        self.attributes = attributes
+
+    def to_dict(self, origin_ns):
+        end_ns = self.end_ns if self.end_ns is not None else self.start_ns
+        return {
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "offset_ms": round((self.start_ns - origin_ns) / 1e6, 3),
+            "duration_ms": round((end_ns - self.start_ns) / 1e6, 3) if self.end_ns is not None else None,
+            **({"attributes": self.attributes} if self.attributes else {}),
+        }
+
+
+class Trace:
+    """Traza de una petición: tramos anidados y tiempos acumulados (p. ej. logging)"""
+
+    def __init__(self, method, path, sampled):
+        self.trace_id = os.urandom(8).hex()
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.response_ns = None
+        self.end_ns = None
+        self.status = None
+        self.spans = []
+        self.dropped_spans = 0
+        # nombre -> [ns acumulados, llamadas]; para operaciones demasiado frecuentes para un tramo cada una
+        self.timings = {}
+
+    @property
+    def finished(self):
+        return self.end_ns is not None
+
+    @property
+    def duration_ms(self):
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def server_timing(self):
+        """Cabecera Server-Timing: duración por nombre de tramo, logging, resto y total"""
+        now_ns = self.response_ns or time.perf_counter_ns()
+        durations = {}
+        top_level = []
+        for span in self.spans:
+            end_ns = span.end_ns if span.end_ns is not None else now_ns
+            durations[span.name] = durations.get(span.name, 0) + end_ns - span.start_ns
+            if span.parent_id is None:
+                top_level.append((span.start_ns, end_ns))
+        for name, (elapsed_ns, _) in self.timings.items():
+            durations[name] = durations.get(name, 0) + elapsed_ns
+        # Tiempo cubierto por los tramos raíz (unión de intervalos: pueden solaparse en paralelo)
+        covered_ns = 0
+        cursor = self.start_ns
+        for start_ns, end_ns in sorted(top_level):
+            if end_ns > cursor:
+                covered_ns += end_ns - max(start_ns, cursor)
+                cursor = end_ns
+        total_ns = now_ns - self.start_ns
+        # "other": lo que no cubre ningún tramo (routing, validación, serialización)
+        durations["other"] = max(0, total_ns - covered_ns)
+        entries = [f"{name};dur={elapsed_ns / 1e6:.3f}" for name, elapsed_ns in durations.items()]
+        entries.append(f"total;dur={total_ns / 1e6:.3f}")
+        return ", ".join(entries)
+
+    def summary(self):
+        return {
+            "trace_id": self.trace_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "sampled": self.sampled,
+            "spans": len(self.spans),
+            "dropped_spans": self.dropped_spans,
+        }
+
+    def to_dict(self):
+        return {
+            **self.summary(),
+            "timings": {name: {"duration_ms": round(elapsed_ns / 1e6, 3), "calls": calls}
+                        for name, (elapsed_ns, calls) in self.timings.items()},
+            "span_tree": [span.to_dict(self.start_ns) for span in self.spans],
+        }
+
+
+@contextmanager
+def span(name, **attributes):
+    """Mide un tramo anidado en la traza actual; sin traza activa no hace nada"""
+    trace = _current_trace.get()
+    if trace is None or trace.finished:
+        yield None
+        return
+    if len(trace.spans) >= MAX_SPANS:
+        trace.dropped_spans += 1
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(name, len(trace.spans) + 1, parent.span_id if parent else None,
+                   time.perf_counter_ns(), attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+
+
+def traced(name):
+    """Decorador: la llamada completa (función o corrutina) como un tramo"""
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attributes):
+    """Añade atributos al tramo en curso (si lo hay)"""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def add_timing(name, elapsed_ns):
+    """Suma tiempo a un contador de la traza actual sin crear un tramo"""
+    trace = _current_trace.get()
+    if trace is not None:
+        timing = trace.timings.get(name)
+        if timing is None:
+            trace.timings[name] = [elapsed_ns, 1]
+        else:
+            timing[0] += elapsed_ns
+            timing[1] += 1
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+class TraceBuffer:
+    """
+    Trazas conservadas en memoria acotada: las elegidas al inicio (muestreo
+    de cabeza) y, al terminar, las lentas o con error (muestreo de cola).
+    """
+
+    def __init__(self, max_traces, sample_rate, slow_ms):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._traces = deque(maxlen=max_traces)
+        self._lock = Lock()
+        self.seen = 0
+        self.kept = 0
+
+    def should_sample(self):
+        return random.random() < self.sample_rate
+
+    def offer(self, trace):
+        self.seen += 1
+        if trace.sampled or trace.duration_ms >= self.slow_ms or (trace.status or 500) >= 500:
+            with self._lock:
+                self._traces.append(trace)
+            self.kept += 1
+
+    def query(self, limit=50, min_ms=None, path=None):
+        """Resúmenes más recientes primero, filtrando por duración mínima y prefijo de ruta"""
+        with self._lock:
+            traces = list(self._traces)
+        result = []
+        for trace in reversed(traces):
+            if (min_ms is not None and trace.duration_ms < min_ms) or (path and not trace.path.startswith(path)):
+                continue
+            result.append(trace.summary())
+            if len(result) >= limit:
+                break
+        return result
+
+    def get(self, trace_id):
+        with self._lock:
+            return next((trace for trace in self._traces if trace.trace_id == trace_id), None)
+
+
+class TracingMiddleware:
+    """
+    Middleware ASGI: abre una traza por petición HTTP, añade Server-Timing a
+    la respuesta y entrega la traza terminada al buffer (que decide si se queda).
+    """
+
+    def __init__(self, app, buffer):
+        self.app = app
+        self.buffer = buffer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = Trace(scope["method"], scope["path"], self.buffer.should_sample())
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                trace.response_ns = time.perf_counter_ns()
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            trace.end_ns = time.perf_counter_ns()
+            _current_trace.reset(token)
+            self.buffer.offer(trace)
@@ -0,0 +1,377 @@
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Benchmarks reproducibles: micro (servicios, parser de logs, Monitor) y macro (todos los
+# endpoints en proceso contra un stub local de PokeAPI). Los resultados se guardan en JSON
+# y --compare marca las regresiones frente a un resultado anterior (baseline).
+
+MODULES = ("PokeAPI", "PokeStats", "PokeImages", "PokeSearch")
+FUNCTIONS = {"PokeAPI": "get_pokemon", "PokeStats": "get_stats", "PokeImages": "get_image",
+             "PokeSearch": "search_pokemon"}
+
+
+# --- medición ---
+
+def measure(function, target_time=0.002, samples=15, max_time=5.0):
+    """
+    Tiempo por llamada (µs). Cada muestra repite la llamada `number` veces,
+    calibrado para que dure al menos target_time; se toman hasta `samples`
+    muestras sin pasar de max_time (mínimo 3).
+    """
+    started = time.perf_counter()
+    function()  # calentamiento (cachés, JIT de regex, conexiones)
+    number = 1
+    elapsed = time.perf_counter() - started
+    while elapsed < target_time:
+        number *= 10 if elapsed < target_time / 10 else 2
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - started
+    per_call = []
+    deadline = time.perf_counter() + max_time
+    while len(per_call) < samples and (len(per_call) < 3 or time.perf_counter() < deadline):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            function()
+        per_call.append((time.perf_counter_ns() - started) / number / 1000)
+    return summarize(per_call, number)
+
+
+def summarize(per_call, number):
+    ordered = sorted(per_call)
+    median = statistics.median(ordered)
+    return {
+        "unit": "us",
+        "samples": len(ordered),
+        "number": number,
+        "min": round(ordered[0], 3),
+        "median": round(median, 3),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)], 3),
+        "stdev": round(statistics.stdev(ordered), 3) if len(ordered) > 1 else 0.0,
+        "ops_per_sec": round(1e6 / median, 1) if median else None,
+    }
+
+
+# --- datos generados ---
+
+def generate_log(path, lines, seed=0, days=30):
+    """Log de texto con el formato de CustomLogger: mitad líneas de servicio, mitad log_request"""
+    rng = random.Random(seed)
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    step = (end - start).total_seconds() / lines
+    chunk = []
+    with open(path, "w") as file:
+        for index in range(lines):
+            stamp = (start + timedelta(seconds=index * step)).strftime("%Y-%m-%d %H:%M:%S")
+            module = MODULES[index % len(MODULES)]
+            latency = round(rng.lognormvariate(3, 0.8), 3)
+            if index % 2:
+                status = 500 if rng.random() < 0.01 else 404 if rng.random() < 0.03 else 200
+                chunk.append(f"{stamp}|Monitor|{FUNCTIONS[module]}|log_request|Request logged"
+                             f" | Status: {status} | Latency: {latency}ms\n")
+            else:
+                chunk.append(f"{stamp}|{module}|{module.lower()}|{FUNCTIONS[module]}|Data fetched"
+                             f" | Latency: {latency}ms\n")
+            if len(chunk) >= 10000:
+                file.writelines(chunk)
+                chunk.clear()
+        file.writelines(chunk)
+    return path
+
+
+def populate_monitor(monitor, requests, seed=0, days=30):
+    """Peticiones sintéticas repartidas en `days` días (rollups) y en las últimas 3 horas (memoria)"""
+    rng = random.Random(seed)
+    now = time.time()
+    for index in range(requests):
+        module = MODULES[index % len(MODULES)]
+        status = 500 if rng.random() < 0.01 else 404 if rng.random() < 0.03 else 200
+        latency = round(rng.lognormvariate(3, 0.8), 3)
+        monitor.rollups.add(now - rng.random() * days * 86400, module, FUNCTIONS[module], status, latency)
+        monitor.store.record(module, FUNCTIONS[module], status, latency, now - rng.random() * 3 * 3600)
+    monitor.rollups.flush()
+
+
+# --- suites ---
+
+def micro_benchmarks(args, workdir):
+    from app.models.pokemon import PokemonStats
+    from app.services.image_service import ImageService
+    from app.services.stats_service import StatsService
+    from app.utils.metrics_store import MINUTE, HOUR
+    from app.utils.monitoring import Monitor
+    from app.utils.rollup_store import RollupStore
+    from app.utils.log_columns import parse_file
+    from bot_analyzer import BotAnalyzer
+
+    stats = StatsService()
+    images = ImageService()
+    with open("data/pokemon_stats.csv", mode='r', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+
+    bench_monitor = Monitor()
+    if bench_monitor.rollups is not None:
+        bench_monitor.rollups.close()
+    bench_monitor.rollups = RollupStore(os.path.join(workdir, "bench_rollups.sqlite3"))
+    populate_monitor(bench_monitor, args.monitor_requests, args.seed)
+    now = datetime.now()
+    week_ago = now - timedelta(days=7)
+
+    cases = [
+        ("stats.get_stats[name]", lambda: stats.get_stats("Charizard"), {}),
+        ("stats.get_stats[id]", lambda: stats.get_stats("6"), {}),
+        ("images.get_all_images", lambda: images.get_all_images("Pikachu"), {}),
+        ("PokemonStats.from_csv_row", lambda: [PokemonStats.from_csv_row(row) for row in rows],
+         {"per_call": len(rows)}),
+        ("monitor.log_request", lambda: bench_monitor.log_request("PokeBench", "bench", 200, 12.5), {}),
+        ("monitor.get_latency_percentiles[7d]",
+         lambda: bench_monitor.get_latency_percentiles("PokeAPI", week_ago, now), {}),
+        ("monitor.get_availability[30d]", lambda: bench_monitor.get_availability("PokeAPI", 30), {}),
+        ("monitor.get_series[hour,7d]",
+         lambda: bench_monitor.get_series("PokeAPI", HOUR, week_ago.timestamp(), now.timestamp()), {}),
+        ("monitor.get_series[minute,3h]",
+         lambda: bench_monitor.get_series("PokeAPI", MINUTE, now.timestamp() - 3 * 3600, now.timestamp()), {}),
+    ]
+
+    if args.log_lines:
+        log_path = os.path.join(workdir, "bench_monitoring.log")
+        started = time.perf_counter()
+        generate_log(log_path, args.log_lines, args.seed)
+        print(f"Generated {args.log_lines} log lines in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        # Construir el analizador ya parsea una vez (cuenta como calentamiento)
+        analyzer = BotAnalyzer(log_path)
+        heavy = {"samples": args.heavy_samples, "max_time": math.inf}
+        cases += [
+            (f"bot_analyzer._parse_logs[{args.log_lines}]", analyzer._parse_logs, heavy),
+            (f"log_columns.parse_file[{args.log_lines}]", lambda: parse_file(log_path, args.workers), heavy),
+        ]
+    return cases
+
+
+def macro_benchmarks(client):
+    from app.services.pokeapi_service import PokeAPIService
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+    etag = client.get("/api/images/Pikachu/0").headers.get("etag", "")
+    names = ["pikachu", "charizard", "bulbasaur", "mewtwo", "squirtle", "eevee", "mew", "ditto",
+             "gyarados", "snorlax", "charzard", "25", "150", "lucario", "gengar", "dragonite",
+             "jigglypuff", "psyduck", "onix", "magikarp"]
+    # Caché de PokeAPI vacía en cada llamada: el tiempo incluye la petición al stub
+    cold = {"before": PokeAPIService.cache.clear}
+    return [
+        ("GET /api/pokemon/{name}", "GET", "/api/pokemon/pikachu", {}, {}),
+        ("GET /api/pokemon/{name}[cold]", "GET", "/api/pokemon/pikachu", {}, cold),
+        ("POST /poke/search/", "POST", "/poke/search/", {"json": {"pokemon_name": "charizard"}}, {}),
+        ("POST /poke/search/[cold]", "POST", "/poke/search/", {"json": {"pokemon_name": "charizard"}}, cold),
+        ("POST /poke/search/batch[20]", "POST", "/poke/search/batch", {"json": {"pokemon_names": names}}, {}),
+        ("GET /poke/suggest", "GET", "/poke/suggest?q=char", {}, {}),
+        ("GET /api/stats/query", "GET", "/api/stats/query?type1=Fire&sort_by=attack&limit=10", {}, {}),
+        ("GET /api/stats/{id}", "GET", "/api/stats/25", {}, {}),
+        ("GET /api/stats/{id}/forms", "GET", "/api/stats/charizard/forms", {}, {}),
+        ("GET /api/images/{name}", "GET", "/api/images/Pikachu", {}, {}),
+        ("GET /api/images/{name}/{index}", "GET", "/api/images/Pikachu/0", {}, {}),
+        ("GET /api/images/{name}/{index}[304]", "GET", "/api/images/Pikachu/0",
+         {"headers": {"If-None-Match": etag}}, {}),
+        ("GET /api/images/{name}/{index}[96x96 webp]", "GET", "/api/images/Pikachu/0?w=96&h=96&format=webp", {}, {}),
+        ("GET /api/images/{name}/bundle", "GET", "/api/images/Pikachu/bundle", {}, {}),
+        ("GET /metrics", "GET", "/metrics", {}, {}),
+        ("GET /bot/CheckLatency", "GET",
+         f"/bot/CheckLatency?module=PokeAPI&start_date={week_ago}&end_date={today}", {}, {}),
+        ("GET /bot/CheckAvailability", "GET", "/bot/CheckAvailability?module=PokeAPI&days=7", {}, {}),
+        ("GET /bot/CheckCache", "GET", "/bot/CheckCache", {}, {}),
+        ("GET /bot/CheckLogging", "GET", "/bot/CheckLogging", {}, {}),
+        ("GET /bot/RenderGraph", "GET", "/bot/RenderGraph?module=PokeAPI&resolution=hour&days=1", {}, {}),
+        ("GET /debug/traces", "GET", "/debug/traces", {}, {}),
+    ]
+
+
+def run_micro(args, workdir, results):
+    for name, function, options in micro_benchmarks(args, workdir):
+        if not _selected(args, name):
+            continue
+        per_call = options.get("per_call", 1)
+        result = measure(function, samples=options.get("samples", args.samples),
+                         max_time=options.get("max_time", args.max_time))
+        if per_call > 1:
+            # Tiempo por elemento (p. ej. por fila del CSV)
+            result = {**result, **{key: round(result[key] / per_call, 3) for key in ("min", "median", "mean", "p95", "stdev")},
+                      "ops_per_sec": round(result["ops_per_sec"] * per_call, 1), "per_call": per_call}
+        _report(results, "micro", name, result)
+
+
+def run_macro(args, results, stub):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        for name, method, url, kwargs, options in macro_benchmarks(client):
+            if not _selected(args, name):
+                continue
+            statuses = {}
+            before = options.get("before")
+
+            def call():
+                if before is not None:
+                    before()
+                status = client.request(method, url, **kwargs).status_code
+                statuses[status] = statuses.get(status, 0) + 1
+
+            result = measure(call, samples=args.samples, max_time=args.max_time)
+            _report(results, "macro", name, {**result, "statuses": {str(k): v for k, v in sorted(statuses.items())}})
+    results["stub"] = {"requests": stub.settings.requests, "errors": stub.settings.errors,
+                       "timeouts": stub.settings.timeouts}
+
+
+def _selected(args, name):
+    return not args.filter or any(part in name for part in args.filter.split(","))
+
+
+def _report(results, group, name, result):
+    results["results"][name] = {"group": group, **result}
+    statuses = f"  {result['statuses']}" if "statuses" in result else ""
+    print(f"{group:5} {name:48} median {_format_us(result['median']):>10}  p95 {_format_us(result['p95']):>10}"
+          f"  ({result['samples']}x{result['number']}){statuses}", file=sys.stderr)
+
+
+def _format_us(value):
+    if value >= 1e6:
+        return f"{value / 1e6:.2f}s"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f}ms"
+    return f"{value:.2f}us"
+
+
+# --- comparación ---
+
+def compare(baseline, current, threshold=0.10, min_delta_us=1.0):
+    """
+    Compara medianas: regresión si la actual supera a la del baseline en más de
+    `threshold` (relativo) y de `min_delta_us` (absoluto, para ignorar ruido en
+    operaciones de pocos µs). Devuelve (filas, nº de regresiones).
+    """
+    rows = []
+    regressions = 0
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if before is None or after is None:
+            rows.append((name, before and before["median"], after and after["median"], None,
+                         "new" if before is None else "missing"))
+            continue
+        change = (after["median"] - before["median"]) / before["median"] if before["median"] else 0.0
+        if change > threshold and after["median"] - before["median"] > min_delta_us:
+            status = "REGRESSION"
+            regressions += 1
+        elif change < -threshold and before["median"] - after["median"] > min_delta_us:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, before["median"], after["median"], change, status))
+    return rows, regressions
+
+
+def print_comparison(rows):
+    print(f"{'benchmark':48} {'baseline':>10} {'current':>10} {'change':>8}  status")
+    for name, before, after, change, status in rows:
+        print(f"{name:48} {_format_us(before) if before is not None else '-':>10}"
+              f" {_format_us(after) if after is not None else '-':>10}"
+              f" {f'{change * 100:+.1f}%' if change is not None else '':>8}  {status}")
+
+
+def _metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {key: value for key, value in vars(args).items() if key not in ("compare", "results_file")},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks micro y macro con stub local de PokeAPI")
+    parser.add_argument("--suite", choices=("all", "micro", "macro"), default="all")
+    parser.add_argument("--filter", default=None, help="Solo los benchmarks cuyo nombre contenga alguno de estos textos (a,b)")
+    parser.add_argument("--samples", type=int, default=15, help="Muestras por benchmark")
+    parser.add_argument("--max-time", type=float, default=5.0, help="Segundos máximos por benchmark")
+    parser.add_argument("--log-lines", type=int, default=2_000_000, help="Líneas del log generado (0 = sin benchmarks de parser)")
+    parser.add_argument("--heavy-samples", type=int, default=3, help="Muestras de los benchmarks de parser")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de log_columns.parse_file")
+    parser.add_argument("--monitor-requests", type=int, default=200_000, help="Peticiones sintéticas en el Monitor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0)
+    parser.add_argument("--stub-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-timeout-rate", type=float, default=0.0)
+    parser.add_argument("--keep-workdir", action="store_true", help="Conservar el directorio temporal (logs, rollups)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Fichero JSON de resultados")
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="Resultado anterior con el que comparar")
+    parser.add_argument("--results", dest="results_file", default=None,
+                        help="Comparar este fichero con --compare sin ejecutar los benchmarks")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Aumento relativo de la mediana que cuenta como regresión")
+    parser.add_argument("--min-delta-us", type=float, default=1.0, help="Aumento absoluto mínimo (µs) para contar como regresión")
+    args = parser.parse_args()
+
+    if args.results_file:
+        with open(args.results_file) as file:
+            results = json.load(file)
+    else:
+        from pokeapi_stub import StubServer, StubSettings
+
+        # Todo lo que escribe la aplicación va a un directorio temporal; PokeAPI es el stub local
+        workdir = tempfile.mkdtemp(prefix="pokebench-")
+        stub = StubServer(StubSettings(args.stub_latency_ms, args.stub_jitter_ms, args.stub_error_rate,
+                                       args.stub_timeout_rate, seed=args.seed))
+        os.environ.update({
+            "POKEAPI_BASE_URL": stub.start(),
+            "POKEAPI_STORE_PATH": "",
+            "LOG_FILE": os.path.join(workdir, "monitoring.log"),
+            "LOG_SEGMENT_DIR": os.path.join(workdir, "segments"),
+            "LOG_CONSOLE": "false",
+            "ROLLUP_DB_PATH": os.path.join(workdir, "rollups.sqlite3"),
+            "IMAGE_DERIVATIVE_DIR": os.path.join(workdir, "derivatives"),
+        })
+        results = {"meta": _metadata(args), "results": {}}
+        try:
+            if args.suite in ("all", "micro"):
+                run_micro(args, workdir, results)
+            if args.suite in ("all", "macro"):
+                run_macro(args, results, stub)
+        finally:
+            stub.stop()
+            if not args.keep_workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results: {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        rows, regressions = compare(baseline, results, args.threshold, args.min_delta_us)
+        print_comparison(rows)
+        print(f"{regressions} regression(s) over {args.threshold:.0%} (baseline {baseline['meta'].get('commit')},"
+              f" current {results['meta'].get('commit')})")
+        sys.exit(1 if regressions else 0)
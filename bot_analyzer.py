@@ -1,47 +1,130 @@
+import argparse
 import re
+import time
 from datetime import datetime, timedelta
 from collections import defaultdict
 import math
+from pathlib import Path
+import numpy as np
+from app import config
+from app.utils.log_columns import parse_file
+from app.utils.rollup_store import RollupStore
+from app.utils.log_segments import iter_records
+from app.utils.log_tail import LogTail
+
+LOG_PATTERN = re.compile(
+    r'(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|'
+    r'(?P<module>[^|]+)\|'
+    r'(?P<submodule>[^|]+)\|'
+    r'(?P<function>[^|]+)\|'
+    r'(?P<message>.*)'
+)
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def parse_line(line):
+    """Línea del log de texto -> dict (o None si no tiene el formato esperado)"""
+    match = LOG_PATTERN.match(line.strip())
+    if not match:
+        return None
+    log_data = match.groupdict()
+    # Extraer información adicional del mensaje
+    latency_match = re.search(r'Latency: (\d+(?:\.\d+)?)ms', log_data['message'])
+    status_match = re.search(r'Status: (\d+)', log_data['message'])
+    return {
+        'timestamp': datetime.strptime(log_data['timestamp'], "%Y-%m-%d %H:%M:%S"),
+        'module': log_data['module'],
+        'submodule': log_data['submodule'],
+        'function': log_data['function'],
+        'message': log_data['message'],
+        'latency': float(latency_match.group(1)) if latency_match else 0,
+        'status': int(status_match.group(1)) if status_match else 200
+    }
+
 
 class BotAnalyzer:
-    def __init__(self, log_file="logs/monitoring.log"):
+    def __init__(self, log_file="logs/monitoring.log", segment_dir=None, incremental=False,
+                 rollup_db=None, bulk=False, workers=None):
         self.log_file = log_file
-        self.logs = self._parse_logs()
+        # Con el log estructurado (segmentos JSONL) se lee bajo demanda solo el rango pedido
+        self.segment_dir = segment_dir
+        # Modo incremental: solo se parsean las líneas nuevas y se suman a los rollups
+        self.incremental = incremental
+        self.logs = None
+        self.columns = None
+        self.rollups = None
+        if bulk:
+            # Parser por bloques en paralelo con salida en columnas NumPy
+            self.columns = parse_file(log_file, workers)
+        elif incremental or rollup_db:
+            # La app ya suma cada petición a su base de rollups: volver a ingerir el log la contaría dos veces
+            if incremental and rollup_db and config.ROLLUP_DB_PATH and \
+                    Path(rollup_db).resolve() == Path(config.ROLLUP_DB_PATH).resolve():
+                raise ValueError(f"--incremental cannot ingest into the app's rollup database ({rollup_db}); "
+                                 "use a separate --rollups file or read it without --incremental")
+            # Informes sobre agregados por hora/día en SQLite (p. ej. data/rollups.sqlite3 de la app)
+            self.rollups = RollupStore(rollup_db or "logs/bot_rollups.sqlite3")
+            if incremental:
+                self.tail = LogTail(log_file, *self.rollups.get_checkpoint(str(log_file)))
+                self.refresh()
+        elif segment_dir is None:
+            self.logs = self._parse_logs()
+    
+    def refresh(self):
+        """Incorpora las líneas añadidas al log desde el último checkpoint; devuelve cuántas"""
+        if not self.incremental:
+            return 0
+        ingested = 0
+        for line in self.tail.read_new():
+            log = parse_line(line)
+            if log is not None:
+                self.rollups.add(log['timestamp'].timestamp(), log['module'], log['function'],
+                                 log['status'], log['latency'])
+                ingested += 1
+        # Agregados y checkpoint (inodo, offset) se guardan en la misma transacción
+        self.rollups.flush((str(self.log_file), self.tail.inode, self.tail.offset))
+        return ingested
+    
+    def follow(self, interval=5, callback=None):
+        """Sigue el log indefinidamente, incorporando lo nuevo cada `interval` segundos"""
+        while True:
+            ingested = self.refresh()
+            if callback is not None:
+                callback(ingested)
+            time.sleep(interval)
     
     def _parse_logs(self):
         """Extrae datos estructurados del archivo de log con el nuevo formato"""
         logs = []
-        log_pattern = re.compile(
-            r'(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|'
-            r'(?P<module>[^|]+)\|'
-            r'(?P<submodule>[^|]+)\|'
-            r'(?P<function>[^|]+)\|'
-            r'(?P<message>.*)'
-        )
-        
         with open(self.log_file, 'r') as f:
             for line in f:
-                match = log_pattern.match(line.strip())
-                if match:
-                    log_data = match.groupdict()
-                    # Extraer información adicional del mensaje
-                    latency_match = re.search(r'Latency: (\d+)ms', log_data['message'])
-                    status_match = re.search(r'Status: (\d+)', log_data['message'])
-                    
-                    log_entry = {
-                        'timestamp': datetime.strptime(log_data['timestamp'], "%Y-%m-%d %H:%M:%S"),
-                        'module': log_data['module'],
-                        'submodule': log_data['submodule'],
-                        'function': log_data['function'],
-                        'message': log_data['message'],
-                        'latency': int(latency_match.group(1)) if latency_match else 0,
-                        'status': int(status_match.group(1)) if status_match else 200
-                    }
+                log_entry = parse_line(line)
+                if log_entry:
                     logs.append(log_entry)
         return logs
     
+    @staticmethod
+    def _from_structured(record):
+        """Registro JSONL -> mismo formato que _parse_logs (campos ya tipados)"""
+        return {
+            'timestamp': datetime.fromtimestamp(record['ts']),
+            'module': record['module'],
+            'submodule': record['api'],
+            'function': record['function'],
+            'message': '',
+            'latency': record['latency_us'] / 1000 if record['latency_us'] is not None else 0,
+            'status': record['status'] if record['status'] is not None else 200
+        }
+    
     def _filter_logs(self, module=None, start_date=None, end_date=None, function=None):
         """Filtra logs según criterios"""
+        if self.segment_dir is not None:
+            # Los segmentos fuera del rango se descartan por su índice, sin leerlos
+            start = datetime.strptime(start_date, "%Y-%m-%d").timestamp() if start_date else None
+            end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).timestamp() if end_date else None
+            return [self._from_structured(record)
+                    for record in iter_records(self.segment_dir, start, end, module, function)]
+        
         filtered = self.logs
         
         if module:
@@ -57,24 +140,78 @@ class BotAnalyzer:
             
         return filtered
     
+    @staticmethod
+    def _percentile(sorted_values, q):
+        """Percentil por rango más cercano sobre una lista ya ordenada"""
+        rank = max(1, math.ceil(q * len(sorted_values)))
+        return sorted_values[rank - 1]
+    
+    def _daily(self, module=None, start_date=None, end_date=None, function=None):
+        """Estadísticas por día [(fecha, {count, success, errors, avg_latency, percentiles, max_latency})]"""
+        if self.rollups is not None:
+            self.refresh()
+            start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+            end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).date() if end_date else None
+            return sorted(self.rollups.daily(module, start, end, function).items())
+        if self.columns is not None:
+            return self._daily_columns(module, start_date, end_date, function)
+        
+        # Agrupar por día
+        daily_data = defaultdict(list)
+        for log in self._filter_logs(module, start_date, end_date, function):
+            daily_data[log['timestamp'].date()].append(log)
+        
+        results = []
+        for date, logs in sorted(daily_data.items()):
+            latencies = sorted(log['latency'] for log in logs)
+            success = sum(1 for log in logs if log['status'] == 200)
+            results.append((date, {
+                'count': len(logs), 'success': success, 'errors': len(logs) - success,
+                'avg_latency': sum(latencies) / len(latencies),
+                'percentiles': {q: self._percentile(latencies, q) for q in QUANTILES},
+                'max_latency': latencies[-1],
+            }))
+        return results
+    
+    def _daily_columns(self, module=None, start_date=None, end_date=None, function=None):
+        """Igual que _daily pero vectorizado sobre las columnas del modo bulk"""
+        columns = self.columns
+        start = datetime.strptime(start_date, "%Y-%m-%d").toordinal() if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d").toordinal() + 1 if end_date else None
+        mask = columns.mask(module, function, start, end)
+        days = columns.day[mask]
+        latency = columns.latency[mask]
+        success = columns.status[mask] == 200
+        # Ordenar por (día, latencia): cada día queda contiguo y ya ordenado para los percentiles
+        order = np.lexsort((latency, days))
+        days, latency, success = days[order], latency[order], success[order]
+        unique_days, starts, counts = np.unique(days, return_index=True, return_counts=True)
+        
+        results = []
+        for day, first, count in zip(unique_days.tolist(), starts.tolist(), counts.tolist()):
+            latencies = latency[first:first + count]
+            successes = int(success[first:first + count].sum())
+            results.append((datetime.fromordinal(day).date(), {
+                'count': count, 'success': successes, 'errors': count - successes,
+                'avg_latency': float(latencies.mean()),
+                'percentiles': {q: float(latencies[max(1, math.ceil(q * count)) - 1]) for q in QUANTILES},
+                'max_latency': float(latencies[-1]),
+            }))
+        return results
+    
     def check_latency(self, module=None, start_date=None, end_date=None, function=None):
         """Muestra la latencia de la aplicación para un módulo en un periodo"""
-        filtered = self._filter_logs(module, start_date, end_date, function)
+        daily_data = self._daily(module, start_date, end_date, function)
         
-        if not filtered:
+        if not daily_data:
             return "No hay datos para los criterios especificados"
-            
-        # Agrupar por día
-        daily_data = defaultdict(list)
-        for log in filtered:
-            date_str = log['timestamp'].strftime("%m/%d")
-            daily_data[date_str].append(log['latency'])
         
-        # Calcular promedios diarios
+        # Promedio y percentiles diarios (la media oculta la cola)
         results = []
-        for date, latencies in sorted(daily_data.items()):
-            avg_latency = sum(latencies) / len(latencies)
-            results.append(f"{date} {avg_latency:.0f}ms")
+        for date, data in daily_data:
+            p50, p90, p95, p99 = (data['percentiles'][q] for q in QUANTILES)
+            results.append(f"{date.strftime('%m/%d')} avg {data['avg_latency']:.3f}ms p50 {p50:.3f}ms "
+                           f"p90 {p90:.3f}ms p95 {p95:.3f}ms p99 {p99:.3f}ms max {data['max_latency']:.3f}ms")
         
         header = f"Latency report for {module or 'all modules'}"
         if function:
@@ -89,32 +226,22 @@ class BotAnalyzer:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        filtered = self._filter_logs(
+        daily_data = self._daily(
             module=module,
             start_date=start_date.strftime("%Y-%m-%d"),
             end_date=end_date.strftime("%Y-%m-%d"),
             function=function
         )
         
-        if not filtered:
+        if not daily_data:
             return "No hay datos para los criterios especificados"
-            
-        # Agrupar por día
-        daily_data = defaultdict(lambda: {'success': 0, 'errors': 0})
-        for log in filtered:
-            date_str = log['timestamp'].strftime("%m/%d")
-            if log['status'] == 200:
-                daily_data[date_str]['success'] += 1
-            else:
-                daily_data[date_str]['errors'] += 1
         
         # Calcular disponibilidad diaria
         results = []
-        for date in sorted(daily_data.keys()):
-            data = daily_data[date]
+        for date, data in daily_data:
             total = data['success'] + data['errors']
             availability = (data['success'] / total) * 100 if total > 0 else 0
-            results.append(f"{date} {availability:.1f}% (Success: {data['success']}, Errors: {data['errors']})")
+            results.append(f"{date.strftime('%m/%d')} {availability:.1f}% (Success: {data['success']}, Errors: {data['errors']})")
         
         header = f"Availability report for {module or 'all modules'} - Last {days} days"
         if function:
@@ -127,53 +254,24 @@ class BotAnalyzer:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
+        if metric.lower() not in ("latency", "availability"):
+            return "Métrica no válida. Use 'latency' o 'availability'"
+        
+        daily_data = self._daily(
+            module=module,
+            start_date=start_date.strftime("%Y-%m-%d"),
+            end_date=end_date.strftime("%Y-%m-%d"),
+            function=function
+        )
+        dates = [date.strftime("%m/%d") for date, _ in daily_data]
+        
         # Obtener datos según la métrica
         if metric.lower() == "latency":
-            filtered = self._filter_logs(
-                module=module,
-                start_date=start_date.strftime("%Y-%m-%d"),
-                end_date=end_date.strftime("%Y-%m-%d"),
-                function=function
-            )
-            
-            # Agrupar por día y calcular promedio
-            daily_data = defaultdict(list)
-            for log in filtered:
-                date_str = log['timestamp'].strftime("%m/%d")
-                daily_data[date_str].append(log['latency'])
-            
-            dates = sorted(daily_data.keys())
-            values = [sum(daily_data[date])/len(daily_data[date]) for date in dates]
+            values = [data['avg_latency'] for _, data in daily_data]
             title = f"Latency Trend for {module or 'all modules'}"
-            
-        elif metric.lower() == "availability":
-            filtered = self._filter_logs(
-                module=module,
-                start_date=start_date.strftime("%Y-%m-%d"),
-                end_date=end_date.strftime("%Y-%m-%d"),
-                function=function
-            )
-            
-            # Agrupar por día y calcular disponibilidad
-            daily_data = defaultdict(lambda: {'success': 0, 'errors': 0})
-            for log in filtered:
-                date_str = log['timestamp'].strftime("%m/%d")
-                if log['status'] == 200:
-                    daily_data[date_str]['success'] += 1
-                else:
-                    daily_data[date_str]['errors'] += 1
-            
-            dates = sorted(daily_data.keys())
-            values = []
-            for date in dates:
-                data = daily_data[date]
-                total = data['success'] + data['errors']
-                availability = (data['success'] / total) * 100 if total > 0 else 0
-                values.append(availability)
-            title = f"Availability Trend for {module or 'all modules'}"
-        
         else:
-            return "Métrica no válida. Use 'latency' o 'availability'"
+            values = [(data['success'] / data['count']) * 100 for _, data in daily_data]
+            title = f"Availability Trend for {module or 'all modules'}"
         
         if not dates:
             return "No hay datos para mostrar el gráfico"
@@ -183,7 +281,7 @@ class BotAnalyzer:
         min_val = min(values)
         range_val = max_val - min_val if max_val != min_val else 1
         
-        scaled_values = [int((val - min_val) / range_val) * height for val in values]
+        scaled_values = [int(round((val - min_val) / range_val * height)) for val in values]
         
         # Construir gráfico ASCII
         graph_lines = []
@@ -205,7 +303,33 @@ class BotAnalyzer:
 
 # Interfaz de usuario simple
 if __name__ == "__main__":
-    analyzer = BotAnalyzer()
+    parser = argparse.ArgumentParser(description="Bot Analyzer")
+    parser.add_argument("--log-file", default="logs/monitoring.log")
+    parser.add_argument("--segments", default=None,
+                        help="Directorio del log estructurado (p. ej. logs/segments) en lugar del log de texto")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Parsear solo lo nuevo desde el último checkpoint y sumarlo a los rollups")
+    parser.add_argument("--rollups", default=None,
+                        help="Base de rollups (por defecto logs/bot_rollups.sqlite3 con --incremental). "
+                             "data/rollups.sqlite3, la que escribe la app, solo se puede leer: "
+                             "no se combina con --incremental/--follow")
+    parser.add_argument("--follow", type=float, default=None, metavar="SECONDS",
+                        help="Seguir el log (implica --incremental) en lugar del menú interactivo")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Parsear el log completo por bloques en paralelo (logs grandes)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para --bulk (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+    try:
+        analyzer = BotAnalyzer(args.log_file, args.segments, args.incremental or args.follow is not None,
+                               args.rollups, args.bulk, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.follow is not None:
+        def report(ingested):
+            if ingested:
+                print(f"{datetime.now():%Y-%m-%d %H:%M:%S} ingested {ingested} lines")
+        analyzer.follow(args.follow, report)
     
     print("=== Bot Analyzer ===")
     print("1. Check Latency")
@@ -0,0 +1,77 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from pokeapi_stub import StubServer, StubSettings
+
+# Prueba de carga sin interfaz: stub de PokeAPI + servidor local + Locust (locustfile.py).
+# Las opciones que no reconoce este script se pasan a Locust (p. ej. --slo, --zipf-s).
+
+
+def wait_ready(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server not ready: {url}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga sin interfaz con stub de PokeAPI e informe SLO")
+    parser.add_argument("--load-profile", choices=("steady", "spike", "soak"), default="steady")
+    parser.add_argument("-u", "--users", type=int, default=50)
+    parser.add_argument("-r", "--spawn-rate", type=float, default=10)
+    parser.add_argument("-t", "--run-time", default="2m", help="Duración (p. ej. 90s, 10m, 4h)")
+    parser.add_argument("--port", type=int, default=8010, help="Puerto del servidor bajo prueba")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    parser.add_argument("--stub-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-timeout-rate", type=float, default=0.0)
+    parser.add_argument("--report", default="loadtest_report.json", help="Informe JSON (p50/p95/p99, rps, errores, SLO)")
+    parser.add_argument("--keep-workdir", action="store_true", help="Conservar logs y rollups del servidor")
+    args, locust_args = parser.parse_known_args()
+
+    workdir = tempfile.mkdtemp(prefix="pokeload-")
+    stub = StubServer(StubSettings(args.stub_latency_ms, args.stub_jitter_ms, args.stub_error_rate,
+                                   args.stub_timeout_rate))
+    env = {
+        **os.environ,
+        "POKEAPI_BASE_URL": stub.start(),
+        "POKEAPI_STORE_PATH": "",
+        "LOG_FILE": os.path.join(workdir, "monitoring.log"),
+        "LOG_SEGMENT_DIR": os.path.join(workdir, "segments"),
+        "LOG_CONSOLE": "false",
+        "ROLLUP_DB_PATH": os.path.join(workdir, "rollups.sqlite3"),
+        "IMAGE_DERIVATIVE_DIR": os.path.join(workdir, "derivatives"),
+    }
+    host = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                               "--port", str(args.port), "--workers", str(args.workers),
+                               "--log-level", "warning", "--no-access-log"], env=env)
+    try:
+        wait_ready(f"{host}/bot/CheckCache")
+        command = [sys.executable, "-m", "locust", "-f", "locustfile.py", "--headless", "--only-summary",
+                   "--host", host, "-u", str(args.users), "-r", str(args.spawn_rate), "-t", args.run_time,
+                   "--load-profile", args.load_profile, "--report", args.report, *locust_args]
+        exit_code = subprocess.run(command).returncode
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        stub.stop()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print(f"Report: {args.report} | stub: {stub.settings.requests} requests, {stub.settings.errors} errors,"
+          f" {stub.settings.timeouts} timeouts")
+    sys.exit(exit_code)
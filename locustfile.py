@@ -1,49 +1,369 @@
-from locust import HttpUser, task, between
+import bisect
+import csv
+import itertools
+import json
+import os
 import random
+import string
+import sys
+from datetime import datetime, timedelta
+from locust import HttpUser, LoadTestShape, task, between, constant_pacing, events
+from locust.runners import WorkerRunner
+
+# Escenarios de carga: nombres reales (images/ + CSV de stats) con popularidad Zipf,
+# erratas y 404, galerías de imágenes, paneles que consultan /bot/* y perfiles
+# steady/spike/soak. Al terminar se genera un informe JSON comprobado contra los SLO.
+# Uso sin interfaz (con stub de PokeAPI y servidor local): python loadtest.py
+# El perfil (forma de carga) solo se activa con --load-profile o LOCUST_LOAD_PROFILE.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SLO = "p95=1000,p99=2500,error_rate=0.01"
+BOT_MODULES = ("PokeAPI", "PokeStats", "PokeImages", "PokeSearch")
+
+
+@events.init_command_line_parser.add_listener
+def _(parser):
+    parser.add_argument("--load-profile", choices=("steady", "spike", "soak"), default=None,
+                        env_var="LOCUST_LOAD_PROFILE",
+                        help="Forma de la carga (usa -u, -r y -t); sin ella, carga manual (-u/-r o interfaz web)")
+    parser.add_argument("--spike-factor", type=float, default=5.0, env_var="LOCUST_SPIKE_FACTOR",
+                        help="Usuarios en el pico = -u x factor")
+    parser.add_argument("--zipf-s", type=float, default=1.1, env_var="LOCUST_ZIPF_S",
+                        help="Exponente de la popularidad Zipf (0 = uniforme)")
+    parser.add_argument("--zipf-seed", type=int, default=42, env_var="LOCUST_ZIPF_SEED",
+                        help="Semilla del orden de popularidad")
+    parser.add_argument("--typo-rate", type=float, default=0.05, env_var="LOCUST_TYPO_RATE",
+                        help="Fracción de búsquedas con errata")
+    parser.add_argument("--gallery-size", type=int, default=6, env_var="LOCUST_GALLERY_SIZE",
+                        help="Miniaturas pedidas por galería")
+    parser.add_argument("--dashboard-interval", type=float, default=10.0, env_var="LOCUST_DASHBOARD_INTERVAL",
+                        help="Segundos entre refrescos de un panel /bot/*")
+    parser.add_argument("--slo", default=DEFAULT_SLO, env_var="LOCUST_SLO",
+                        help="Umbrales globales: p50/p95/p99 (ms), error_rate (0-1), min_rps")
+    parser.add_argument("--slo-file", default="", env_var="LOCUST_SLO_FILE",
+                        help='JSON {"<nombre>": {"p95": 300, ...}} con umbrales por endpoint')
+    parser.add_argument("--report", default="", env_var="LOCUST_REPORT", help="Fichero JSON del informe")
+
+
+# --- nombres y popularidad ---
+
+def load_names():
+    """
+    Nombres reales: carpetas de images/ más la forma base de cada número del
+    CSV de stats (sin duplicados). Devuelve (nombres, nombres con stats).
+    """
+    names = {}
+    images_dir = os.path.join(BASE_DIR, "images")
+    if os.path.isdir(images_dir):
+        for folder in sorted(os.listdir(images_dir)):
+            names.setdefault(folder.lower(), folder)
+    with_stats = set()
+    seen_ids = set()
+    with open(os.path.join(BASE_DIR, "data", "pokemon_stats.csv"), mode='r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            if row['#'] not in seen_ids:
+                seen_ids.add(row['#'])
+                names.setdefault(row['Name'].lower(), row['Name'])
+                with_stats.add(row['Name'].lower())
+    return list(names.values()), with_stats
+
+
+class ZipfNames:
+    """Muestreo con popularidad Zipf: el de rango k sale con probabilidad proporcional a 1/k^s"""
+
+    def __init__(self, names, s=1.1, seed=42):
+        self.names = list(names)
+        # Orden de popularidad fijo (reproducible) pero no alfabético
+        random.Random(seed).shuffle(self.names)
+        self.cum_weights = list(itertools.accumulate(1 / rank ** s for rank in range(1, len(self.names) + 1)))
+
+    def pick(self, rng=random):
+        return self.names[bisect.bisect_left(self.cum_weights, rng.random() * self.cum_weights[-1])]
+
+
+def typo(name, rng=random):
+    """Errata de teclado: borra, cambia, duplica o intercambia una letra"""
+    if len(name) < 3:
+        return name + rng.choice(string.ascii_lowercase)
+    position = rng.randrange(1, len(name) - 1)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return name[:position] + name[position + 1:]
+    if kind == 1:
+        return name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:]
+    if kind == 2:
+        return name[:position] + name[position] + name[position:]
+    return name[:position - 1] + name[position] + name[position - 1] + name[position + 1:]
+
+
+def missing_name(rng=random):
+    """Nombre que no existe en ningún índice (404 esperado)"""
+    return "zz" + "".join(rng.choice(string.ascii_lowercase) for _ in range(8))
+
+
+NAMES, NAMES_WITH_STATS = load_names()
+_popularity = None
+
+
+def popularity(environment):
+    global _popularity
+    if _popularity is None:
+        options = environment.parsed_options
+        _popularity = ZipfNames(NAMES, options.zipf_s if options else 1.1, options.zipf_seed if options else 42)
+    return _popularity
+
+
+def _expect(response, *statuses):
+    """Marca como éxito los status esperados (p. ej. 404 para nombres inexistentes)"""
+    if response.status_code in statuses:
+        response.success()
+    else:
+        response.failure(f"Unexpected status {response.status_code}")
+
+
+# --- usuarios ---
 
 class PokemonUser(HttpUser):
-    host = "http://localhost:8000"  
+    """Búsquedas y consultas de datos: nombres Zipf, erratas y nombres inexistentes"""
+    host = "http://localhost:8000"
     wait_time = between(1, 3)
-    
-    # Lista de Pokémon para testing
-    POKEMONS = [
-        "pikachu", "charizard", "bulbasaur", "mewtwo", "squirtle",
-        "eevee", "mew", "ditto", "gyarados", "snorlax"
-    ]
-    
+    weight = 6
+
     def on_start(self):
-        """Inicialización para cada usuario virtual"""
-        self.pokemon = random.choice(self.POKEMONS)
+        self.names = popularity(self.environment)
+        options = self.environment.parsed_options
+        self.typo_rate = options.typo_rate if options else 0.05
 
-    @task(4)
+    @task(5)
     def search_pokemon(self):
-        """Test endpoint POST /poke/search/"""
-        self.client.post(
-            "/poke/search/",
-            json={"pokemon_name": self.pokemon},
-            name="/poke/search"
-        )
+        """POST /poke/search/ (con errata en una fracción de las búsquedas)"""
+        name = self.names.pick().lower()
+        if random.random() < self.typo_rate:
+            with self.client.post("/poke/search/", json={"pokemon_name": typo(name)},
+                                  name="/poke/search [typo]", catch_response=True) as response:
+                # La resolución aproximada suele encontrarlo; si no, 404 es una respuesta válida
+                _expect(response, 200, 404)
+        else:
+            self.client.post("/poke/search/", json={"pokemon_name": name}, name="/poke/search")
 
     @task(3)
     def get_pokemon_data(self):
-        """Test endpoint /api/pokemon/"""
-        self.client.get(
-            f"/api/pokemon/{self.pokemon}",
-            name="/api/pokemon/[name]"
-        )
+        self.client.get(f"/api/pokemon/{self.names.pick().lower()}", name="/api/pokemon/[name]")
 
     @task(2)
     def get_stats(self):
-        """Test endpoint /api/stats/"""
-        self.client.get(
-            f"/api/stats/{self.pokemon}",
-            name="/api/stats/[name]"
-        )
+        name = self.names.pick()
+        if name.lower() in NAMES_WITH_STATS:
+            self.client.get(f"/api/stats/{name}", name="/api/stats/[name]")
+        else:
+            # Generaciones con imágenes pero sin fila en el CSV: 404 esperado
+            with self.client.get(f"/api/stats/{name}", name="/api/stats/[no stats]",
+                                 catch_response=True) as response:
+                _expect(response, 404)
+
+    @task(2)
+    def suggest(self):
+        """Autocompletado mientras se escribe: prefijos crecientes del nombre"""
+        name = self.names.pick().lower()
+        for length in range(2, min(len(name), 5) + 1):
+            self.client.get(f"/poke/suggest?q={name[:length]}", name="/poke/suggest")
 
     @task(1)
-    def get_images(self):
-        """Test endpoint /api/images/"""
-        self.client.get(
-            f"/api/images/{self.pokemon}",
-            name="/api/images/[name]"
-        )
\ No newline at end of file
+    def missing_pokemon(self):
+        with self.client.get(f"/api/pokemon/{missing_name()}", name="/api/pokemon/[missing]",
+                             catch_response=True) as response:
+            _expect(response, 404)
+        with self.client.post("/poke/search/", json={"pokemon_name": missing_name()},
+                              name="/poke/search [missing]", catch_response=True) as response:
+            _expect(response, 404)
+
+
+class GalleryUser(HttpUser):
+    """Galerías: lista de imágenes, miniaturas y una imagen completa, revalidando con ETag"""
+    host = "http://localhost:8000"
+    wait_time = between(2, 5)
+    weight = 3
+
+    def on_start(self):
+        self.names = popularity(self.environment)
+        options = self.environment.parsed_options
+        self.gallery_size = options.gallery_size if options else 6
+        # Caché del "navegador": URL -> ETag
+        self.etags = {}
+
+    def _get_cached(self, url, name):
+        headers = {"If-None-Match": self.etags[url]} if url in self.etags else {}
+        with self.client.get(url, name=name, headers=headers, catch_response=True) as response:
+            if response.status_code == 200 and "etag" in response.headers:
+                self.etags[url] = response.headers["etag"]
+            _expect(response, 200, 304)
+
+    @task
+    def browse_gallery(self):
+        folder = self.names.pick()
+        response = self.client.get(f"/api/images/{folder}", name="/api/images/[name]")
+        images = response.json().get("images", []) if response.status_code == 200 else []
+        if not images:
+            return
+        for image in images[:self.gallery_size]:
+            index = os.path.splitext(image)[0]
+            self._get_cached(f"/api/images/{folder}/{index}?w=96&h=96&format=webp",
+                             "/api/images/[name]/[index] thumbnail")
+        index = os.path.splitext(random.choice(images))[0]
+        self._get_cached(f"/api/images/{folder}/{index}", "/api/images/[name]/[index]")
+
+
+class DashboardUser(HttpUser):
+    """Panel de monitorización que refresca /bot/* y /metrics a intervalo fijo"""
+    host = "http://localhost:8000"
+    weight = 1
+
+    def wait_time(self):
+        options = self.environment.parsed_options
+        return constant_pacing(options.dashboard_interval if options else 10.0)(self)
+
+    @task
+    def refresh_dashboard(self):
+        today = datetime.now()
+        start = (today - timedelta(days=7)).strftime("%Y-%m-%d")
+        for module in BOT_MODULES:
+            self.client.get(f"/bot/CheckLatency?module={module}&start_date={start}"
+                            f"&end_date={today:%Y-%m-%d}", name="/bot/CheckLatency")
+            self.client.get(f"/bot/CheckAvailability?module={module}&days=7", name="/bot/CheckAvailability")
+        self.client.get("/bot/CheckCache", name="/bot/CheckCache")
+        self.client.get(f"/bot/RenderGraph?module={random.choice(BOT_MODULES)}&resolution=minute&hours=1",
+                        name="/bot/RenderGraph")
+        self.client.get("/metrics", name="/metrics")
+
+
+# --- perfiles de carga ---
+
+class ScenarioShape(LoadTestShape):
+    """
+    steady: -u usuarios durante -t. spike: -u de base con un pico de -u x
+    --spike-factor entre el 30% y el 50% de -t. soak: rampa en el primer 10%
+    de -t y carga constante hasta el final (pensado para -t de horas).
+    """
+    use_common_options = True
+
+    def tick(self):
+        options = self.runner.environment.parsed_options
+        users = options.num_users or 10
+        spawn_rate = options.spawn_rate or 1
+        duration = options.run_time or {"steady": 300, "spike": 300, "soak": 4 * 3600}[options.load_profile]
+        elapsed = self.get_run_time()
+        if elapsed >= duration:
+            return None
+        if options.load_profile == "spike":
+            if 0.3 * duration <= elapsed < 0.5 * duration:
+                spike_users = int(users * options.spike_factor)
+                # El pico llega en pocos segundos, no al ritmo normal de -r
+                return spike_users, max(spawn_rate, spike_users / 5)
+            return users, max(spawn_rate, users * options.spike_factor / 5)
+        if options.load_profile == "soak":
+            ramp = 0.1 * duration
+            return (max(1, int(users * elapsed / ramp)) if elapsed < ramp else users), spawn_rate
+        return users, spawn_rate
+
+
+# Locust adopta cualquier LoadTestShape del fichero (y la prueba seguiría su calendario
+# también en la interfaz web): solo se deja si se pide un perfil explícitamente
+if not (os.getenv("LOCUST_LOAD_PROFILE")
+        or any(arg == "--load-profile" or arg.startswith("--load-profile=") for arg in sys.argv)):
+    del ScenarioShape
+
+
+# --- informe y SLO ---
+
+def parse_slo(spec):
+    """'p95=800,error_rate=0.01' -> {'p95': 800.0, 'error_rate': 0.01}"""
+    slo = {}
+    for part in spec.split(","):
+        if part.strip():
+            key, _, value = part.partition("=")
+            slo[key.strip()] = float(value)
+    return slo
+
+
+def entry_report(entry):
+    return {
+        "requests": entry.num_requests,
+        "failures": entry.num_failures,
+        "error_rate": round(entry.fail_ratio, 6),
+        "rps": round(entry.total_rps, 3),
+        "p50": entry.get_response_time_percentile(0.5),
+        "p95": entry.get_response_time_percentile(0.95),
+        "p99": entry.get_response_time_percentile(0.99),
+        "max": round(entry.max_response_time or 0, 3),
+        "avg": round(entry.avg_response_time, 3),
+    }
+
+
+def check_slo(metrics, slo):
+    """Umbrales incumplidos: p50/p95/p99 y error_rate son máximos; min_rps es mínimo"""
+    violations = []
+    for key, threshold in slo.items():
+        if key == "min_rps":
+            if metrics["rps"] < threshold:
+                violations.append({"metric": "rps", "value": metrics["rps"], "min": threshold})
+        elif key in metrics and metrics[key] is not None and metrics[key] > threshold:
+            violations.append({"metric": key, "value": metrics[key], "max": threshold})
+    return violations
+
+
+def build_report(environment):
+    options = environment.parsed_options
+    default_slo = parse_slo(options.slo)
+    endpoint_slo = {}
+    if options.slo_file:
+        with open(options.slo_file) as file:
+            endpoint_slo = json.load(file)
+    stats = environment.stats
+
+    endpoints = {}
+    for (name, method), entry in sorted(stats.entries.items()):
+        if not entry.num_requests:
+            continue
+        metrics = entry_report(entry)
+        # Los umbrales globales se aplican a cada endpoint salvo que el fichero los sustituya
+        slo = {**{k: v for k, v in default_slo.items() if k != "min_rps"}, **endpoint_slo.get(name, {})}
+        endpoints[f"{method} {name}"] = {**metrics, "slo": slo, "violations": check_slo(metrics, slo)}
+
+    total = entry_report(stats.total)
+    total_slo = {**default_slo, **endpoint_slo.get("Aggregated", {})}
+    total_violations = check_slo(total, total_slo)
+    failed = bool(total_violations) or any(endpoint["violations"] for endpoint in endpoints.values())
+    return {
+        "profile": options.load_profile or "manual",
+        "users": options.num_users,
+        "run_time": options.run_time,
+        "host": environment.host,
+        "started_at": datetime.fromtimestamp(stats.start_time).isoformat(timespec="seconds"),
+        "duration_s": round(stats.last_request_timestamp - stats.start_time, 3)
+        if stats.last_request_timestamp else 0,
+        "total": {**total, "slo": total_slo, "violations": total_violations},
+        "endpoints": endpoints,
+        "errors": [{"method": error.method, "name": error.name, "error": str(error.error),
+                    "occurrences": error.occurrences} for error in stats.errors.values()],
+        "passed": not failed,
+    }
+
+
+@events.quitting.add_listener
+def _(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner) or environment.parsed_options is None:
+        return
+    report = build_report(environment)
+    if environment.parsed_options.report:
+        with open(environment.parsed_options.report, "w") as file:
+            json.dump(report, file, indent=2)
+    total = report["total"]
+    print(f"SLO {'PASSED' if report['passed'] else 'FAILED'} | {total['requests']} requests,"
+          f" {total['rps']} rps, p50 {total['p50']}ms, p95 {total['p95']}ms, p99 {total['p99']}ms,"
+          f" errors {total['error_rate']:.2%}")
+    for name, endpoint in [("Aggregated", report["total"]), *report["endpoints"].items()]:
+        for violation in endpoint["violations"]:
+            limit = f"max {violation['max']}" if "max" in violation else f"min {violation['min']}"
+            print(f"  {name}: {violation['metric']} = {violation['value']} ({limit})")
+    if not report["passed"]:
+        environment.process_exit_code = 1
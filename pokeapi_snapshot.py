@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import json
+import time
+from app import config
+from app.services.pokeapi_service import PokeAPIService
+from app.services.pokemon_store import PokemonStore
+
+# Herramienta para pre-cargar el snapshot local de PokeAPI (modo offline y reinicios en caliente)
+
+
+async def _populate_from_api(store, identifiers, concurrency):
+    """Descarga en paralelo (acotado) y guarda en el snapshot"""
+    service = PokeAPIService()
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = []
+
+    async def fetch(identifier):
+        async with semaphore:
+            try:
+                return await service._fetch_async(identifier)
+            except Exception:
+                failed.append(identifier)
+                return None
+
+    try:
+        results = await asyncio.gather(*(fetch(i) for i in identifiers))
+    finally:
+        await PokeAPIService.aclose()
+    store.put_many([p for p in results if p is not None])
+    return failed
+
+
+def _populate_from_file(store, fixture_path):
+    """Importa un fichero JSON con una lista de respuestas de PokeAPI (o modelos Pokemon)"""
+    with open(fixture_path, mode='r', encoding='utf-8') as file:
+        payload = json.load(file)
+    service = PokeAPIService()
+    store.put_many([service._build_pokemon(item) for item in payload])
+    return len(payload)
+
+
+def _parse_ids(spec):
+    """'1-151,250' -> [1, 2, ..., 151, 250]"""
+    ids = []
+    for part in spec.split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            ids.append(int(part))
+    return ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-carga el snapshot local de PokeAPI")
+    parser.add_argument("--store", default=config.POKEAPI_STORE_PATH, help="Ruta del fichero SQLite")
+    parser.add_argument("--ids", default="1-898", help="Rango de ids, p. ej. '1-151,250'")
+    parser.add_argument("--concurrency", type=int, default=config.POKEAPI_POOL_SIZE)
+    parser.add_argument("--from-file", dest="from_file", help="Importar desde un fichero JSON en lugar de la API")
+    args = parser.parse_args()
+
+    store = PokemonStore(args.store)
+    start = time.time()
+    if args.from_file:
+        imported = _populate_from_file(store, args.from_file)
+        print(f"Imported {imported} entries from {args.from_file}")
+    else:
+        failed = asyncio.run(_populate_from_api(store, _parse_ids(args.ids), args.concurrency))
+        if failed:
+            print(f"Failed identifiers ({len(failed)}): {failed}")
+    print(f"Store {args.store}: {store.count()} entries ({time.time() - start:.1f}s)")
+    store.close()
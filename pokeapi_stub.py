@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import csv
+import os
+import random
+import socket
+import threading
+import time
+import uvicorn
+from fastapi import FastAPI, HTTPException
+
+# Servidor local que imita /api/v2/pokemon/{id|nombre} de PokeAPI para benchmarks y
+# pruebas de carga: latencia configurable (base + jitter) e inyección de errores.
+
+
+def load_pokemon(csv_path="data/pokemon_stats.csv", images_dir="images"):
+    """
+    {id: nombre}: la primera forma de cada número del CSV de stats y, a
+    continuación, las carpetas de images/ que no están en el CSV (ids nuevos).
+    """
+    pokemon = {}
+    with open(csv_path, mode='r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            pokemon.setdefault(int(row['#']), row['Name'].lower())
+    if os.path.isdir(images_dir):
+        known = set(pokemon.values())
+        next_id = max(pokemon, default=0) + 1
+        for folder in sorted(os.listdir(images_dir)):
+            if folder.lower() not in known:
+                pokemon[next_id] = folder.lower()
+                next_id += 1
+    return pokemon
+
+
+def pokemon_payload(pokemon_id, name):
+    """Respuesta con los campos que usa PokeAPIService._build_pokemon"""
+    return {
+        "id": pokemon_id,
+        "name": name,
+        "base_experience": 50 + pokemon_id % 250,
+        "height": 3 + pokemon_id % 20,
+        "weight": 20 + pokemon_id * 7 % 1000,
+        "abilities": [
+            {"ability": {"name": f"ability-{pokemon_id % 97}", "url": f"https://pokeapi.co/api/v2/ability/{pokemon_id % 97}/"},
+             "is_hidden": False, "slot": 1},
+            {"ability": {"name": f"ability-{pokemon_id % 89 + 100}", "url": f"https://pokeapi.co/api/v2/ability/{pokemon_id % 89 + 100}/"},
+             "is_hidden": True, "slot": 3},
+        ],
+        "sprites": {
+            "front_default": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{pokemon_id}.png",
+            "front_shiny": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/shiny/{pokemon_id}.png",
+        },
+    }
+
+
+class StubSettings:
+    """Parámetros del stub; se pueden cambiar en caliente (p. ej. para simular una caída)"""
+
+    def __init__(self, latency_ms=20.0, jitter_ms=0.0, error_rate=0.0, timeout_rate=0.0,
+                 timeout_ms=10000.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # Fracción de respuestas 500 y de respuestas que tardan timeout_ms (para disparar timeouts)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_ms = timeout_ms
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+
+
+def create_app(settings=None, csv_path="data/pokemon_stats.csv"):
+    settings = settings or StubSettings()
+    pokemon = load_pokemon(csv_path)
+    payloads = {pokemon_id: pokemon_payload(pokemon_id, name) for pokemon_id, name in pokemon.items()}
+    by_name = {name: pokemon_id for pokemon_id, name in pokemon.items()}
+    app = FastAPI()
+    app.state.settings = settings
+
+    @app.get("/api/v2/pokemon/{identifier}")
+    async def get_pokemon(identifier: str):
+        settings.requests += 1
+        draw = settings.random.random()
+        if draw < settings.timeout_rate:
+            settings.timeouts += 1
+            await asyncio.sleep(settings.timeout_ms / 1000)
+        else:
+            delay = settings.latency_ms + settings.random.uniform(-settings.jitter_ms, settings.jitter_ms)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+        if draw < settings.timeout_rate + settings.error_rate:
+            settings.errors += 1
+            raise HTTPException(status_code=500, detail="Injected error")
+        key = identifier.strip().lower()
+        pokemon_id = int(key) if key.isdigit() else by_name.get(key)
+        payload = payloads.get(pokemon_id)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return payload
+
+    @app.get("/stub/stats")
+    async def stub_stats():
+        return {"requests": settings.requests, "errors": settings.errors, "timeouts": settings.timeouts}
+
+    return app
+
+
+class StubServer:
+    """Stub servido por uvicorn en un hilo (uso: with StubServer(settings) as base_url: ...)"""
+
+    def __init__(self, settings=None, host="127.0.0.1", port=0):
+        self.settings = settings or StubSettings()
+        self.host = host
+        self.port = port or self._free_port(host)
+        self._server = uvicorn.Server(uvicorn.Config(create_app(self.settings), host=self.host, port=self.port,
+                                                     log_level="warning", access_log=False))
+        self._thread = None
+
+    @staticmethod
+    def _free_port(host):
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            return sock.getsockname()[1]
+
+    @property
+    def base_url(self):
+        """Valor para POKEAPI_BASE_URL"""
+        return f"http://{self.host}:{self.port}/api/v2/pokemon/"
+
+    def start(self, timeout=10):
+        self._thread = threading.Thread(target=self._server.run, name="pokeapi-stub", daemon=True)
+        self._thread.start()
+        deadline = time.time() + timeout
+        while not self._server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("PokeAPI stub did not start")
+            time.sleep(0.01)
+        return self.base_url
+
+    def stop(self):
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub local de PokeAPI (latencia y errores configurables)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fracción de respuestas que tardan --timeout-ms")
+    parser.add_argument("--timeout-ms", type=float, default=10000.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = StubSettings(args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate,
+                            args.timeout_ms, args.seed)
+    print(f"PokeAPI stub: POKEAPI_BASE_URL=http://{args.host}:{args.port}/api/v2/pokemon/")
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,60 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app import config
+from app.services.image_manifest import ImageManifest
+from app.services.image_derivatives import (DerivativeCache, SUPPORTED_FORMATS,
+                                            derivative_key, write_derivative)
+
+# Herramienta offline: pre-genera los tamaños estándar de todas las carpetas de images/
+
+
+def _parse_sizes(spec):
+    """'96x96:webp,256x256:jpeg' -> [(96, 96, 'webp'), (256, 256, 'jpeg')]"""
+    sizes = []
+    for part in spec.split(","):
+        dimensions, _, fmt = part.strip().partition(":")
+        width, _, height = dimensions.partition("x")
+        fmt = (fmt or "jpeg").lower()
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        sizes.append((int(width) if width else None, int(height) if height else None, fmt))
+    return sizes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-genera miniaturas de images/")
+    parser.add_argument("--images", default="images", help="Directorio de imágenes")
+    parser.add_argument("--sizes", default=config.IMAGE_STANDARD_SIZES, help="'ANCHOxALTO:formato,...'")
+    parser.add_argument("--quality", type=int, default=config.IMAGE_DERIVATIVE_QUALITY)
+    parser.add_argument("--workers", type=int, default=config.IMAGE_ENCODER_WORKERS)
+    args = parser.parse_args()
+
+    manifest = ImageManifest(args.images)
+    cache = DerivativeCache(config.IMAGE_DERIVATIVE_DIR, config.IMAGE_DERIVATIVE_CACHE_BYTES)
+    sizes = _parse_sizes(args.sizes)
+    start = time.time()
+    jobs = []
+    skipped = 0
+    for name in manifest.folders():
+        folder = manifest.get(name)
+        for image_name in folder.images:
+            for width, height, fmt in sizes:
+                key = derivative_key(folder.etags[image_name], width, height, fmt, args.quality)
+                if cache.get(key, fmt) is not None:
+                    skipped += 1
+                    continue
+                jobs.append((key, (str(folder.path / image_name), str(cache.path_for(key, fmt)),
+                                   width, height, fmt, args.quality)))
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(write_derivative, *job): key for key, job in jobs}
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                failed += 1
+            else:
+                # Cuenta para IMAGE_DERIVATIVE_CACHE_BYTES (puede expulsar los menos usados)
+                cache.remember(futures[future], future.result())
+    print(f"Encoded {len(jobs) - failed} derivatives, skipped {skipped} cached, {failed} failed "
+          f"({time.time() - start:.1f}s)")
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# La app lee la configuración y data/ al importarse: rutas temporales y stub de
+# PokeAPI antes de importar nada de app/, ejecutando desde la raíz del repositorio
+ROOT = Path(__file__).resolve().parent.parent
+os.chdir(ROOT)
+sys.path.insert(0, str(ROOT))
+
+from pokeapi_stub import StubServer, StubSettings  # noqa: E402
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="pokeapi-tests-"))
+STUB = StubServer(StubSettings(latency_ms=5.0, seed=1))
+
+os.environ.update({
+    "POKEAPI_BASE_URL": STUB.base_url,
+    "POKEAPI_STORE_PATH": "",
+    "ROLLUP_DB_PATH": "",
+    "LOG_FILE": str(WORKDIR / "monitoring.log"),
+    "LOG_SEGMENT_DIR": str(WORKDIR / "segments"),
+    "LOG_CONSOLE": "false",
+    "IMAGE_DERIVATIVE_DIR": str(WORKDIR / "derivatives"),
+    "TRACE_SAMPLE_RATE": "0",
+})
+
+
+@pytest.fixture(scope="session")
+def stub():
+    STUB.start()
+    yield STUB
+    STUB.stop()
+
+
+@pytest.fixture(scope="session")
+def client(stub):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def pytest_sessionfinish(session, exitstatus):
+    import shutil
+    shutil.rmtree(WORKDIR, ignore_errors=True)
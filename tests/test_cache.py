@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from app.services.pokeapi_service import PokeAPIService
+from app.utils.cache import TTLCache, FRESH, STALE
+from pokeapi_stub import pokemon_payload
+
+
+def test_ttl_cache_fresh_stale_and_aliases(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10, stale_ttl=5)
+    cache.set("1", "bulbasaur", aliases=("bulbasaur",))
+
+    assert cache.get("bulbasaur") == ("bulbasaur", FRESH)
+    now[0] += 12
+    assert cache.get("1") == ("bulbasaur", STALE)
+    now[0] += 10
+    assert cache.get("1") == (None, None)
+    # Vencida pero todavía disponible como último valor conocido
+    assert cache.peek("bulbasaur") == "bulbasaur"
+
+
+def test_ttl_cache_evicts_least_recently_used_with_aliases():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("1", "a", aliases=("bulbasaur",))
+    cache.set("2", "b")
+    cache.get("1")
+    cache.set("3", "c")
+
+    assert cache.peek("2") is None
+    assert cache.peek("bulbasaur") == "a"
+    assert len(cache) == 2
+
+
+def test_concurrent_misses_share_one_fetch(monkeypatch):
+    service = PokeAPIService()
+    calls = []
+
+    async def fake_fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return service._build_pokemon(pokemon_payload(1, "bulbasaur"))
+
+    monkeypatch.setattr(service, "_fetch_async", fake_fetch)
+    service.cache.clear()
+
+    async def run():
+        return await asyncio.gather(*(service.get_pokemon_async(name)
+                                      for name in ("bulbasaur", "Bulbasaur", " bulbasaur ") * 5))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(pokemon.id == 1 for pokemon in results)
+    assert not service._inflight
+    # Ya en caché (por nombre y por id): sin más consultas
+    asyncio.run(service.get_pokemon_async("1"))
+    assert len(calls) == 1
+    service.cache.clear()
+
+
+def test_cancelled_caller_does_not_cancel_shared_fetch(monkeypatch):
+    service = PokeAPIService()
+    calls = []
+
+    async def fake_fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return service._build_pokemon(pokemon_payload(4, "charmander"))
+
+    monkeypatch.setattr(service, "_fetch_async", fake_fetch)
+    service.cache.clear()
+
+    async def run():
+        first = asyncio.ensure_future(service.get_pokemon_async("charmander"))
+        second = asyncio.ensure_future(service.get_pokemon_async("charmander"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()).name == "charmander"
+    assert len(calls) == 1
+    service.cache.clear()
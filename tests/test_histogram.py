@@ -0,0 +1,52 @@
+import pytest
+
+from app.utils.histogram import LatencyHistogram
+
+
+def histogram_of(values):
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    return histogram
+
+
+def test_percentiles_within_bucket_error():
+    histogram = histogram_of(range(1, 1001))
+    percentiles = histogram.percentiles((0.5, 0.9, 0.99))
+    for quantile, expected in ((0.5, 500), (0.9, 900), (0.99, 990)):
+        assert percentiles[quantile] == pytest.approx(expected, rel=0.03)
+    assert histogram.count == 1000
+    assert histogram.mean == pytest.approx(500.5)
+    assert histogram.max == 1000
+
+
+def test_small_values_are_exact_and_bounded_by_max():
+    histogram = histogram_of([0.01, 0.02, 0.03])
+    assert histogram.percentiles((0.5,))[0.5] == pytest.approx(0.02)
+    assert histogram.percentiles((1.0,))[1.0] <= histogram.max
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentiles((0.5, 0.99)) == {0.5: None, 0.99: None}
+    assert histogram.summary()["max"] is None
+    assert histogram.mean is None
+
+
+def test_merge_matches_single_histogram():
+    values = [value * 0.37 for value in range(1, 5000)]
+    merged = histogram_of(values[::2]).merge(histogram_of(values[1::2]))
+    single = histogram_of(values)
+
+    assert merged.counts == single.counts
+    assert merged.count == single.count
+    assert merged.total == pytest.approx(single.total)
+    assert merged.max == single.max
+    assert merged.summary() == pytest.approx(single.summary())
+
+
+def test_dict_round_trip():
+    histogram = histogram_of([1, 5, 50, 500])
+    restored = LatencyHistogram.from_dict(histogram.to_dict())
+    assert restored.counts == histogram.counts
+    assert restored.summary() == histogram.summary()
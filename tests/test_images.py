@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import pytest
+
+IMAGE = Path("images/Bulbasaur/0.jpg")
+URL = "/api/images/Bulbasaur/0"
+
+
+@pytest.fixture(scope="module")
+def original():
+    return IMAGE.read_bytes()
+
+
+def test_full_image_with_etag(client, original):
+    response = client.get(URL)
+    assert response.status_code == 200
+    assert response.content == original
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_if_none_match_returns_304(client):
+    etag = client.get(URL).headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(URL, headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    assert client.get(URL, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_byte_ranges(client, original):
+    size = len(original)
+
+    response = client.get(URL, headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.content == original[:10]
+    assert response.headers["content-range"] == f"bytes 0-9/{size}"
+
+    response = client.get(URL, headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.content == original[-10:]
+
+    response = client.get(URL, headers={"Range": f"bytes={size - 5}-"})
+    assert response.content == original[-5:]
+
+
+def test_unsatisfiable_and_ignored_ranges(client, original):
+    size = len(original)
+
+    response = client.get(URL, headers={"Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+    # Mal formado: se ignora y se responde la imagen completa
+    response = client.get(URL, headers={"Range": "bytes=abc"})
+    assert response.status_code == 200
+    assert response.content == original
+
+
+def test_if_range_with_stale_etag_returns_full_image(client, original):
+    response = client.get(URL, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == original
+
+
+def test_derivative_etag_and_304(client):
+    response = client.get(URL, params={"w": 32, "format": "webp"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    etag = response.headers["etag"]
+
+    response = client.get(URL, params={"w": 32, "format": "webp"}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    # Otro tamaño: otro contenido y otro ETag
+    assert client.get(URL, params={"w": 48, "format": "webp"}).headers["etag"] != etag
+
+
+def test_missing_image(client):
+    assert client.get("/api/images/Bulbasaur/99").status_code == 404
+    assert client.get("/api/images/Missingno/0").status_code == 404
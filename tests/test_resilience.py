@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from app.utils.resilience import CircuitBreaker, Bulkhead, BulkheadFull, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker():
+    clock = FakeClock()
+    changes = []
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, half_open_probes=1,
+                             on_change=lambda old, new: changes.append((old, new)), clock=clock)
+    return breaker, clock, changes
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker, _, changes = make_breaker()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+    assert changes == [(CLOSED, OPEN)]
+
+
+def test_breaker_half_open_probe_closes_or_reopens():
+    breaker, clock, changes = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    # Una sola sonda a la vez
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert changes == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, OPEN),
+                       (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+
+
+def test_breaker_release_returns_unused_probe():
+    breaker, clock, _ = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_bulkhead_rejects_when_full():
+    async def run():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_wait=0.01)
+        await bulkhead.acquire()
+        with pytest.raises(BulkheadFull):
+            await bulkhead.acquire()
+        assert not bulkhead.try_acquire()
+        bulkhead.release()
+        return bulkhead
+
+    bulkhead = asyncio.run(run())
+    assert bulkhead.stats() == {"in_flight": 0, "max_concurrent": 1, "peak": 1, "waiting": 0, "rejected": 1}
+
+
+def test_bulkhead_hands_slot_to_first_waiter():
+    async def run():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_wait=1)
+        await bulkhead.acquire()
+        order = []
+
+        async def worker(name):
+            await bulkhead.acquire()
+            order.append(name)
+            bulkhead.release()
+
+        tasks = [asyncio.ensure_future(worker(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        assert bulkhead.stats()["waiting"] == 2
+        bulkhead.release()
+        await asyncio.gather(*tasks)
+        return bulkhead, order
+
+    bulkhead, order = asyncio.run(run())
+    assert order == ["a", "b"]
+    assert bulkhead.in_flight == 0
+    assert bulkhead.peak == 1
+
+
+def test_bulkhead_cancelled_waiter_does_not_leak_slot():
+    async def run():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_wait=1)
+        await bulkhead.acquire()
+        waiting = asyncio.ensure_future(bulkhead.acquire())
+        await asyncio.sleep(0)
+        # Se traspasa el hueco y la tarea se cancela antes de llegar a usarlo
+        bulkhead.release()
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        else:
+            # wait_for devolvió el resultado: la tarea es dueña del hueco
+            bulkhead.release()
+        return bulkhead
+
+    bulkhead = asyncio.run(run())
+    assert bulkhead.in_flight == 0
+    assert bulkhead.stats()["waiting"] == 0
+    assert bulkhead.try_acquire()
+
+
+def test_bulkhead_cancelled_waiter_without_slot():
+    async def run():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_wait=1)
+        await bulkhead.acquire()
+        waiting = asyncio.ensure_future(bulkhead.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert bulkhead.stats()["waiting"] == 0
+        bulkhead.release()
+        return bulkhead
+
+    bulkhead = asyncio.run(run())
+    assert bulkhead.in_flight == 0
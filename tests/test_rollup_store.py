@@ -0,0 +1,82 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.utils.rollup_store import RollupStore, HOUR
+
+TIMESTAMP = datetime(2024, 5, 1, 10, 30).timestamp()
+DAY = date(2024, 5, 1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    rollups = RollupStore(tmp_path / "rollups.sqlite3")
+    yield rollups
+    rollups.close()
+
+
+def add_requests(rollups):
+    rollups.add(TIMESTAMP, "PokeAPI", "get_pokemon", 200, 10.0)
+    rollups.add(TIMESTAMP + 60, "PokeAPI", "get_pokemon", 404, 20.0)
+    rollups.add(TIMESTAMP + 120, "PokeAPI", "get_pokemon", 503, 30.0)
+    rollups.add(TIMESTAMP + HOUR, "PokeAPI", "get_pokemon", 200, 40.0)
+
+
+def test_pending_rows_are_readable_before_flush(store):
+    add_requests(store)
+    totals = store.totals("PokeAPI")
+    assert totals["count"] == 4
+    assert (totals["success"], totals["client_errors"], totals["server_errors"]) == (2, 1, 1)
+    assert totals["avg_latency"] == pytest.approx(25.0)
+    assert totals["max_latency"] == 40.0
+
+
+def test_flush_persists_and_reads_back(store):
+    add_requests(store)
+    before = store.totals("PokeAPI")
+    # Filas volcadas: dos horas y un día para (PokeAPI, get_pokemon)
+    assert store.flush() == 3
+    after = store.totals("PokeAPI")
+    assert after["count"] == before["count"]
+    assert after["percentiles"] == before["percentiles"]
+
+    hourly = store.hourly("PokeAPI")
+    hour = int(TIMESTAMP) - int(TIMESTAMP) % HOUR
+    assert sorted(hourly) == [hour, hour + HOUR]
+    assert hourly[hour]["count"] == 3
+    assert list(store.daily("PokeAPI", start=DAY)) == [DAY]
+    assert store.totals("PokeStats") is None
+
+
+def test_flush_adds_to_existing_rows(store):
+    add_requests(store)
+    store.flush()
+    add_requests(store)
+    # Mitad guardada, mitad pendiente: la lectura las combina
+    assert store.totals("PokeAPI")["count"] == 8
+    store.flush()
+    totals = store.totals("PokeAPI")
+    assert totals["count"] == 8
+    assert totals["histogram"].count == 8
+
+
+def test_two_stores_share_one_database(tmp_path):
+    path = tmp_path / "shared.sqlite3"
+    first, second = RollupStore(path), RollupStore(path)
+    try:
+        add_requests(first)
+        add_requests(second)
+        first.flush()
+        second.flush()
+        assert first.totals("PokeAPI")["count"] == 8
+        assert second.daily("PokeAPI")[DAY]["server_errors"] == 2
+    finally:
+        first.close()
+        second.close()
+
+
+def test_checkpoint_is_saved_with_flush(store):
+    assert store.get_checkpoint("monitoring.log") == (None, 0)
+    add_requests(store)
+    store.flush(checkpoint=("monitoring.log", 42, 1024))
+    assert store.get_checkpoint("monitoring.log") == (42, 1024)
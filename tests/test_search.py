@@ -0,0 +1,56 @@
+def search(client, name):
+    response = client.post("/poke/search/", json={"pokemon_name": name})
+    assert response.status_code == 200
+    return response.json()
+
+
+def without_latency(result):
+    """Resultado sin las latencias por fuente (lo único que cambia entre llamadas)"""
+    sources = {source: value["status"] for source, value in result["sources"].items()}
+    return {**result, "sources": sources}
+
+
+def test_batch_keeps_forms_apart(client, stub):
+    names = ["Venusaur", "VenusaurMega Venusaur", "venusaur", "3"]
+    before = stub.settings.requests
+    response = client.post("/poke/search/batch", json={"pokemon_names": names})
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    assert [item["index"] for item in results] == [0, 1, 2, 3]
+    assert [item["query"] for item in results] == names
+    venusaur, mega, lower, by_id = (item["result"] for item in results)
+    assert venusaur["stats"]["total"] == 525
+    assert mega["stats"]["total"] == 625
+    assert lower == venusaur
+    assert by_id["stats"]["total"] == 525
+    # Las formas comparten id en PokeAPI: una sola consulta para todo el lote
+    assert stub.settings.requests - before <= 1
+
+
+def test_batch_matches_single_search(client):
+    names = ["Venusaur", "VenusaurMega Venusaur", "charzard"]
+    results = client.post("/poke/search/batch", json={"pokemon_names": names}).json()["results"]
+    for name, item in zip(names, results):
+        assert without_latency(item["result"]) == without_latency(search(client, name))
+
+
+def test_batch_reports_missing_items(client):
+    results = client.post("/poke/search/batch", json={"pokemon_names": ["Pikachu", "notapokemon"]}).json()["results"]
+    assert "result" in results[0]
+    assert results[1]["error"]["status_code"] == 404
+
+
+def test_batch_stream_returns_every_item(client):
+    import json
+
+    names = ["Venusaur", "VenusaurMega Venusaur", "Pikachu"]
+    response = client.post("/poke/search/batch", json={"pokemon_names": names, "stream": True})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    items = [json.loads(line) for line in response.text.splitlines() if line]
+    assert sorted(item["index"] for item in items) == [0, 1, 2]
+
+
+def test_batch_validation(client):
+    assert client.post("/poke/search/batch", json={"pokemon_names": []}).status_code == 400
+    assert client.post("/poke/search/batch", json={"pokemon_names": "Pikachu"}).status_code == 400